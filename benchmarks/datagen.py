@@ -0,0 +1,80 @@
+"""Deterministic CSV inputs for the benchmarks.
+
+Rows mix translatable text (name, description, category) with columns the
+column profiler passes through (ids, SKUs, prices, dates). duplication is the
+probability that a text cell repeats a phrase seen earlier, which is what the
+translation cache and per-chunk deduplication feed on.
+"""
+import csv
+import io
+import random
+
+UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+# Phrases already emitted that a duplicated cell can repeat
+PHRASE_POOL_SIZE = 5000
+
+def parse_size(text):
+    """'1KB', '250MB' or a plain byte count"""
+    text = text.strip().upper()
+    for unit in sorted(UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * UNITS[unit])
+    return int(text)
+
+def format_size(size):
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return f"{size}B"
+
+class PhraseSource:
+    def __init__(self, rng, duplication):
+        self.rng = rng
+        self.duplication = duplication
+        self.vocabulary = [self._word() for _ in range(2000)]
+        self.pool = []
+
+    def _word(self):
+        return ''.join(self.rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(self.rng.randint(3, 9)))
+
+    def phrase(self, words):
+        if self.pool and self.rng.random() < self.duplication:
+            return self.rng.choice(self.pool)
+        text = ' '.join(self.rng.choice(self.vocabulary) for _ in range(words)).capitalize()
+        if len(self.pool) < PHRASE_POOL_SIZE:
+            self.pool.append(text)
+        else:
+            self.pool[self.rng.randrange(PHRASE_POOL_SIZE)] = text
+        return text
+
+def generate_csv(size, duplication=0.5, seed=0):
+    """CSV bytes of roughly size bytes (never less than the header and one row)"""
+    rng = random.Random(seed)
+    phrases = PhraseSource(rng, duplication)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['id', 'sku', 'name', 'description', 'category', 'price', 'created_at'])
+    chunks, written, row_id = [], 0, 0
+
+    while written < size or row_id == 0:
+        row_id += 1
+        writer.writerow([
+            row_id,
+            f"SKU-{rng.randrange(10 ** 8):08d}",
+            phrases.phrase(rng.randint(2, 4)),
+            phrases.phrase(rng.randint(8, 20)),
+            phrases.phrase(1),
+            f"{rng.uniform(1, 500):.2f}",
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        ])
+        if buffer.tell() >= 64 * 1024 or written + buffer.tell() >= size:
+            chunk = buffer.getvalue().encode('utf-8')
+            chunks.append(chunk)
+            written += len(chunk)
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        chunks.append(buffer.getvalue().encode('utf-8'))
+    return b''.join(chunks), row_id
@@ -0,0 +1,647 @@
+"""In-memory stand-ins for the AWS services the Lambda functions use.
+
+Only the calls the functions actually make are implemented. Every call is
+counted in STATS so a benchmark can report API calls per job. install()
+routes boto3.client / boto3.resource to these fakes; when boto3 is not
+installed it registers minimal boto3/botocore modules instead.
+"""
+import io
+import re
+import sys
+import time
+import types
+import random
+import threading
+import copy
+import hashlib
+import urllib.parse
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+
+STATS = Counter()
+_lock = threading.Lock()
+
+def count(name, amount=1):
+    with _lock:
+        STATS[name] += amount
+
+def _client_error_class():
+    try:
+        from botocore.exceptions import ClientError
+        return ClientError
+    except ImportError:
+        class ClientError(Exception):
+            def __init__(self, error_response, operation_name):
+                self.response = error_response
+                self.operation_name = operation_name
+                super().__init__(f"An error occurred ({error_response['Error']['Code']}) when calling "
+                                 f"the {operation_name} operation: {error_response['Error'].get('Message', '')}")
+        return ClientError
+
+ClientError = _client_error_class()
+
+def _botocore_error_class():
+    try:
+        from botocore.exceptions import BotoCoreError
+        return BotoCoreError
+    except ImportError:
+        class BotoCoreError(Exception):
+            """Base of botocore's client-side failures: connection errors, timeouts, credentials"""
+
+            def __init__(self, **kwargs):
+                self.kwargs = kwargs
+                super().__init__(', '.join(f"{k}={v}" for k, v in kwargs.items()))
+        return BotoCoreError
+
+BotoCoreError = _botocore_error_class()
+
+def _connection_error_classes():
+    try:
+        from botocore.exceptions import ConnectionError, HTTPClientError
+        return ConnectionError, HTTPClientError
+    except ImportError:
+        class ConnectionError(BotoCoreError):
+            pass
+
+        class HTTPClientError(BotoCoreError):
+            pass
+        return ConnectionError, HTTPClientError
+
+EndpointConnectionError, HTTPClientError = _connection_error_classes()
+
+def client_error(code, operation, message=''):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+class FakeS3:
+    """Buckets of bytes objects with multipart uploads and ranged reads.
+
+    Objects whose key starts with one of sink_prefixes only keep their size,
+    so translated outputs do not count towards a benchmark's peak memory.
+    """
+
+    def __init__(self, sink_prefixes=()):
+        self.objects = {}
+        self.uploads = {}
+        self.upload_ids = itertools.count(1)
+        self.sink_prefixes = tuple(sink_prefixes)
+
+    def _store(self, Bucket, Key, body, etag=None, **attributes):
+        size = len(body)
+        # Single-part ETags are the MD5 of the bytes, as with SSE-S3
+        etag = etag or f'"{hashlib.md5(body).hexdigest()}"'
+        if Key.startswith(self.sink_prefixes):
+            body = None
+        self.objects[(Bucket, Key)] = dict(attributes, Body=body, Size=size, ETag=etag,
+                                           LastModified=datetime.now(timezone.utc))
+        return etag
+
+    def put_object(self, Bucket, Key, Body=b'', **kwargs):
+        count('s3.put_object')
+        body = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        etag = self._store(Bucket, Key, body, Metadata=kwargs.get('Metadata', {}), ContentType=kwargs.get('ContentType'),
+                           ContentEncoding=kwargs.get('ContentEncoding'))
+        return {'ETag': etag}
+
+    def _get(self, Bucket, Key, operation):
+        try:
+            return self.objects[(Bucket, Key)]
+        except KeyError:
+            raise client_error('NoSuchKey', operation)
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        count('s3.get_object')
+        obj = self._get(Bucket, Key, 'GetObject')
+        body = obj['Body']
+        if body is None:
+            raise client_error('InvalidObjectState', 'GetObject', f'{Key} was discarded by the benchmark sink')
+        if Range:
+            start, end = Range.split('=', 1)[1].split('-')
+            body = body[int(start):int(end) + 1 if end else None]
+        return {
+            'Body': io.BytesIO(body),
+            'ContentLength': len(body),
+            'LastModified': obj['LastModified'],
+            'Metadata': obj['Metadata'],
+            'ContentType': obj.get('ContentType'),
+            'ContentEncoding': obj.get('ContentEncoding')
+        }
+
+    def head_object(self, Bucket, Key, **kwargs):
+        count('s3.head_object')
+        obj = self._get(Bucket, Key, 'HeadObject')
+        return {
+            'ContentLength': obj['Size'],
+            'ETag': obj['ETag'],
+            'LastModified': obj['LastModified'],
+            'Metadata': obj['Metadata'],
+            'ContentType': obj.get('ContentType'),
+            'ContentEncoding': obj.get('ContentEncoding')
+        }
+
+    def get_object_tagging(self, Bucket, Key):
+        count('s3.get_object_tagging')
+        return {'TagSet': []}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        count('s3.create_multipart_upload')
+        upload_id = f"upload-{next(self.upload_ids)}"
+        self.uploads[upload_id] = {'attributes': {
+            'ContentType': kwargs.get('ContentType'), 'ContentEncoding': kwargs.get('ContentEncoding')
+        }}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        count('s3.upload_part')
+        if UploadId not in self.uploads:
+            raise client_error('NoSuchUpload', 'UploadPart')
+        body = bytes(Body)
+        self.uploads[UploadId][PartNumber] = b'' if Key.startswith(self.sink_prefixes) else body
+        self.uploads[UploadId].setdefault('sizes', {})[PartNumber] = len(body)
+        return {'ETag': f'"{UploadId}-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        count('s3.complete_multipart_upload')
+        if UploadId not in self.uploads:
+            raise client_error('NoSuchUpload', 'CompleteMultipartUpload')
+        parts = self.uploads.pop(UploadId)
+        numbers = [p['PartNumber'] for p in MultipartUpload['Parts']]
+        body = b''.join(parts[n] for n in numbers)
+        etag = f'"{hashlib.md5(body).hexdigest()}-{len(numbers)}"'
+        self._store(Bucket, Key, body, etag, Metadata={}, **parts['attributes'])
+        if Key.startswith(self.sink_prefixes):
+            self.objects[(Bucket, Key)]['Size'] = sum(parts['sizes'][n] for n in numbers)
+        return {'ETag': etag}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        count('s3.abort_multipart_upload')
+        self.uploads.pop(UploadId, None)
+
+    def delete_objects(self, Bucket, Delete):
+        count('s3.delete_objects')
+        for obj in Delete['Objects']:
+            self.objects.pop((Bucket, obj['Key']), None)
+
+    def list_objects_v2(self, Bucket, Prefix='', MaxKeys=1000, ContinuationToken=None, **kwargs):
+        count('s3.list_objects_v2')
+        keys = sorted(k for (b, k) in self.objects if b == Bucket and k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response = {'Contents': [{
+            'Key': k,
+            'Size': self.objects[(Bucket, k)]['Size'],
+            'LastModified': self.objects[(Bucket, k)]['LastModified'],
+            'ETag': self.objects[(Bucket, k)]['ETag'],
+            'StorageClass': 'STANDARD'
+        } for k in page], 'KeyCount': len(page)}
+        if start + MaxKeys < len(keys):
+            response.update(IsTruncated=True, NextContinuationToken=str(start + MaxKeys))
+        return response
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600, **kwargs):
+        count('s3.generate_presigned_url')
+        # Request parameters other than the object travel in the query, uploadId and partNumber as in real URLs
+        query = {k[0].lower() + k[1:]: v for k, v in Params.items() if k not in ('Bucket', 'Key')}
+        query = urllib.parse.urlencode(dict(query, method=ClientMethod))
+        return f"https://fake-s3.local/{Params.get('Bucket')}/{Params.get('Key')}?{query}"
+
+
+class FakeSQS:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        count('sqs.send_message')
+        self.messages.append(dict(kwargs, QueueUrl=QueueUrl, MessageBody=MessageBody))
+        return {'MessageId': str(len(self.messages))}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        count('sqs.send_message_batch')
+        for entry in Entries:
+            self.messages.append(dict(entry, QueueUrl=QueueUrl))
+        return {'Successful': [{'Id': e['Id'], 'MessageId': e['Id']} for e in Entries], 'Failed': []}
+
+
+class FakeTranslate:
+    """TranslateText with configurable latency, throttling and failure rate.
+
+    The translation is the input with every line prefixed by the target
+    language, which keeps line counts intact like the real service.
+    """
+
+    def __init__(self, latency_ms=0.0, throttle_rate=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency_ms / 1000.0
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode, **kwargs):
+        count('translate.translate_text')
+        count('translate.bytes', len(Text.encode('utf-8')))
+        with _lock:
+            roll = self.random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if roll < self.throttle_rate:
+            count('translate.throttled')
+            raise client_error('ThrottlingException', 'TranslateText', 'Rate exceeded')
+        if roll < self.throttle_rate + self.failure_rate:
+            count('translate.failed')
+            raise client_error('InternalServerException', 'TranslateText', 'Injected failure')
+        prefix = f"[{TargetLanguageCode}]"
+        return {
+            'TranslatedText': '\n'.join(prefix + line for line in Text.split('\n')),
+            'SourceLanguageCode': 'en' if SourceLanguageCode == 'auto' else SourceLanguageCode,
+            'TargetLanguageCode': TargetLanguageCode
+        }
+
+
+class FakeComprehend:
+    def detect_dominant_language(self, Text):
+        count('comprehend.detect_dominant_language')
+        return {'Languages': [{'LanguageCode': 'en', 'Score': 0.99}]}
+
+    def batch_detect_dominant_language(self, TextList):
+        count('comprehend.batch_detect_dominant_language')
+        return {
+            'ResultList': [{'Index': i, 'Languages': [{'LanguageCode': 'en', 'Score': 0.99}]} for i in range(len(TextList))],
+            'ErrorList': []
+        }
+
+
+class FakeCloudWatch:
+    def put_metric_data(self, **kwargs):
+        count('cloudwatch.put_metric_data')
+
+
+_TOKEN = re.compile(r'#?\w+(?:\.#?\w+)*')
+
+def _split_top_level(text):
+    """Split on commas that are not inside parentheses"""
+    parts, depth, current = [], 0, ''
+    for ch in text:
+        if ch == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        depth += ch == '('
+        depth -= ch == ')'
+        current += ch
+    if current.strip():
+        parts.append(current)
+    return [p.strip() for p in parts]
+
+def _clauses(expression):
+    """Break an UpdateExpression into its SET / ADD / REMOVE clauses"""
+    clauses = {}
+    for match in re.finditer(r'\b(SET|ADD|REMOVE|DELETE)\b(.*?)(?=\b(?:SET|ADD|REMOVE|DELETE)\b|$)', expression, re.S):
+        clauses.setdefault(match.group(1), []).extend(_split_top_level(match.group(2)))
+    return clauses
+
+
+class FakeTable:
+    """A DynamoDB table supporting the expression subset the functions use"""
+
+    def __init__(self, name, key_names):
+        self.name = name
+        self.key_names = key_names
+        self.items = {}
+        # Conditional writes are atomic, as in DynamoDB
+        self.lock = threading.Lock()
+
+    def _key(self, key):
+        return tuple(key.get(k) for k in self.key_names)
+
+    def _path(self, path, names):
+        return [names.get(part, part) for part in path.split('.')]
+
+    def _resolve(self, item, path):
+        for part in path[:-1]:
+            item = item.setdefault(part, {})
+        return item, path[-1]
+
+    def _lookup(self, item, path):
+        for part in path:
+            if not isinstance(item, dict) or part not in item:
+                return None
+            item = item[part]
+        return item
+
+    def _check(self, item, condition, names, values):
+        for func, path in re.findall(r'(attribute_not_exists|attribute_exists)\(\s*([#\w.]+)\s*\)', condition or ''):
+            present = self._lookup(item, self._path(path, names)) is not None
+            if present == (func == 'attribute_not_exists'):
+                raise client_error('ConditionalCheckFailedException', 'UpdateItem', 'The conditional request failed')
+        for path, op, value in re.findall(r'([#\w.]+)\s*(=|<>|<=|>=|<|>)\s*(:\w+)', condition or ''):
+            current = self._lookup(item, self._path(path, names))
+            expected = values[value]
+            ok = {
+                '=': lambda a, b: a == b, '<>': lambda a, b: a != b,
+                '<': lambda a, b: a is not None and a < b, '<=': lambda a, b: a is not None and a <= b,
+                '>': lambda a, b: a is not None and a > b, '>=': lambda a, b: a is not None and a >= b
+            }[op](current, expected)
+            if not ok:
+                raise client_error('ConditionalCheckFailedException', 'UpdateItem', 'The conditional request failed')
+
+    def _value(self, item, expression, names, values):
+        expression = expression.strip()
+        match = re.fullmatch(r'if_not_exists\(\s*([#\w.]+)\s*,\s*(:\w+)\s*\)', expression)
+        if match:
+            current = self._lookup(item, self._path(match.group(1), names))
+            return current if current is not None else copy.deepcopy(values[match.group(2)])
+        match = re.fullmatch(r'([#\w.]+|:\w+)\s*([+-])\s*([#\w.]+|:\w+)', expression)
+        if match:
+            left = self._value(item, match.group(1), names, values) or 0
+            right = self._value(item, match.group(3), names, values) or 0
+            return left + right if match.group(2) == '+' else left - right
+        if expression.startswith(':'):
+            return copy.deepcopy(values[expression])
+        return self._lookup(item, self._path(expression, names))
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        count('dynamodb.put_item')
+        key = self._key(Item)
+        with self.lock:
+            self._check(self.items.get(key, {}), ConditionExpression, ExpressionAttributeNames or {}, ExpressionAttributeValues or {})
+            self.items[key] = copy.deepcopy(Item)
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        count('dynamodb.get_item')
+        item = self.items.get(self._key(Key))
+        return {'Item': copy.deepcopy(item)} if item else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                    ConditionExpression=None, ReturnValues='NONE', **kwargs):
+        count('dynamodb.update_item')
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        key = self._key(Key)
+        current = self.items.get(key, {})
+        self._check(current, ConditionExpression, names, values)
+
+        item = copy.deepcopy(current) or copy.deepcopy(Key)
+        clauses = _clauses(UpdateExpression)
+        for assignment in clauses.get('SET', []):
+            path, expression = assignment.split('=', 1)
+            target, name = self._resolve(item, self._path(path.strip(), names))
+            target[name] = self._value(item, expression, names, values)
+        for action in clauses.get('ADD', []):
+            path, value = action.split()
+            target, name = self._resolve(item, self._path(path, names))
+            value = values[value]
+            if isinstance(value, set):
+                target[name] = set(target.get(name, set())) | value
+            else:
+                target[name] = target.get(name, 0) + value
+        for action in clauses.get('DELETE', []):
+            path, value = action.split()
+            target, name = self._resolve(item, self._path(path, names))
+            target[name] = set(target.get(name, set())) - values[value]
+        for path in clauses.get('REMOVE', []):
+            target, name = self._resolve(item, self._path(path, names))
+            target.pop(name, None)
+        self.items[key] = item
+
+        if ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+            return {'Attributes': copy.deepcopy(item)}
+        return {}
+
+    def _matches(self, item, condition, names, values):
+        try:
+            self._check(item, condition, names, values)
+        except ClientError:
+            return False
+        return True
+
+    # Operators of boto3.dynamodb.conditions key conditions, by stub method name and by real expression operator
+    KEY_OPERATORS = {
+        'eq': lambda a, b: a == b, '=': lambda a, b: a == b,
+        'lt': lambda a, b: a < b, '<': lambda a, b: a < b,
+        'lte': lambda a, b: a <= b, '<=': lambda a, b: a <= b,
+        'gt': lambda a, b: a > b, '>': lambda a, b: a > b,
+        'gte': lambda a, b: a >= b, '>=': lambda a, b: a >= b,
+        'begins_with': lambda a, b: a.startswith(b)
+    }
+
+    def _satisfies(self, item, condition):
+        """Evaluate a key condition built with Key(...) from boto3 or the stub modules"""
+        if hasattr(condition, 'get_expression'):
+            expression = condition.get_expression()
+            op, args = expression['operator'], expression['values']
+            if op != 'AND':
+                args = (args[0].name,) + tuple(args[1:])
+        else:
+            op, *args = condition.parts
+        if op in ('and', 'AND'):
+            return all(self._satisfies(item, part) for part in args)
+        current = item.get(args[0])
+        return current is not None and self.KEY_OPERATORS[op](current, *args[1:])
+
+    def _condition_names(self, condition):
+        """Attributes a Key(...) condition reads, which are the keys of the index it queries"""
+        if hasattr(condition, 'get_expression'):
+            expression = condition.get_expression()
+            op, args = expression['operator'], expression['values']
+            if op != 'AND':
+                return [args[0].name]
+        else:
+            op, *args = condition.parts
+            if op != 'and':
+                return [args[0]]
+        return [name for part in args for name in self._condition_names(part)]
+
+    def query(self, KeyConditionExpression=None, Limit=None, ExpressionAttributeNames=None,
+              ExpressionAttributeValues=None, ScanIndexForward=True, ExclusiveStartKey=None, **kwargs):
+        count('dynamodb.query')
+        items = list(self.items.values())
+        if isinstance(KeyConditionExpression, str):
+            # Insertion order stands in for the sort key
+            items = [i for i in items if self._matches(
+                i, KeyConditionExpression, ExpressionAttributeNames or {}, ExpressionAttributeValues or {}
+            )]
+        elif KeyConditionExpression is not None:
+            items = [i for i in items if self._satisfies(i, KeyConditionExpression)]
+        if not ScanIndexForward:
+            items.reverse()
+        if ExclusiveStartKey:
+            # The page picks up after the item the previous one ended on
+            start = self._key(ExclusiveStartKey)
+            positions = [n for n, i in enumerate(items) if self._key(i) == start]
+            items = items[positions[0] + 1:] if positions else []
+        items = [copy.deepcopy(i) for i in items]
+        response = {'Items': items[:Limit] if Limit else items}
+        if Limit and len(items) > Limit:
+            names = set(self.key_names)
+            if KeyConditionExpression is not None and not isinstance(KeyConditionExpression, str):
+                names.update(self._condition_names(KeyConditionExpression))
+            response['LastEvaluatedKey'] = {k: items[Limit - 1][k] for k in names if k in items[Limit - 1]}
+        return response
+
+    def scan(self, **kwargs):
+        count('dynamodb.scan')
+        return {'Items': [copy.deepcopy(i) for i in self.items.values()]}
+
+    def delete_item(self, Key, **kwargs):
+        count('dynamodb.delete_item')
+        self.items.pop(self._key(Key), None)
+        return {}
+
+    def batch_writer(self, **kwargs):
+        table = self
+
+        class BatchWriter:
+            """Counts one BatchWriteItem per 25 buffered requests, as boto3 sends them"""
+
+            def __init__(self):
+                self.buffered = 0
+
+            def _buffer(self):
+                self.buffered += 1
+                if self.buffered == 25:
+                    self._flush()
+
+            def _flush(self):
+                if self.buffered:
+                    count('dynamodb.batch_write_item')
+                    self.buffered = 0
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self._flush()
+                return False
+
+            def put_item(self, Item):
+                table.items[table._key(Item)] = copy.deepcopy(Item)
+                self._buffer()
+
+            def delete_item(self, Key):
+                table.items.pop(table._key(Key), None)
+                self._buffer()
+
+        return BatchWriter()
+
+
+class FakeDynamoDB:
+    """Serves both boto3.resource('dynamodb') and boto3.client('dynamodb')"""
+
+    # Key schema of the tables the functions touch; anything else keys on its first attribute
+    KEY_SCHEMA = {
+        'TranslationMetadata': ('file_id', 'timestamp'),
+        'TranslationCache': ('cache_key',),
+        'TranslateRateLimit': ('bucket_id',),
+        'ApiKeyMetadata': ('user_id',)
+    }
+
+    def __init__(self):
+        self.tables = {}
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name, self.KEY_SCHEMA.get(name, ('id',)))
+        return self.tables[name]
+
+    @property
+    def meta(self):
+        return types.SimpleNamespace(client=self)
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        count('dynamodb.batch_get_item')
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            responses[name] = [
+                copy.deepcopy(table.items[table._key(k)]) for k in request['Keys'] if table._key(k) in table.items
+            ]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        count('dynamodb.batch_write_item')
+        for name, requests in RequestItems.items():
+            table = self.Table(name)
+            for request in requests:
+                if 'PutRequest' in request:
+                    item = request['PutRequest']['Item']
+                    table.items[table._key(item)] = copy.deepcopy(item)
+                else:
+                    table.items.pop(table._key(request['DeleteRequest']['Key']), None)
+        return {'UnprocessedItems': {}}
+
+
+class FakeAWS:
+    """One set of service fakes shared by every client created while installed"""
+
+    def __init__(self, latency_ms=0.0, throttle_rate=0.0, failure_rate=0.0, seed=0, sink_prefixes=()):
+        self.s3 = FakeS3(sink_prefixes)
+        self.sqs = FakeSQS()
+        self.dynamodb = FakeDynamoDB()
+        self.translate = FakeTranslate(latency_ms, throttle_rate, failure_rate, seed)
+        self.comprehend = FakeComprehend()
+        self.cloudwatch = FakeCloudWatch()
+
+    def client(self, name, *args, **kwargs):
+        return getattr(self, name)
+
+    def resource(self, name, *args, **kwargs):
+        return getattr(self, name)
+
+
+def _stub_modules():
+    """Minimal boto3/botocore modules for machines without the AWS SDK"""
+    boto3 = types.ModuleType('boto3')
+    dynamodb = types.ModuleType('boto3.dynamodb')
+    conditions = types.ModuleType('boto3.dynamodb.conditions')
+
+    class Condition:
+        def __init__(self, *parts):
+            self.parts = parts
+
+        def __and__(self, other):
+            return Condition('and', self, other)
+
+    class Key:
+        def __init__(self, name):
+            self.name = name
+
+        def __getattr__(self, op):
+            return lambda *values: Condition(op, self.name, *values)
+
+    conditions.Key = Key
+    conditions.Attr = Key
+    dynamodb.conditions = conditions
+    boto3.dynamodb = dynamodb
+
+    botocore = types.ModuleType('botocore')
+    exceptions = types.ModuleType('botocore.exceptions')
+    exceptions.ClientError = ClientError
+    exceptions.BotoCoreError = BotoCoreError
+    exceptions.ConnectionError = EndpointConnectionError
+    exceptions.HTTPClientError = HTTPClientError
+    config = types.ModuleType('botocore.config')
+    config.Config = lambda **kwargs: kwargs
+    botocore.exceptions = exceptions
+    botocore.config = config
+
+    sys.modules.update({
+        'boto3': boto3,
+        'boto3.dynamodb': dynamodb,
+        'boto3.dynamodb.conditions': conditions,
+        'botocore': botocore,
+        'botocore.exceptions': exceptions,
+        'botocore.config': config
+    })
+    return boto3
+
+def install(aws):
+    """Route boto3.client / boto3.resource to aws"""
+    try:
+        import boto3
+    except ImportError:
+        boto3 = _stub_modules()
+    boto3.client = aws.client
+    boto3.resource = aws.resource
+    STATS.clear()
+    return aws
@@ -0,0 +1,241 @@
+"""Offline throughput benchmarks for the translation pipeline.
+
+Runs the real Lambda code against the in-memory stand-ins in fakes.py:
+
+  content    TranslationService._translate_csv_content on the CSV text
+  processor  upload handler process_file_upload (shard planning, metadata,
+             queueing) followed by translation_processor.lambda_handler for
+             every queued message, redelivering failed records like SQS does
+
+Each case reports rows/s, MB/s, AWS calls per job and peak traced memory.
+Results are written as JSON; pass a previous file with --compare to print the
+change of every metric.
+
+    python benchmarks/run_benchmarks.py --sizes 1KB,1MB,50MB --duplication 0.5
+    python benchmarks/run_benchmarks.py --compare benchmark_results.json
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fakes
+from datagen import generate_csv, parse_size, format_size
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+LAMBDA_DIR = REPO_ROOT / 'lambda_functions'
+# Contents of the common layer, found under /opt/python in Lambda
+COMMON_LAYER_DIR = REPO_ROOT / 'lambda_layers' / 'common' / 'python'
+sys.path.insert(0, str(COMMON_LAYER_DIR))
+
+INPUT_BUCKET = 'bench-input'
+OUTPUT_BUCKET = 'bench-output'
+
+# Receive attempts before a message would go to the dead-letter queue
+MAX_RECEIVES = 3
+
+# Queue batch size of the processor's event source mapping
+SQS_BATCH_SIZE = 10
+
+# Metrics where a higher value is better; everything else is better lower
+HIGHER_IS_BETTER = {'rows_per_sec', 'mb_per_sec'}
+
+_loaded = Counter()
+
+def load_lambda(name):
+    """Import a fresh copy of a Lambda's main.py so module-level state starts cold"""
+    _loaded[name] += 1
+    # The shared module keeps metrics and reads configuration at import, so it starts cold too
+    sys.modules.pop('translation_common', None)
+    spec = importlib.util.spec_from_file_location(f"bench_{name}_{_loaded[name]}", LAMBDA_DIR / name / 'main.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def configure_environment(args):
+    os.environ.update({
+        'METADATA_TABLE': 'TranslationMetadata',
+        'INPUT_BUCKET': INPUT_BUCKET,
+        'OUTPUT_BUCKET': OUTPUT_BUCKET,
+        'SQS_QUEUE_URL': 'bench-queue',
+        'TARGET_LANGS': args.langs,
+        'AWS_DEFAULT_REGION': 'us-east-1'
+    })
+    if args.cache_table:
+        os.environ['CACHE_TABLE'] = 'TranslationCache'
+    else:
+        os.environ.pop('CACHE_TABLE', None)
+
+def run_content(aws, payload, args):
+    service = load_lambda('translation_upload_handler').TranslationService()
+    text = payload.decode('utf-8')
+    started = time.perf_counter()
+    service._translate_csv_content(text)
+    return time.perf_counter() - started, 0
+
+def run_processor(aws, payload, args):
+    handler = load_lambda('translation_upload_handler').TranslationService()
+    processor = load_lambda('translation_processor')
+    etag = aws.s3.put_object(Bucket=INPUT_BUCKET, Key='bench/input.csv', Body=payload)['ETag']
+    fakes.STATS.clear()
+
+    started = time.perf_counter()
+    # Size and ETag come with the S3 event
+    handler.process_file_upload(
+        INPUT_BUCKET, 'bench/input.csv', 'bench-user', 'bench@example.com', size=len(payload), etag=etag
+    )
+
+    pending = [
+        {'messageId': str(i), 'body': message['MessageBody'], 'receives': 0}
+        for i, message in enumerate(aws.sqs.messages)
+    ]
+    aws.sqs.messages.clear()
+    dead_letters = 0
+    while pending:
+        batch, pending = pending[:SQS_BATCH_SIZE], pending[SQS_BATCH_SIZE:]
+        for record in batch:
+            record['receives'] += 1
+        response = processor.lambda_handler({'Records': batch}, None)
+        failed = {f['itemIdentifier'] for f in response['batchItemFailures']}
+        for record in batch:
+            if record['messageId'] not in failed:
+                continue
+            if record['receives'] < MAX_RECEIVES:
+                pending.append(record)
+            else:
+                dead_letters += 1
+    return time.perf_counter() - started, dead_letters
+
+SCENARIOS = {
+    'content': run_content,
+    'processor': run_processor
+}
+
+def run_case(scenario, size, args, trace_memory):
+    aws = fakes.install(fakes.FakeAWS(
+        args.latency_ms, args.throttle_rate, args.failure_rate, args.seed, sink_prefixes=('translated/',)
+    ))
+    payload, rows = generate_csv(size, args.duplication, args.seed)
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        seconds, dead_letters = SCENARIOS[scenario](aws, payload, args)
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    stats = dict(fakes.STATS)
+    metadata = next(iter(aws.dynamodb.Table('TranslationMetadata').items.values()), {})
+    return {
+        'scenario': scenario,
+        'size': format_size(size),
+        'bytes': len(payload),
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'rows_per_sec': round(rows / seconds, 1) if seconds else None,
+        'mb_per_sec': round(len(payload) / 1024 ** 2 / seconds, 3) if seconds else None,
+        'peak_memory_mb': round(peak / 1024 ** 2, 2) if peak is not None else None,
+        'status': metadata.get('status', 'COMPLETED' if scenario == 'content' else None),
+        'dead_letters': dead_letters,
+        'translate_calls': stats.get('translate.translate_text', 0),
+        'translate_mb': round(stats.get('translate.bytes', 0) / 1024 ** 2, 3),
+        'throttled': stats.get('translate.throttled', 0),
+        's3_calls': sum(v for k, v in stats.items() if k.startswith('s3.')),
+        'dynamodb_calls': sum(v for k, v in stats.items() if k.startswith('dynamodb.')),
+        'sqs_calls': sum(v for k, v in stats.items() if k.startswith('sqs.')),
+        'calls': stats
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+COLUMNS = ('scenario', 'size', 'rows', 'seconds', 'rows_per_sec', 'mb_per_sec', 'peak_memory_mb',
+           'translate_calls', 's3_calls', 'dynamodb_calls', 'status')
+
+def format_change(metric, value, previous):
+    if not isinstance(value, (int, float)) or not isinstance(previous, (int, float)) or not previous:
+        return ''
+    change = (value - previous) / previous * 100
+    better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+    return f" ({change:+.1f}%{'' if abs(change) < 1 else ' better' if better else ' worse'})"
+
+def print_report(results, baseline=None):
+    previous = {(r['scenario'], r['size']): r for r in (baseline or {}).get('results', [])}
+    for result in results:
+        before = previous.get((result['scenario'], result['size']), {})
+        print(f"{result['scenario']} {result['size']}")
+        for column in COLUMNS[2:]:
+            print(f"  {column:<16} {result[column]}{format_change(column, result[column], before.get(column))}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scenarios', default='content,processor', help='comma-separated: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--sizes', default='1KB,1MB,10MB', help='comma-separated input sizes, e.g. 1KB,5MB,250MB')
+    parser.add_argument('--duplication', type=float, default=0.5, help='probability a text cell repeats an earlier one')
+    parser.add_argument('--langs', default='es', help='comma-separated target languages')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='fake TranslateText latency per call')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of calls answered with ThrottlingException')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of calls failing with a server error')
+    parser.add_argument('--no-cache-table', dest='cache_table', action='store_false', help='run without the DynamoDB cache tier')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the traced pass that measures peak memory')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the JSON report')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    configure_environment(args)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Lambda logging is noise here; the report is the output
+    results = []
+    real_stdout = sys.stdout
+    for scenario in scenarios:
+        for size in sizes:
+            print(f"Running {scenario} {format_size(size)}...", file=sys.stderr)
+            sys.stdout = open(os.devnull, 'w')
+            try:
+                result = run_case(scenario, size, args, trace_memory=False)
+                if args.memory:
+                    # Tracing slows allocation-heavy code, so peak memory comes from a separate pass
+                    result['peak_memory_mb'] = run_case(scenario, size, args, trace_memory=True)['peak_memory_mb']
+            finally:
+                sys.stdout.close()
+                sys.stdout = real_stdout
+            results.append(result)
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'options': vars(args),
+        'results': results
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print_report(results, baseline)
+    print(f"\nReport written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -69,11 +69,50 @@ def build_response(status_code, body):
         'headers': {
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-            'Access-Control-Allow-Methods': 'POST,GET,OPTIONS'
+            'Access-Control-Allow-Methods': 'POST,GET,DELETE,OPTIONS'
         },
         'body': json.dumps(body) if isinstance(body, dict) else body
     }
 
+def is_key_usable(item):
+    """An API key is usable while it is active and not past its expiry"""
+    if not item.get('is_active', True):
+        return False
+    expires_at = item.get('expires_at')
+    return not expires_at or datetime.fromisoformat(expires_at) > datetime.now()
+
+def revoke_api_key(table, user_id):
+    """Disable the user's key in API Gateway and mark it inactive.
+
+    API Gateway rejects a disabled key straight away; upload handler containers
+    re-check cached keys against this item every few seconds and drop it then.
+    """
+    response = table.get_item(Key={'user_id': user_id})
+    item = response.get('Item')
+    if not item or not item.get('is_active', True):
+        return build_response(404, {'error': 'No active API key found'})
+
+    try:
+        apigateway.update_api_key(
+            apiKey=item['api_key_id'],
+            patchOperations=[{'op': 'replace', 'path': '/enabled', 'value': 'false'}]
+        )
+        table.update_item(
+            Key={'user_id': user_id},
+            UpdateExpression='SET is_active = :inactive, revoked_at = :now',
+            ExpressionAttributeValues={
+                ':inactive': False,
+                ':now': datetime.now().isoformat()
+            }
+        )
+    except Exception as e:
+        return build_response(500, {'error': f'Error revoking API key: {str(e)}'})
+
+    return build_response(200, {
+        'message': 'API key revoked',
+        'user_email': item['user_email']
+    })
+
 def lambda_handler(event, context):
     # Initialize DynamoDB table
     table = dynamodb.Table(API_KEY_TABLE_NAME)
@@ -86,9 +125,12 @@ def lambda_handler(event, context):
     except KeyError as e:
         return build_response(400, {'error': f'Missing user information: {str(e)}'})
 
-    # Check for existing key
+    if event.get('httpMethod') == 'DELETE':
+        return revoke_api_key(table, user_id)
+
+    # Check for existing key; revoked or expired keys are replaced
     response = table.get_item(Key={'user_id': user_id})
-    if 'Item' in response:
+    if 'Item' in response and is_key_usable(response['Item']):
         return build_response(200, {
             'message': 'Existing API key found',
             'api_key': response['Item']['api_key'],
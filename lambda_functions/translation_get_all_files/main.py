@@ -1,13 +1,106 @@
 import json
 import boto3
 import os
+import base64
 import traceback
 from datetime import datetime, timedelta
 
 # Initialize the S3 client
 s3 = boto3.client('s3')
 
-BUCKET_NAME = os.environ['BUCKET_NAME']
+BUCKET_NAME = os.environ.get('BUCKET_NAME') or os.environ['OUTPUT_BUCKET']
+
+# Translated files are written under OUTPUT_PREFIX/YYYY/MM/DD/
+OUTPUT_PREFIX = os.environ.get('OUTPUT_PREFIX', 'translated/')
+
+# Outputs written before the day partitions sit at the bucket root as translated_*
+LEGACY_OUTPUT_PREFIX = 'translated_'
+
+# Page size of the listing, overridable per request with ?limit=
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '1000'))
+
+# Suffixes of the CSV, JSON Lines and Parquet outputs
+OUTPUT_SUFFIXES = ('.csv', '.jsonl', '.parquet')
+
+def encode_cursor(state):
+    """Opaque pagination cursor from the listing position"""
+    return base64.urlsafe_b64encode(json.dumps(state).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if not isinstance(state, dict) or 'prefix' not in state:
+        raise ValueError("Invalid cursor")
+    return state
+
+def partition_prefixes(time_threshold):
+    """Prefixes to read, oldest first: the legacy root outputs, then the day partitions.
+
+    Without a time window the whole output prefix stands in for the partitions.
+    """
+    legacy = [] if LEGACY_OUTPUT_PREFIX.startswith(OUTPUT_PREFIX) else [LEGACY_OUTPUT_PREFIX]
+    if not time_threshold:
+        return legacy + [OUTPUT_PREFIX]
+    day = time_threshold.date()
+    today = datetime.now().date()
+    prefixes = []
+    while day <= today:
+        prefixes.append(f"{OUTPUT_PREFIX}{day:%Y/%m/%d}/")
+        day += timedelta(days=1)
+    # Legacy objects are filtered by their LastModified like those of the oldest partition
+    return legacy + prefixes
+
+def list_page(prefixes, page_size, time_threshold, position=None):
+    """Collect up to page_size CSV objects from the partitions, resuming at position.
+
+    Returns the objects and the position to resume from, or None once every
+    partition has been read.
+    """
+    position = position or {'prefix': prefixes[0]}
+    if position['prefix'] not in prefixes:
+        raise ValueError("Cursor does not match the requested time window")
+    remaining = prefixes[prefixes.index(position['prefix']):]
+    token = position.get('token')
+    csv_files = []
+
+    while remaining and len(csv_files) < page_size:
+        prefix = remaining[0]
+        request = {'Bucket': BUCKET_NAME, 'Prefix': prefix, 'MaxKeys': page_size - len(csv_files)}
+        if token:
+            request['ContinuationToken'] = token
+        response = s3.list_objects_v2(**request)
+
+        for obj in response.get('Contents', []):
+            # Filter for translated files in any output format
+            if not obj['Key'].lower().endswith(OUTPUT_SUFFIXES):
+                continue
+
+            # Only the legacy outputs and the oldest partition straddle the window boundary
+            if time_threshold and obj['LastModified'].replace(tzinfo=None) < time_threshold:
+                continue
+
+            # Collect file metadata
+            csv_files.append({
+                "fileName": obj['Key'],
+                "lastModified": obj['LastModified'].isoformat(),
+                "size": obj['Size'],
+                "storageClass": obj.get('StorageClass', 'STANDARD'),
+                "etag": obj['ETag'].strip('"')
+            })
+
+        if response.get('IsTruncated'):
+            token = response['NextContinuationToken']
+        else:
+            remaining = remaining[1:]
+            token = None
+
+    if not remaining:
+        return csv_files, None
+    return csv_files, {'prefix': remaining[0], 'token': token}
 
 def lambda_handler(event, context):
     """
@@ -15,9 +108,9 @@ def lambda_handler(event, context):
     
     This function:
     - Handles CORS preflight OPTIONS requests
-    - Lists CSV objects from the specified S3 bucket
-    - Optionally filters by last modified time
-    - Returns the CSV file metadata in a JSON response
+    - Lists CSV objects from the day-partitioned output prefix, one page per call
+    - Optionally restricts the listing to the partitions covering the last 'hours'
+    - Returns the CSV file metadata and a cursor for the next page in a JSON response
     - Includes comprehensive error handling
     
     Args:
@@ -46,42 +139,31 @@ def lambda_handler(event, context):
 
     try:
         # Parse query parameters if provided
-        query_params = event.get('queryStringParameters', {})
-        
-        # Calculate time threshold if 'hours' parameter is provided
-        hours_threshold = int(query_params.get('hours', 0))
-        time_threshold = datetime.now() - timedelta(hours=hours_threshold) if hours_threshold else None
-        
-        print(f"Listing CSV files from bucket: {BUCKET_NAME}")
-        if time_threshold:
-            print(f"Filtering files modified in last {hours_threshold} hours")
-        
-        # List objects in the S3 bucket
-        response = s3.list_objects_v2(
-            Bucket=BUCKET_NAME,
-            MaxKeys=100  # Increase limit for CSV files
-        )
-        
-        # Process the files
-        csv_files = []
-        for obj in response.get('Contents', []):
-            # Filter for CSV files
-            if not obj['Key'].lower().endswith('.csv'):
-                continue
-                
-            # Apply time filter if requested
-            if time_threshold and obj['LastModified'].replace(tzinfo=None) < time_threshold:
-                continue
-                
-            # Collect file metadata
-            csv_files.append({
-                "fileName": obj['Key'],
-                "lastModified": obj['LastModified'].isoformat(),
-                "size": obj['Size'],
-                "storageClass": obj['StorageClass'],
-                "etag": obj['ETag'].strip('"')
-            })
-        
+        query_params = event.get('queryStringParameters') or {}
+
+        try:
+            # Calculate time threshold if 'hours' parameter is provided
+            hours_threshold = int(query_params.get('hours', 0))
+            time_threshold = datetime.now() - timedelta(hours=hours_threshold) if hours_threshold else None
+            page_size = min(MAX_PAGE_SIZE, max(1, int(query_params.get('limit', DEFAULT_PAGE_SIZE))))
+            prefixes = partition_prefixes(time_threshold)
+            position = decode_cursor(query_params['cursor']) if query_params.get('cursor') else None
+
+            print(f"Listing CSV files from bucket: {BUCKET_NAME}")
+            if time_threshold:
+                print(f"Reading {len(prefixes)} day partitions for files modified in last {hours_threshold} hours")
+
+            csv_files, next_position = list_page(prefixes, page_size, time_threshold, position)
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({
+                    "error": "Invalid query parameters",
+                    "details": str(e)
+                })
+            }
+
         print(f"Found {len(csv_files)} CSV files matching criteria")
         
         # Successful response
@@ -91,7 +173,8 @@ def lambda_handler(event, context):
             "body": json.dumps({
                 "csvFiles": csv_files,
                 "count": len(csv_files),
-                "bucket": BUCKET_NAME
+                "bucket": BUCKET_NAME,
+                "nextCursor": encode_cursor(next_position) if next_position else None
             })
         }
 
@@ -106,4 +189,4 @@ def lambda_handler(event, context):
                 "error": "Failed to load CSV files",
                 "details": str(e)
             })
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,158 @@
+import json
+import boto3
+import os
+import hashlib
+import traceback
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+
+dynamodb = boto3.resource('dynamodb')
+table = dynamodb.Table(os.environ['METADATA_TABLE'])
+
+# Only the attributes the status response needs are read from the metadata item
+PROJECTED_ATTRIBUTES = {
+    '#file_id': 'file_id',
+    '#timestamp': 'timestamp',
+    '#email': 'email',
+    '#status': 'status',
+    '#error': 'error',
+    '#rows_done': 'rows_done',
+    '#rows_total': 'rows_total',
+    '#rows_total_estimated': 'rows_total_estimated',
+    '#shard_count': 'shard_count',
+    '#completed_shards': 'completed_shards',
+    '#languages': 'languages',
+    '#translated_file': 'translated_file'
+}
+
+# CORS headers configuration
+HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization, If-None-Match",
+    "Access-Control-Allow-Methods": "GET, OPTIONS",
+    "Access-Control-Expose-Headers": "ETag"
+}
+
+def to_json(value):
+    """Convert DynamoDB values (Decimal, set) into JSON-serialisable ones"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, set)):
+        return [to_json(v) for v in value]
+    return value
+
+def get_header(event, name):
+    """Case-insensitive request header lookup"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+def fetch_job(file_id):
+    """Read the narrow status projection of a job's metadata item"""
+    response = table.query(
+        KeyConditionExpression=Key('file_id').eq(file_id),
+        ProjectionExpression=', '.join(PROJECTED_ATTRIBUTES),
+        ExpressionAttributeNames=PROJECTED_ATTRIBUTES,
+        Limit=1
+    )
+    items = response.get('Items', [])
+    return items[0] if items else None
+
+def job_status(item):
+    """Build the status document returned to clients"""
+    rows_total = to_json(item.get('rows_total'))
+    rows_done = sum(to_json(v) for v in (item.get('rows_done') or {}).values())
+    if rows_total is not None:
+        # Shards redelivered mid-chunk can report a few rows twice
+        rows_done = min(rows_done, rows_total)
+    if item.get('status') == 'COMPLETED' and rows_total is not None:
+        rows_done = rows_total
+
+    return {
+        "fileId": item['file_id'],
+        "status": item.get('status'),
+        "uploadedAt": item.get('timestamp'),
+        "rowsDone": rows_done,
+        "rowsTotal": rows_total,
+        "rowsTotalEstimated": bool(item.get('rows_total_estimated', False)),
+        "progress": round(rows_done / rows_total, 4) if rows_total else None,
+        "shardCount": to_json(item.get('shard_count', 1)),
+        "shardsCompleted": len(item.get('completed_shards') or ()),
+        "languages": to_json(item.get('languages') or {}),
+        "translatedFile": item.get('translated_file'),
+        "error": item.get('error')
+    }
+
+def lambda_handler(event, context):
+    """Return the status and progress of one translation job.
+
+    GET /job_status/{file_id}. The response carries an ETag of its body; a
+    request whose If-None-Match matches gets 304 with no body, so pollers only
+    download a status when it changed.
+    """
+    # Handle CORS preflight OPTIONS request
+    if event.get("httpMethod") == "OPTIONS":
+        return {
+            "statusCode": 200,
+            "headers": HEADERS,
+            "body": json.dumps({"message": "CORS preflight OK"})
+        }
+
+    try:
+        claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
+        user_email = claims.get('email')
+        if not user_email:
+            return {
+                "statusCode": 400,
+                "headers": HEADERS,
+                "body": json.dumps({"error": "Email not found in Cognito claims"})
+            }
+
+        file_id = (event.get('pathParameters') or {}).get('file_id') \
+            or (event.get('queryStringParameters') or {}).get('file_id')
+        if not file_id:
+            return {
+                "statusCode": 400,
+                "headers": HEADERS,
+                "body": json.dumps({"error": "file_id is required"})
+            }
+
+        item = fetch_job(file_id)
+        # Jobs of other users are reported as missing rather than forbidden
+        if not item or item.get('email') != user_email:
+            return {
+                "statusCode": 404,
+                "headers": HEADERS,
+                "body": json.dumps({"error": f"Job {file_id} not found"})
+            }
+
+        body = json.dumps(job_status(item), sort_keys=True)
+        etag = '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+        headers = dict(HEADERS, **{"ETag": etag, "Cache-Control": "no-cache"})
+
+        if_none_match = get_header(event, 'If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip().removeprefix('W/') for t in if_none_match.split(',')]):
+            return {
+                "statusCode": 304,
+                "headers": headers,
+                "body": ""
+            }
+
+        return {
+            "statusCode": 200,
+            "headers": headers,
+            "body": body
+        }
+
+    except Exception as e:
+        print(f"Job status error: {str(e)}")
+        traceback.print_exc()
+        return {
+            "statusCode": 500,
+            "headers": HEADERS,
+            "body": json.dumps({"error": "Failed to load job status", "details": str(e)})
+        }
@@ -1,21 +1,30 @@
 import json
 import boto3
 import os
+import base64
 import traceback
 from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Key
+
+# Debug lines, including the received event, are only logged with LOG_LEVEL=DEBUG
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
 
 def log_debug(message):
     """Helper function for consistent debug logging"""
-    print(f"[DEBUG] {datetime.now().isoformat()} - {message}")
+    if LOG_LEVEL == 'DEBUG':
+        print(f"[DEBUG] {datetime.now().isoformat()} - {message}")
+
+def log_error(message):
+    """Errors are logged at every level"""
+    print(f"[ERROR] {datetime.now().isoformat()} - {message}")
 
 # Initialize clients with debugging
 try:
     log_debug("Initializing AWS clients")
     dynamodb = boto3.resource('dynamodb')
-    s3 = boto3.client('s3')
     log_debug("AWS clients initialized successfully")
 except Exception as e:
-    log_debug(f"Failed to initialize AWS clients: {str(e)}")
+    log_error(f"Failed to initialize AWS clients: {str(e)}")
     raise
 
 # Environment variables with validation
@@ -27,13 +36,57 @@ try:
     log_debug(f"Loaded BUCKET_NAME: {BUCKET_NAME}")
 except KeyError as e:
     error_msg = f"Missing required environment variable: {str(e)}"
-    log_debug(error_msg)
+    log_error(error_msg)
     raise RuntimeError(error_msg)
 except Exception as e:
     error_msg = f"Error loading environment variables: {str(e)}"
-    log_debug(error_msg)
+    log_error(error_msg)
     raise RuntimeError(error_msg)
 
+# Page size of the listing, overridable per request with ?limit=
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '200'))
+
+# Suffixes of the CSV, JSON Lines and Parquet outputs
+OUTPUT_SUFFIXES = ('.csv', '.jsonl', '.parquet')
+
+def encode_cursor(last_evaluated_key):
+    """Opaque pagination cursor from a DynamoDB LastEvaluatedKey"""
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if not isinstance(key, dict) or not {'email', 'file_id', 'timestamp'} <= set(key):
+        raise ValueError("Invalid cursor")
+    return key
+
+def s3_key_from_uri(translated_file):
+    """Strip an s3://bucket/ prefix, if any, from a stored output location"""
+    if f's3://{BUCKET_NAME}/' in translated_file:
+        return translated_file.split(f's3://{BUCKET_NAME}/')[-1]
+    elif translated_file.startswith('s3://'):
+        return translated_file.split('s3://')[-1]
+    return translated_file
+
+def item_outputs(item):
+    """Yield (language, output) pairs for the finished outputs recorded on a metadata item"""
+    languages = item.get('languages') or {}
+    completed = [(lang, out) for lang, out in languages.items() if out.get('status') == 'COMPLETED']
+    if completed:
+        yield from completed
+    elif item.get('translated_file'):
+        # Items written before per-language outputs were recorded
+        yield None, {
+            'translated_file': item['translated_file'],
+            'size': item.get('output_size'),
+            'etag': item.get('output_etag'),
+            'last_modified': item.get('output_last_modified')
+        }
+
 def lambda_handler(event, context):
     # Log the incoming event (redact sensitive info if needed)
     log_debug(f"Received event: {json.dumps({k: v for k, v in event.items() if k != 'requestContext'})}")
@@ -65,7 +118,7 @@ def lambda_handler(event, context):
             
             if not user_email:
                 error_msg = "Email not found in Cognito claims"
-                log_debug(error_msg)
+                log_error(error_msg)
                 return {
                     "statusCode": 400,
                     "headers": headers,
@@ -73,7 +126,7 @@ def lambda_handler(event, context):
                 }
         except Exception as e:
             error_msg = f"Failed to extract user email: {str(e)}"
-            log_debug(error_msg)
+            log_error(error_msg)
             return {
                 "statusCode": 400,
                 "headers": headers,
@@ -91,87 +144,80 @@ def lambda_handler(event, context):
             
             time_threshold = datetime.now() - timedelta(hours=hours_threshold) if hours_threshold else None
             if time_threshold:
-                log_debug(f"Filtering files modified after: {time_threshold.isoformat()}")
+                log_debug(f"Filtering files uploaded after: {time_threshold.isoformat()}")
         except (ValueError, AttributeError) as e:
             log_debug(f"Error parsing query params, defaulting to 0 hours: {str(e)}")
             hours_threshold = 0
             time_threshold = None
 
-        # Query DynamoDB for files by this user
+        try:
+            page_size = min(MAX_PAGE_SIZE, max(1, int(query_params.get('limit', DEFAULT_PAGE_SIZE))))
+            start_key = decode_cursor(query_params['cursor']) if query_params.get('cursor') else None
+            if start_key and start_key['email'] != user_email:
+                raise ValueError("Cursor belongs to another user")
+        except ValueError as e:
+            log_debug(f"Rejecting pagination parameters: {str(e)}")
+            return {
+                "statusCode": 400,
+                "headers": headers,
+                "body": json.dumps({"error": "Invalid pagination parameters", "details": str(e)})
+            }
+
+        # Query one page of this user's files, newest first; the hours filter is a sort key range
         try:
             log_debug(f"Querying DynamoDB table {TABLE_NAME} for user {user_email}")
             table = dynamodb.Table(TABLE_NAME)
-            response = table.query(
-                IndexName='email-index',
-                KeyConditionExpression='email = :email',
-                ExpressionAttributeValues={':email': user_email}
-            )
+            key_condition = Key('email').eq(user_email)
+            if time_threshold:
+                key_condition = key_condition & Key('timestamp').gte(time_threshold.isoformat())
+            query_kwargs = {
+                'IndexName': 'email-index',
+                'KeyConditionExpression': key_condition,
+                'ScanIndexForward': False,
+                'Limit': page_size
+            }
+            if start_key:
+                query_kwargs['ExclusiveStartKey'] = start_key
+            response = table.query(**query_kwargs)
             log_debug(f"DynamoDB returned {len(response.get('Items', []))} items")
         except Exception as e:
             error_msg = f"DynamoDB query failed: {str(e)}"
-            log_debug(error_msg)
+            log_error(error_msg)
             return {
                 "statusCode": 500,
                 "headers": headers,
                 "body": json.dumps({"error": "DynamoDB query failed", "details": str(e)})
             }
 
-        # Process the files
+        # Output size, ETag and timestamps are recorded on the item when a job completes
         csv_files = []
         log_debug("Processing DynamoDB items")
         for item in response.get('Items', []):
             try:
-                translated_file = item.get('translated_file', '')
-                log_debug(f"Processing item with translated_file: {translated_file}")
-                
-                # Skip non-CSV files
-                if not isinstance(translated_file, str) or not translated_file.lower().endswith('.csv'):
-                    log_debug("Skipping non-CSV file")
-                    continue
-                
-                # Extract S3 key safely
-                try:
-                    if f's3://{BUCKET_NAME}/' in translated_file:
-                        s3_key = translated_file.split(f's3://{BUCKET_NAME}/')[-1]
-                    elif translated_file.startswith('s3://'):
-                        s3_key = translated_file.split('s3://')[-1]
-                    else:
-                        s3_key = translated_file
+                for lang, output in item_outputs(item):
+                    translated_file = output.get('translated_file', '')
                     
-                    log_debug(f"Extracted S3 key: {s3_key}")
-                    
-                    # Get file metadata from S3
-                    try:
-                        log_debug(f"Getting S3 object metadata for {s3_key}")
-                        s3_obj = s3.head_object(Bucket=BUCKET_NAME, Key=s3_key)
-                        
-                        # Apply time filter if requested
-                        if time_threshold and s3_obj['LastModified'].replace(tzinfo=None) < time_threshold:
-                            log_debug("File filtered out by time threshold")
-                            continue
-                        
-                        # Format response
-                        file_data = {
-                            "fileName": s3_key,
-                            "lastModified": s3_obj['LastModified'].isoformat(),
-                            "size": s3_obj['ContentLength'],
-                            "storageClass": s3_obj.get('StorageClass', 'STANDARD'),
-                            "etag": s3_obj['ETag'].strip('"')
-                        }
-                        csv_files.append(file_data)
-                        log_debug(f"Added file to response: {json.dumps(file_data)}")
-                        
-                    except s3.exceptions.ClientError as e:
-                        if e.response['Error']['Code'] != '404':
-                            log_debug(f"Error accessing S3 object {s3_key}: {str(e)}")
+                    # Skip files that are not translated outputs
+                    if not isinstance(translated_file, str) or not translated_file.lower().endswith(OUTPUT_SUFFIXES):
+                        log_debug(f"Skipping non-output file: {translated_file}")
                         continue
-                except Exception as e:
-                    log_debug(f"Error processing file {translated_file}: {str(e)}")
-                    continue
+                    
+                    size = output.get('size')
+                    file_data = {
+                        "fileName": s3_key_from_uri(translated_file),
+                        "fileId": item.get('file_id'),
+                        "language": lang,
+                        "lastModified": output.get('last_modified') or item.get('timestamp'),
+                        "size": int(size) if size is not None else None,
+                        "storageClass": "STANDARD",
+                        "etag": output.get('etag')
+                    }
+                    csv_files.append(file_data)
             except Exception as e:
-                log_debug(f"Unexpected error processing item: {str(e)}")
+                log_error(f"Unexpected error processing item: {str(e)}")
                 continue
         
+        next_cursor = encode_cursor(response['LastEvaluatedKey']) if response.get('LastEvaluatedKey') else None
         log_debug(f"Returning {len(csv_files)} CSV files")
         return {
             "statusCode": 200,
@@ -179,13 +225,14 @@ def lambda_handler(event, context):
             "body": json.dumps({
                 "csvFiles": csv_files,
                 "count": len(csv_files),
-                "bucket": BUCKET_NAME
+                "bucket": BUCKET_NAME,
+                "nextCursor": next_cursor
             })
         }
 
     except Exception as e:
         error_msg = f"Unhandled exception: {str(e)}"
-        log_debug(error_msg)
+        log_error(error_msg)
         traceback.print_exc()
         return {
             "statusCode": 500,
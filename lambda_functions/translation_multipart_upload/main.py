@@ -0,0 +1,178 @@
+import json
+import boto3
+import os
+import math
+import uuid
+import traceback
+from urllib.parse import urlencode
+from botocore.exceptions import ClientError
+
+s3 = boto3.client('s3')
+
+INPUT_BUCKET = os.environ['INPUT_BUCKET']
+
+# Uploads land under UPLOAD_PREFIX/<user_id>/ so a user can only complete or abort their own
+UPLOAD_PREFIX = os.environ.get('UPLOAD_PREFIX', 'uploads/')
+
+# Part size grows past the default when a file would otherwise need more than S3's 10,000 parts
+PART_SIZE_BYTES = max(5 * 1024 * 1024, int(os.environ.get('PART_SIZE_BYTES', str(64 * 1024 * 1024))))
+MAX_PARTS = 10000
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(100 * 1024 ** 3)))
+
+# Lifetime of the presigned part URLs; expired ones can be re-signed with action "sign"
+URL_EXPIRES_SECONDS = int(os.environ.get('URL_EXPIRES_SECONDS', '3600'))
+
+# CORS headers configuration
+HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization",
+    "Access-Control-Allow-Methods": "POST, OPTIONS"
+}
+
+def response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": HEADERS,
+        "body": json.dumps(body)
+    }
+
+def part_size_for(size):
+    """Smallest part size, in whole MiB, that fits size into MAX_PARTS parts"""
+    needed = math.ceil(size / MAX_PARTS)
+    return max(PART_SIZE_BYTES, math.ceil(needed / (1024 * 1024)) * 1024 * 1024)
+
+def sign_parts(key, upload_id, part_numbers):
+    """Presigned UploadPart URLs for the given part numbers"""
+    return [
+        {
+            "partNumber": number,
+            "url": s3.generate_presigned_url(
+                'upload_part',
+                Params={'Bucket': INPUT_BUCKET, 'Key': key, 'UploadId': upload_id, 'PartNumber': number},
+                ExpiresIn=URL_EXPIRES_SECONDS
+            )
+        }
+        for number in part_numbers
+    ]
+
+def start_upload(body, user_id, user_email):
+    """Create the multipart upload, tagged with the uploader, and sign a URL per part"""
+    file_name = os.path.basename(str(body.get('file_name') or ''))
+    if not file_name.lower().endswith('.csv'):
+        raise ValueError("file_name must name a .csv file")
+    size = int(body.get('size') or 0)
+    if size <= 0 or size > MAX_UPLOAD_BYTES:
+        raise ValueError(f"size must be between 1 and {MAX_UPLOAD_BYTES} bytes")
+
+    part_size = part_size_for(size)
+    part_count = max(1, math.ceil(size / part_size))
+    key = f"{UPLOAD_PREFIX}{user_id}/{uuid.uuid4()}/{file_name}"
+    # The S3 trigger reads these tags to attribute the job, as it does for single PUT uploads
+    upload_id = s3.create_multipart_upload(
+        Bucket=INPUT_BUCKET,
+        Key=key,
+        ContentType='text/csv',
+        Tagging=urlencode({'user_id': user_id, 'user_email': user_email})
+    )['UploadId']
+    print(f"Started multipart upload of {key} ({size} bytes, {part_count} parts) for {user_email}")
+
+    return {
+        "key": key,
+        "uploadId": upload_id,
+        "partSize": part_size,
+        "partCount": part_count,
+        "expiresIn": URL_EXPIRES_SECONDS,
+        "parts": sign_parts(key, upload_id, range(1, part_count + 1))
+    }
+
+def owned_upload(body, user_id):
+    """Key and upload id of a request, checked to belong to the calling user"""
+    key = body.get('key')
+    upload_id = body.get('upload_id')
+    if not key or not upload_id:
+        raise ValueError("key and upload_id are required")
+    if not key.startswith(f"{UPLOAD_PREFIX}{user_id}/"):
+        raise PermissionError("Upload does not belong to this user")
+    return key, upload_id
+
+def complete_upload(body, user_id):
+    """Assemble the uploaded parts; the ObjectCreated event then queues the translation"""
+    key, upload_id = owned_upload(body, user_id)
+    parts = sorted(
+        ({'PartNumber': int(p['partNumber']), 'ETag': p['etag']} for p in body.get('parts') or []),
+        key=lambda p: p['PartNumber']
+    )
+    if not parts:
+        raise ValueError("parts must list the partNumber and etag of every uploaded part")
+    s3.complete_multipart_upload(
+        Bucket=INPUT_BUCKET,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={'Parts': parts}
+    )
+    print(f"Completed multipart upload of {key} ({len(parts)} parts)")
+    return {"key": key, "status": "UPLOADED"}
+
+def abort_upload(body, user_id):
+    key, upload_id = owned_upload(body, user_id)
+    s3.abort_multipart_upload(Bucket=INPUT_BUCKET, Key=key, UploadId=upload_id)
+    return {"key": key, "status": "ABORTED"}
+
+def lambda_handler(event, context):
+    """Let clients upload large CSV files straight to the input bucket in parallel parts.
+
+    POST /multipart_upload with a JSON body whose "action" is:
+    - "start" (default): file_name and size; returns the key, upload id and a presigned URL per part
+    - "sign": key, upload_id and part_numbers; re-signs URLs that expired
+    - "complete": key, upload_id and parts ([{partNumber, etag}]); finishes the upload
+    - "abort": key and upload_id
+    """
+    # Handle CORS preflight OPTIONS request
+    if event.get("httpMethod") == "OPTIONS":
+        return response(200, {"message": "CORS preflight OK"})
+
+    try:
+        claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
+        user_email = claims.get('email')
+        user_id = claims.get('sub')
+        if not user_email or not user_id:
+            return response(400, {"error": "Email not found in Cognito claims"})
+
+        try:
+            body = json.loads(event.get('body') or '{}')
+        except json.JSONDecodeError:
+            return response(400, {"error": "Request body must be JSON"})
+
+        action = body.get('action', 'start')
+        try:
+            if action == 'start':
+                result = start_upload(body, user_id, user_email)
+            elif action == 'sign':
+                key, upload_id = owned_upload(body, user_id)
+                numbers = [int(n) for n in body.get('part_numbers') or []]
+                if not numbers or min(numbers) < 1 or max(numbers) > MAX_PARTS:
+                    raise ValueError(f"part_numbers must be between 1 and {MAX_PARTS}")
+                result = {"key": key, "uploadId": upload_id, "expiresIn": URL_EXPIRES_SECONDS,
+                          "parts": sign_parts(key, upload_id, numbers)}
+            elif action == 'complete':
+                result = complete_upload(body, user_id)
+            elif action == 'abort':
+                result = abort_upload(body, user_id)
+            else:
+                return response(400, {"error": f"Unknown action {action}"})
+        except (ValueError, TypeError, KeyError) as e:
+            return response(400, {"error": "Invalid request", "details": str(e)})
+        except PermissionError as e:
+            return response(403, {"error": str(e)})
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchUpload', 'InvalidPart', 'InvalidPartOrder', 'EntityTooSmall'):
+                return response(400, {"error": "Upload could not be completed", "details": e.response['Error']['Message']})
+            raise
+
+        return response(200, result)
+
+    except Exception as e:
+        print(f"Multipart upload error: {str(e)}")
+        traceback.print_exc()
+        return response(500, {"error": "Multipart upload request failed", "details": str(e)})
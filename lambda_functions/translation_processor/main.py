@@ -1,96 +1,973 @@
 import boto3
 import os
 import csv
-import io
 import json
-from datetime import datetime
+import re
+import codecs
+import traceback
+import itertools
+import time
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from translation_common import (
+    metrics, deadline, TimedClient, TranslationCache, TokenBucket, detect_column_languages, profile_columns,
+    build_batches, translate_batch, iter_chunks, open_body, TimedReader, MultipartUploadWriter, ParquetRowWriter,
+    row_writer, pyarrow, BATCH_SEPARATOR, OUTPUT_COMPRESSIONS, OUTPUT_FORMATS, PROFILE_SAMPLE_ROWS
+)
+
+# DEBUG adds full payloads (cache statistics, per-call details) to the logs
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+def log_debug(message):
+    if LOG_LEVEL == 'DEBUG':
+        print(message)
 
 s3 = boto3.client('s3')
 sqs = boto3.client('sqs')
-translate = boto3.client('translate')
+# call_translate is the only retry layer, so the client itself does not retry
+translate = boto3.client('translate', config=Config(retries={'mode': 'standard', 'max_attempts': 1}))
+comprehend = boto3.client('comprehend')
 dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['METADATA_TABLE'])
+table = TimedClient(dynamodb.Table(os.environ['METADATA_TABLE']), 'DynamoDB')
 
-def lambda_handler(event, context):
-    for record in event['Records']:
-        # Parse the message
-        message = json.loads(record['body'])
-        bucket = message['bucket']
-        object_key = message['key']
-        file_id = message['file_id']
-        timestamp = message.get('timestamp', datetime.now().isoformat())
-        # Download the CSV file from S3
-        response = s3.get_object(Bucket=bucket, Key=object_key)
-        csv_content = response['Body'].read().decode('utf-8')
-        
-        # Parse CSV
-        csv_reader = csv.DictReader(io.StringIO(csv_content))
-        rows = list(csv_reader)
-        key = {
-                'file_id': file_id,
-                'timestamp': timestamp  # Must provide the sort key
-            }
-        # Translate each text field
-        translated_rows = []
-        table.update_item(
-                    Key=key,  # Use the full key
-                    UpdateExpression='SET #status = :status',
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={':status': 'PROCESSING'}
+# Languages used when a job does not name its own
+SOURCE_LANG = os.environ.get('SOURCE_LANG', 'auto')
+TARGET_LANGS = [lang.strip() for lang in os.environ.get('TARGET_LANGS', 'es').split(',') if lang.strip()]
+
+# Errors that retrying cannot fix; only these fail a single language of a job
+LANGUAGE_ERRORS = {
+    'UnsupportedLanguagePairException',
+    'InvalidParameterValueException'
+}
+
+# Number of translation requests kept in flight per invocation
+TRANSLATE_MAX_WORKERS = int(os.environ.get('TRANSLATE_MAX_WORKERS', '8'))
+
+# Translation memory: LRU inside the warm container, DynamoDB table behind it
+CACHE_TABLE = os.environ.get('CACHE_TABLE')
+CACHE_TTL_DAYS = int(os.environ.get('CACHE_TTL_DAYS', '30'))
+LRU_CACHE_SIZE = int(os.environ.get('LRU_CACHE_SIZE', '50000'))
+
+translation_cache = TranslationCache(dynamodb, CACHE_TABLE, LRU_CACHE_SIZE, CACHE_TTL_DAYS)
+
+# Translate requests per second shared by every processor and upload handler invocation, 0 disables.
+# Set just under the account quota; the bucket holds up to TRANSLATE_RATE_BURST requests.
+RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE')
+TRANSLATE_RATE_LIMIT = float(os.environ.get('TRANSLATE_RATE_LIMIT', '0'))
+TRANSLATE_RATE_BURST = float(os.environ.get('TRANSLATE_RATE_BURST', '0')) or TRANSLATE_RATE_LIMIT
+# Tokens taken from the shared bucket per DynamoDB round trip; unused ones lapse after a second
+RATE_LIMIT_LEASE = int(os.environ.get('RATE_LIMIT_LEASE', '5'))
+rate_limiter = TokenBucket(dynamodb, RATE_LIMIT_TABLE, 'translate', TRANSLATE_RATE_LIMIT, TRANSLATE_RATE_BURST, RATE_LIMIT_LEASE)
+
+def translate_values(values, source_lang, target_lang, max_workers=TRANSLATE_MAX_WORKERS):
+    """Translate the distinct non-blank values and return a value -> translation map"""
+    distinct = list(dict.fromkeys(v for v in values if isinstance(v, str) and v.strip()))
+
+    # Values that contain the separator cannot share a request with others
+    batchable = [v for v in distinct if BATCH_SEPARATOR not in v and '\r' not in v]
+    single = [v for v in distinct if BATCH_SEPARATOR in v or '\r' in v]
+
+    translations = translation_cache.get_many(distinct, source_lang, target_lang)
+    batchable = [v for v in batchable if v not in translations]
+    single = [v for v in single if v not in translations]
+
+    fresh = {}
+    batches = build_batches(batchable) + [[v] for v in single]
+    workers = min(max_workers, len(batches))
+    if workers > 1:
+        # Results are keyed by source value, so completion order does not matter
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda batch: translate_batch(translate, rate_limiter, batch, source_lang, target_lang), batches
+            )
+            for batch, translated in zip(batches, results):
+                fresh.update(zip(batch, translated))
+    else:
+        for batch in batches:
+            fresh.update(zip(batch, translate_batch(translate, rate_limiter, batch, source_lang, target_lang)))
+    translation_cache.put_many(fresh, source_lang, target_lang)
+    translations.update(fresh)
+
+    print(f"Translated {len(distinct)} distinct values into {target_lang} in {len(batches)} requests")
+    log_debug(f"Translation cache stats: {json.dumps(dict(translation_cache.stats, lru_size=len(translation_cache.lru)))}")
+    return translations
+
+# Translated files live under OUTPUT_PREFIX/YYYY/MM/DD/ so listings can read one day at a time
+OUTPUT_PREFIX = os.environ.get('OUTPUT_PREFIX', 'translated/')
+
+# Progress (rows done per file or shard) is written at most this often while a job runs
+PROGRESS_INTERVAL_SECONDS = float(os.environ.get('PROGRESS_INTERVAL_SECONDS', '10'))
+
+# Streaming: rows are translated in chunks and written out in multipart parts
+CSV_CHUNK_ROWS = int(os.environ.get('CSV_CHUNK_ROWS', '5000'))
+
+# Running jobs are checkpointed after every uploaded part and at least this often in between
+CHECKPOINT_INTERVAL_SECONDS = float(os.environ.get('CHECKPOINT_INTERVAL_SECONDS', '30'))
+
+# Incremental jobs: previous rows are matched within this many rows ahead of the last match
+INCREMENTAL_WINDOW_ROWS = int(os.environ.get('INCREMENTAL_WINDOW_ROWS', '50000'))
+
+def row_index_key(file_id):
+    """Key of a job's row index: one line of key and content hashes per source row"""
+    return f"row_index/{file_id}.txt"
+
+def row_digests(row, fieldnames, key_column=None):
+    """Hex identity (key column value, or the content) and content hash of a DictReader row"""
+    content = hashlib.blake2b(
+        '\x1f'.join(row.get(name) or '' for name in fieldnames).encode('utf-8'), digest_size=8
+    ).hexdigest()
+    if not key_column:
+        return content, content
+    return hashlib.blake2b((row.get(key_column) or '').encode('utf-8'), digest_size=8).hexdigest(), content
+
+def row_index_fingerprint(fieldnames, columns, source_lang, key_column):
+    """First line of a row index; translations are only reused between jobs with equal fingerprints"""
+    return {'fieldnames': list(fieldnames), 'columns': list(columns), 'source_lang': source_lang, 'key_column': key_column}
+
+def incremental_key_column(message, fieldnames):
+    """The job's key column, or None to match rows by content"""
+    key_column = message.get('key_column')
+    if key_column and key_column not in fieldnames:
+        print(f"Key column {key_column} is not in the header, matching rows by content")
+        return None
+    return key_column or None
+
+def index_rows(rows, fieldnames, key_column, output):
+    """Pass rows through while writing their row index lines to output"""
+    for count, row in enumerate(rows, 1):
+        output.write('%s %s\n' % row_digests(row, fieldnames, key_column))
+        if count % CSV_CHUNK_ROWS == 0:
+            output.flush_if_full()
+        yield row
+
+def iter_output_rows(output_key):
+    """Rows of a translated file, as dicts, in whichever format it was written"""
+    with metrics.timer('Download'):
+        response = s3.get_object(Bucket=os.environ['OUTPUT_BUCKET'], Key=output_key)
+    body = open_body(TimedReader(response['Body']), response.get('ContentEncoding'))
+    if output_key.endswith('.parquet'):
+        parquet = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(body.read()))
+        for batch in parquet.iter_batches():
+            yield from batch.to_pylist()
+    elif output_key.endswith('.jsonl'):
+        for line in codecs.getreader('utf-8')(body):
+            yield json.loads(line)
+    else:
+        yield from csv.DictReader(codecs.getreader('utf-8')(body))
+
+class PreviousVersion:
+    """Translations of the previous version of a file, reused by an incremental job.
+
+    previous is the job's 'previous' message entry: the earlier job's row index
+    and its output key per language. Rows are matched in order: the row index
+    is read at most INCREMENTAL_WINDOW_ROWS ahead of the last match, and each
+    previous output strictly forward, so memory stays bounded and every object
+    is read once. A row is reused when its identity is in the window with the
+    same content hash. Rows moved further than the window are translated again.
+    """
+
+    def __init__(self, previous, fingerprint):
+        self.outputs = previous.get('outputs', {})
+        self.window = {}
+        self.order = deque()
+        self.next_index = 0
+        self.readers = {}
+        self.positions = {}
+        try:
+            with metrics.timer('Download'):
+                body = s3.get_object(Bucket=os.environ['OUTPUT_BUCKET'], Key=previous['row_index'])['Body']
+            self.lines = iter(codecs.getreader('utf-8')(TimedReader(body)))
+            # The first line records what the rows were translated with
+            self.enabled = json.loads(next(self.lines, 'null')) == fingerprint
+        except ClientError as e:
+            print(f"Previous row index {previous['row_index']} unavailable: {str(e)}")
+            self.enabled = False
+        if not self.enabled:
+            print(f"Previous version {previous.get('file_id')} does not match, translating every row")
+
+    def _fill(self):
+        while len(self.order) < INCREMENTAL_WINDOW_ROWS:
+            line = next(self.lines, None)
+            if line is None:
+                return
+            identity, content = line.split()
+            if identity not in self.window:
+                self.window[identity] = (self.next_index, content)
+                self.order.append((identity, self.next_index))
+            self.next_index += 1
+
+    def match(self, identity, content):
+        """Index of the previous row this row repeats, or None"""
+        if not self.enabled:
+            return None
+        self._fill()
+        found = self.window.get(identity)
+        if not found or found[1] != content:
+            return None
+        # Previous rows before a match can no longer be reused
+        while self.order and self.order[0][1] <= found[0]:
+            earlier, index = self.order.popleft()
+            if self.window.get(earlier, (None,))[0] == index:
+                del self.window[earlier]
+        return found[0]
+
+    def fetch(self, lang, index):
+        """The previous translation of row index into lang, or None when there is none"""
+        if lang not in self.readers:
+            output_key = self.outputs.get(lang)
+            usable = output_key and (pyarrow is not None or not output_key.endswith('.parquet'))
+            self.readers[lang] = iter_output_rows(output_key) if usable else None
+            self.positions[lang] = 0
+        reader = self.readers[lang]
+        if reader is None:
+            return None
+        row = None
+        while self.positions[lang] <= index:
+            row = next(reader, None)
+            if row is None:
+                self.readers[lang] = None
+                return None
+            self.positions[lang] += 1
+        return row
+
+def reuse_translations(previous, rows, pending, fieldnames, key_column):
+    """Split each language's pending rows into previous translations and rows still to translate.
+
+    pending maps a language to the tail of rows it still needs. Returns a
+    language -> {position in rows: previous translation} map and the language
+    -> rows to translate map.
+    """
+    matches = [previous.match(*row_digests(row, fieldnames, key_column)) for row in rows]
+    reused = {}
+    remaining = {}
+    for lang, lang_rows in pending.items():
+        start = len(rows) - len(lang_rows)
+        reused[lang] = {}
+        remaining[lang] = []
+        for position in range(start, len(rows)):
+            translation = previous.fetch(lang, matches[position]) if matches[position] is not None else None
+            if translation is None:
+                remaining[lang].append(rows[position])
+            else:
+                reused[lang][position] = translation
+    return reused, remaining
+
+def resolve_columns(message, fieldnames, rows, source_lang=None):
+    """Return the columns to translate, their source languages and the rows iterator with the sample replayed.
+
+    The source languages are source_lang itself, or with 'auto' a column -> language
+    map detected from the sample (sharded jobs carry the map in column_langs).
+    """
+    source_lang = source_lang or SOURCE_LANG
+    if message.get('translate_columns') is not None:
+        return message['translate_columns'], message.get('column_langs') or source_lang, rows
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, PROFILE_SAMPLE_ROWS))
+    columns = profile_columns(
+        fieldnames, sample, message.get('include_columns'), message.get('exclude_columns')
+    )
+    if source_lang == 'auto' and columns:
+        source_lang = detect_column_languages(comprehend, {name: [row.get(name) for row in sample] for name in columns})
+    return columns, source_lang, itertools.chain(sample, rows)
+
+def output_encoding(message):
+    """Compression of the job's translated files, None for plain CSV"""
+    encoding = message.get('output_compression')
+    if encoding and encoding not in OUTPUT_COMPRESSIONS:
+        raise ValueError(f"Unsupported output_compression {encoding}")
+    return encoding or None
+
+def output_format(message):
+    """Format of the job's translated files, CSV unless the job asked for another"""
+    name = message.get('output_format') or 'csv'
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output_format {name}")
+    if name == 'parquet' and pyarrow is None:
+        raise ValueError('Parquet output needs the pyarrow package')
+    return name
+
+def job_languages(message):
+    """Source language and de-duplicated target languages of a job"""
+    targets = message.get('target_langs') or TARGET_LANGS
+    return message.get('source_lang') or SOURCE_LANG, list(dict.fromkeys(targets))
+
+def translate_rows(rows, source_lang, target_lang, columns, max_workers=TRANSLATE_MAX_WORKERS):
+    """Translate the given columns of a chunk of DictReader rows, keeping column order.
+
+    source_lang is one language for every column or a column -> language map.
+    Columns are translated in one group per source language, and columns
+    already in target_lang are copied unchanged.
+    """
+    by_lang = {}
+    for name in columns:
+        lang = source_lang.get(name, 'auto') if isinstance(source_lang, dict) else source_lang
+        if lang != target_lang:
+            by_lang.setdefault(lang, []).append(name)
+    column_translations = {}
+    for lang, names in by_lang.items():
+        translations = translate_values(
+            (row.get(name) for row in rows for name in names),
+            lang,
+            target_lang,
+            max_workers
         )
-        
-        for row in rows:
-            translated_row = {}
-            for field_name, field_value in row.items():
-                if isinstance(field_value, str) and field_value.strip():
-                    # Translate the text
-                    response = translate.translate_text(
-                        Text=field_value,
-                        SourceLanguageCode='auto',
-                        TargetLanguageCode='es'  # Spanish as example
-                    )
-                    translated_row[field_name] = response['TranslatedText']
-                else:
-                    translated_row[field_name] = field_value
-            translated_rows.append(translated_row)
-        
-        # Convert back to CSV
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=rows[0].keys())
-        writer.writeheader()
-        writer.writerows(translated_rows)
-        
-        # Upload translated file to output bucket
-        output_key = f"translated_{datetime.now().strftime('%Y%m%d%H%M%S')}_{message['key']}"
-        s3.put_object(
+        column_translations.update((name, translations) for name in names)
+    translated_rows = []
+    for row in rows:
+        translated_row = dict(row)
+        for name, translations in column_translations.items():
+            value = row.get(name)
+            if isinstance(value, str):
+                translated_row[name] = translations.get(value, value)
+        translated_rows.append(translated_row)
+    return translated_rows
+
+def translate_rows_multi(rows_by_lang, source_lang, columns):
+    """Translate the same parsed rows into several languages concurrently.
+
+    rows_by_lang maps each target language to the rows it still needs. Returns
+    a language -> translated rows map and a language -> exception map for the
+    languages that failed; one language failing does not stop the others.
+    """
+    translated = {}
+    errors = {}
+    if not rows_by_lang:
+        return translated, errors
+    # The per-invocation request budget is shared between the languages
+    workers = max(1, TRANSLATE_MAX_WORKERS // len(rows_by_lang))
+    with ThreadPoolExecutor(max_workers=len(rows_by_lang)) as executor:
+        futures = {
+            lang: executor.submit(translate_rows, rows, source_lang, lang, columns, workers)
+            for lang, rows in rows_by_lang.items()
+        }
+        for lang, future in futures.items():
+            try:
+                translated[lang] = future.result()
+            except Exception as e:
+                print(f"Translation into {lang} failed: {str(e)}")
+                errors[lang] = e
+    return translated, errors
+
+def shard_object_key(file_id, shard_index, lang):
+    """Key of the intermediate output of one shard and language in the output bucket"""
+    return f"shards/{file_id}/{lang}/{shard_index:05d}.part"
+
+def output_object_key(message, lang):
+    """Key of the translated file for one target language, partitioned by day.
+
+    The job's file_id keeps outputs of same-named files apart, whoever uploaded them and whenever.
+    """
+    now = datetime.now()
+    # Compression travels as Content-Encoding, so the suffix only names the format
+    name = re.sub(r'(\.csv)?(\.gz|\.zst)?$', '', os.path.basename(message['key']), flags=re.IGNORECASE)
+    suffix = OUTPUT_FORMATS[output_format(message)][0]
+    return f"{OUTPUT_PREFIX}{now:%Y/%m/%d}/translated_{now:%Y%m%d%H%M%S}_{message['file_id']}_{lang}_{name}{suffix}"
+
+def checkpoint_attribute(message):
+    """Name of the metadata attribute holding the checkpoint for this message"""
+    if 'shard_index' in message:
+        return f"checkpoint_{message['shard_index']}"
+    return 'checkpoint'
+
+def save_checkpoint(key, attribute, checkpoint):
+    """Persist the committed row offset and multipart state of a running job"""
+    table.update_item(
+        Key=key,
+        UpdateExpression='SET #checkpoint = :checkpoint',
+        ExpressionAttributeNames={'#checkpoint': attribute},
+        ExpressionAttributeValues={':checkpoint': checkpoint}
+    )
+
+def tail_object_key(key, attribute, lang, rows_committed):
+    """Key of the bytes of one language's output that a checkpoint holds beyond its uploaded parts"""
+    return f"checkpoints/{key['file_id']}/{attribute}/{lang}/{rows_committed:010d}.tail"
+
+def delete_tails(tail_keys):
+    if tail_keys:
+        s3.delete_objects(
             Bucket=os.environ['OUTPUT_BUCKET'],
-            Key=output_key,
-            Body=output.getvalue()
+            Delete={'Objects': [{'Key': k} for k in tail_keys], 'Quiet': True}
         )
-        
-        print(f"Translated file saved to {os.environ['OUTPUT_BUCKET']}/{output_key}")
-        
-        # Update DynamoDB with completion status
+
+def checkpoint_outputs(key, attribute, outputs, rows_done, rows_reused, tails):
+    """Checkpoint every output at the rows written so far.
+
+    The bytes an output has not uploaded in a part are stored as a tail
+    object, so a retry resumes from the last row written instead of the last
+    part. Returns the language -> tail key map of the new checkpoint; the
+    tails of the previous one are deleted.
+    """
+    checkpoint = {}
+    new_tails = {}
+    for lang, output in outputs.items():
+        checkpoint[lang] = {
+            'output_key': output.key,
+            'upload_id': output.upload_id,
+            'parts': output.parts,
+            'rows_committed': rows_done[lang],
+            'rows_reused': rows_reused[lang]
+        }
+        unflushed = output.unflushed()
+        if unflushed:
+            new_tails[lang] = checkpoint[lang]['tail_key'] = tail_object_key(key, attribute, lang, rows_done[lang])
+            with metrics.timer('Upload'):
+                s3.put_object(Bucket=os.environ['OUTPUT_BUCKET'], Key=new_tails[lang], Body=unflushed)
+    save_checkpoint(key, attribute, checkpoint)
+    delete_tails([tail for lang, tail in tails.items() if new_tails.get(lang) != tail])
+    return new_tails
+
+def clear_checkpoint(key, attribute):
+    table.update_item(
+        Key=key,
+        UpdateExpression='REMOVE #checkpoint',
+        ExpressionAttributeNames={'#checkpoint': attribute}
+    )
+
+def report_progress(key, part, rows_done, rows_total=None, estimated=False):
+    """Record the rows done for one part of a job ('file' or a shard index)"""
+    update = 'SET #rows_done.#part = :rows_done'
+    values = {':rows_done': rows_done}
+    if rows_total is not None:
+        update += ', rows_total = :rows_total, rows_total_estimated = :estimated'
+        values.update({':rows_total': rows_total, ':estimated': estimated})
+    table.update_item(
+        Key=key,
+        UpdateExpression=update,
+        ExpressionAttributeNames={'#rows_done': 'rows_done', '#part': part},
+        ExpressionAttributeValues=values
+    )
+
+def record_language_failures(key, errors):
+    """Mark target languages as failed in the metadata item"""
+    names = {'#languages': 'languages'}
+    values = {}
+    assignments = []
+    for i, (lang, error) in enumerate(errors.items()):
+        names[f'#lang{i}'] = lang
+        values[f':lang{i}'] = {'status': 'FAILED', 'error': str(error)}
+        assignments.append(f'#languages.#lang{i} = :lang{i}')
+    table.update_item(
+        Key=key,
+        UpdateExpression='SET ' + ', '.join(assignments),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+
+def translate_stream(csv_reader, fieldnames, columns, output_keys, key, checkpoint_name, source_lang,
+                     checkpoint=None, write_header=True, progress=None, content_encoding=None, output_format='csv',
+                     previous=None, key_column=None):
+    """Translate DictReader rows into one output object per language.
+
+    output_keys maps each target language to its output key. source_lang is
+    one language or a column -> language map. The languages are checkpointed
+    after any of them uploads a part and every CHECKPOINT_INTERVAL_SECONDS;
+    with a checkpoint, rows a language already committed are skipped for it
+    and its multipart upload is continued from its parts and tail. A language that fails is recorded and dropped while the
+    others carry on. progress(rows_done, final) is called at most every
+    PROGRESS_INTERVAL_SECONDS and once at the end. Returns a language -> output
+    key map of the finished outputs. content_encoding compresses the outputs
+    (Parquet takes it as its codec). Parquet outputs are not checkpointed; a
+    retry writes them again from the first row. With a PreviousVersion, rows
+    it still has translations for are copied instead of translated, and
+    previous.rows_reused counts them per language.
+    """
+    content_type = OUTPUT_FORMATS[output_format][1]
+    codec = None
+    if output_format == 'parquet':
+        codec, content_encoding = content_encoding, None
+    resumable = output_format != 'parquet'
+    outputs = {}
+    rows_done = {}
+    rows_reused = {}
+    tails = {}
+    for lang, output_key in output_keys.items():
+        saved = (checkpoint or {}).get(lang)
+        if saved:
+            parts = [{'PartNumber': int(p['PartNumber']), 'ETag': p['ETag']} for p in saved['parts']]
+            buffered = b''
+            if saved.get('tail_key'):
+                tails[lang] = saved['tail_key']
+                with metrics.timer('Download'):
+                    buffered = s3.get_object(Bucket=os.environ['OUTPUT_BUCKET'], Key=saved['tail_key'])['Body'].read()
+            outputs[lang] = MultipartUploadWriter(s3, os.environ['OUTPUT_BUCKET'], saved['output_key'], content_type,
+                                                  upload_id=saved['upload_id'], parts=parts, abort_on_error=False,
+                                                  content_encoding=content_encoding, buffered=buffered)
+            rows_done[lang] = int(saved['rows_committed'])
+            rows_reused[lang] = int(saved.get('rows_reused', 0))
+            print(f"Resuming {saved['output_key']} from row {rows_done[lang]} ({len(parts)} parts committed)")
+        else:
+            outputs[lang] = MultipartUploadWriter(s3, os.environ['OUTPUT_BUCKET'], output_key, content_type,
+                                                  abort_on_error=False, content_encoding=content_encoding)
+            rows_done[lang] = 0
+            rows_reused[lang] = 0
+    writers = {lang: row_writer(output_format, output, fieldnames, compression=codec) for lang, output in outputs.items()}
+    if write_header:
+        for lang, writer in writers.items():
+            if not rows_done[lang]:
+                writer.writeheader()
+
+    position = min(rows_done.values(), default=0)
+    last_progress = last_checkpoint = time.monotonic()
+    # Parsing pulls the body through the reader, so its reads are counted as Download only
+    chunks = iter_chunks(itertools.islice(csv_reader, position, None), CSV_CHUNK_ROWS)
+    for rows in metrics.timed_iter(chunks, 'Parse', exclude='Download'):
+        # A resumed language only needs the rows past its own checkpoint
+        pending = {
+            lang: rows[max(0, rows_done[lang] - position):]
+            for lang in writers if rows_done[lang] < position + len(rows)
+        }
+        starts = {lang: len(rows) - len(lang_rows) for lang, lang_rows in pending.items()}
+        reused = {}
+        if previous is not None:
+            reused, pending = reuse_translations(previous, rows, pending, fieldnames, key_column)
+        with metrics.timer('Translate'):
+            translated, errors = translate_rows_multi(
+                {lang: lang_rows for lang, lang_rows in pending.items() if lang_rows}, source_lang, columns
+            )
+        for lang in reused:
+            if lang not in errors:
+                translated.setdefault(lang, [])
+        metrics.add('RowsTranslated', len(rows))
+        for error in errors.values():
+            if not (isinstance(error, ClientError) and error.response['Error']['Code'] in LANGUAGE_ERRORS):
+                # Possibly transient, fail the message and let the retry resume from the checkpoint
+                raise error
+        if errors:
+            record_language_failures(key, errors)
+        for lang in errors:
+            del writers[lang]
+            outputs.pop(lang).abort()
+        if not writers:
+            raise RuntimeError('Translation failed for every target language')
+
+        position += len(rows)
+        part_uploaded = False
+        for lang, translated_rows in translated.items():
+            if reused.get(lang):
+                # Put the previous translations back between the freshly translated rows
+                fresh = iter(translated_rows)
+                translated_rows = [
+                    reused[lang][i] if i in reused[lang] else next(fresh) for i in range(starts[lang], len(rows))
+                ]
+                rows_reused[lang] += len(reused[lang])
+            writers[lang].writerows(translated_rows)
+            rows_done[lang] = position
+            if outputs[lang].flush_if_full():
+                part_uploaded = True
+        if resumable and (part_uploaded or time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL_SECONDS):
+            tails = checkpoint_outputs(key, checkpoint_name, outputs, rows_done, rows_reused, tails)
+            last_checkpoint = time.monotonic()
+        if progress and time.monotonic() - last_progress >= PROGRESS_INTERVAL_SECONDS:
+            progress(position, False)
+            last_progress = time.monotonic()
+
+    for lang, output in outputs.items():
+        writers[lang].close()
+        output.close()
+    try:
+        delete_tails(list(tails.values()))
+    except ClientError as e:
+        print(f"Could not delete the checkpoint tails of {key['file_id']}: {str(e)}")
+    if progress:
+        progress(position, True)
+    if previous is not None:
+        previous.rows_reused = {lang: rows_reused[lang] for lang in outputs}
+    return {lang: output.key for lang, output in outputs.items()}
+
+def translate_file(message, output_keys, key, source_lang, checkpoint=None):
+    """Translate a whole CSV object.
+
+    Returns a language -> translated file key map and, when the job reused a
+    previous version, the language -> reused row count map (None otherwise).
+    Incremental jobs also write the row index the next version is matched against.
+    """
+    # Stream the CSV file from S3, decoding incrementally
+    with metrics.timer('Download'):
+        response = s3.get_object(Bucket=message['bucket'], Key=message['key'])
+    body = TimedReader(response['Body'])
+    # Compressed inputs are decompressed as they stream; progress still extrapolates from compressed bytes
+    csv_reader = csv.DictReader(codecs.getreader('utf-8')(open_body(body, response.get('ContentEncoding'))))
+    if not csv_reader.fieldnames:
+        raise ValueError(f"CSV file {message['key']} has no header row")
+
+    def progress(rows_done, final):
+        # The row count is only known at the end; until then extrapolate from the bytes read
+        if final:
+            report_progress(key, 'file', rows_done, rows_done)
+        elif body.bytes_read:
+            estimate = round(rows_done * response['ContentLength'] / body.bytes_read)
+            report_progress(key, 'file', rows_done, max(estimate, rows_done), estimated=True)
+
+    columns, source_langs, rows = resolve_columns(message, csv_reader.fieldnames, csv_reader, source_lang)
+    previous = None
+    index_output = None
+    key_column = None
+    if message.get('incremental'):
+        key_column = incremental_key_column(message, csv_reader.fieldnames)
+        fingerprint = row_index_fingerprint(csv_reader.fieldnames, columns, source_lang, key_column)
+        if message.get('previous'):
+            previous = PreviousVersion(message['previous'], fingerprint)
+        index_output = MultipartUploadWriter(
+            s3, os.environ['OUTPUT_BUCKET'], row_index_key(message['file_id']), 'text/plain'
+        )
+        index_output.write(json.dumps(fingerprint) + '\n')
+        rows = index_rows(rows, csv_reader.fieldnames, key_column, index_output)
+
+    output_keys = translate_stream(rows, csv_reader.fieldnames, columns, output_keys, key, 'checkpoint', source_langs,
+                                   checkpoint, progress=progress, content_encoding=output_encoding(message),
+                                   output_format=output_format(message), previous=previous, key_column=key_column)
+    if index_output:
+        index_output.close()
+    return output_keys, previous.rows_reused if previous else None
+
+def translate_shard(message, key, source_lang, target_langs, checkpoint=None):
+    """Translate one row-range shard into every target language and record its completion.
+
+    Returns the metadata item when this was the last outstanding shard and the
+    caller should assemble the final files, None otherwise.
+    """
+    start, end = message['byte_range']
+    with metrics.timer('Download'):
+        response = s3.get_object(
+            Bucket=message['bucket'],
+            Key=message['key'],
+            Range=f"bytes={start}-{end - 1}"
+        )
+    csv_reader = csv.DictReader(codecs.getreader('utf-8')(TimedReader(response['Body'])), fieldnames=message['header'])
+    columns, source_langs, rows = resolve_columns(message, message['header'], csv_reader, source_lang)
+    index_output = None
+    if message.get('incremental'):
+        # Assembly puts the shards' row index parts together behind the fingerprint line
+        index_output = MultipartUploadWriter(
+            s3, os.environ['OUTPUT_BUCKET'], shard_object_key(message['file_id'], message['shard_index'], 'row_index'),
+            'text/plain'
+        )
+        rows = index_rows(rows, message['header'], incremental_key_column(message, message['header']), index_output)
+    translate_stream(
+        rows,
+        message['header'],
+        columns,
+        {lang: shard_object_key(message['file_id'], message['shard_index'], lang) for lang in target_langs},
+        key,
+        checkpoint_attribute(message),
+        source_langs,
+        checkpoint,
+        write_header=False,
+        progress=lambda rows_done, final: report_progress(key, str(message['shard_index']), rows_done),
+        output_format=output_format(message)
+    )
+    if index_output:
+        index_output.close()
+
+    # A set rather than a plain counter, so redelivered shards are not counted twice
+    item = table.update_item(
+        Key=key,
+        UpdateExpression='ADD completed_shards :shard REMOVE #checkpoint',
+        ExpressionAttributeNames={'#checkpoint': checkpoint_attribute(message)},
+        ExpressionAttributeValues={':shard': {message['shard_index']}},
+        ReturnValues='ALL_NEW'
+    )['Attributes']
+    completed = len(item.get('completed_shards', ()))
+    print(f"Shard {message['shard_index'] + 1}/{message['shard_count']} of {message['file_id']} done, {completed} completed")
+    return claim_assembly(message, key, item)
+
+# A claim on assembling a job older than this belongs to an invocation that died mid-assembly
+# and is taken over; the function's own timeout plus a margin, since no invocation outlives it
+FUNCTION_TIMEOUT_SECONDS = int(os.environ.get('FUNCTION_TIMEOUT_SECONDS', '120'))
+ASSEMBLY_LEASE_SECONDS = int(os.environ.get('ASSEMBLY_LEASE_SECONDS', str(FUNCTION_TIMEOUT_SECONDS + 30)))
+
+def claim_assembly(message, key, item):
+    """Claim the assembly of a job once all its shards are done.
+
+    Returns the claimed item, or None while shards are outstanding. When
+    another invocation holds a fresh claim this one raises, so the message
+    comes back later and finds the job either assembled or free to claim.
+    """
+    if len(item.get('completed_shards', ())) < message['shard_count']:
+        return None
+    now = datetime.now()
+    claimed = item.get('assembly_started')
+    values = {':now': now.isoformat()}
+    if claimed is None:
+        condition = 'attribute_not_exists(assembly_started)'
+    elif now - datetime.fromisoformat(claimed) >= timedelta(seconds=ASSEMBLY_LEASE_SECONDS):
+        print(f"Taking over the assembly of {key['file_id']}, claimed at {claimed} and never finished")
+        condition = 'assembly_started = :claimed'
+        values[':claimed'] = claimed
+    else:
+        raise RuntimeError(f"Assembly of {key['file_id']} is in progress since {claimed}, retrying later")
+    try:
+        return table.update_item(
+            Key=key,
+            UpdateExpression='SET assembly_started = :now',
+            ConditionExpression=condition,
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW'
+        )['Attributes']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise RuntimeError(f"Assembly of {key['file_id']} was claimed by another invocation, retrying later")
+        raise
+
+def release_assembly(key, claimed):
+    """Drop this invocation's claim after a failed assembly so the redelivered message can retry at once"""
+    try:
         table.update_item(
-                Key=key,  # Use the full key again
-                UpdateExpression='SET #status = :status, translated_file = :file',
-                ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={
-                    ':status': 'COMPLETED',
-                    ':file': f"translated_{datetime.now().strftime('%Y%m%d%H%M%S')}_{object_key}"
-                }
+            Key=key,
+            UpdateExpression='REMOVE assembly_started',
+            ConditionExpression='assembly_started = :claimed',
+            ExpressionAttributeValues={':claimed': claimed}
         )
-        
-        # Get user email from DynamoDB to send notification
-        response = table.get_item(Key=key)
-        item = response.get('Item', {})
-        user_email = item.get('email')
-        
-        if user_email:
-            # Send notification to user (could be via SNS, SES, etc.)
-            print(f"Notification sent to {user_email} about translation completion.")
-    
+    except ClientError as e:
+        # The claim then lapses after ASSEMBLY_LEASE_SECONDS instead
+        print(f"Could not release the assembly claim of {key['file_id']}: {str(e)}")
+
+def assemble_shards(message, output_keys):
+    """Stitch the shard outputs, in shard order, into one translated file per language.
+
+    output_keys holds the languages to assemble. CSV and JSON Lines shards are
+    concatenated; Parquet shards are copied row group by row group into one
+    file. The shard outputs are left in place until delete_shards.
+    """
+    output_bucket = os.environ['OUTPUT_BUCKET']
+    shard_range = range(message['shard_count'])
+    file_format = output_format(message)
+    content_type = OUTPUT_FORMATS[file_format][1]
+    content_encoding = output_encoding(message)
+
+    for lang, output_key in output_keys.items():
+        if file_format == 'parquet':
+            with MultipartUploadWriter(s3, output_bucket, output_key, content_type) as output:
+                writer = ParquetRowWriter(output, message['header'], content_encoding)
+                for i in shard_range:
+                    shard_key = shard_object_key(message['file_id'], i, lang)
+                    with metrics.timer('Download'):
+                        shard = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(
+                            s3.get_object(Bucket=output_bucket, Key=shard_key)['Body'].read()
+                        ))
+                    for group in range(shard.num_row_groups):
+                        writer.write_table(shard.read_row_group(group))
+                        output.flush_if_full()
+                writer.close()
+            continue
+
+        with MultipartUploadWriter(s3, output_bucket, output_key, content_type, content_encoding=content_encoding) as output:
+            if file_format == 'csv':
+                csv.writer(output).writerow(message['header'])
+            for i in shard_range:
+                shard_key = shard_object_key(message['file_id'], i, lang)
+                with metrics.timer('Download'):
+                    body = TimedReader(s3.get_object(Bucket=output_bucket, Key=shard_key)['Body'])
+                reader = codecs.getreader('utf-8')(body)
+                for chunk in iter(lambda: reader.read(1024 * 1024), ''):
+                    output.write(chunk)
+                    output.flush_if_full()
+
+    if message.get('incremental'):
+        fingerprint = row_index_fingerprint(
+            message['header'], message['translate_columns'], job_languages(message)[0],
+            incremental_key_column(message, message['header'])
+        )
+        with MultipartUploadWriter(s3, output_bucket, row_index_key(message['file_id']), 'text/plain') as output:
+            output.write(json.dumps(fingerprint) + '\n')
+            for i in shard_range:
+                with metrics.timer('Download'):
+                    output.write(s3.get_object(
+                        Bucket=output_bucket, Key=shard_object_key(message['file_id'], i, 'row_index')
+                    )['Body'].read())
+                output.flush_if_full()
+
+def delete_shards(message, target_langs):
+    """Delete the shard outputs of every target language, including ones that failed"""
+    shard_range = range(message['shard_count'])
+    parts = list(target_langs) + (['row_index'] if message.get('incremental') else [])
+    shard_keys = [shard_object_key(message['file_id'], i, part) for part in parts for i in shard_range]
+    for i in range(0, len(shard_keys), 1000):
+        s3.delete_objects(
+            Bucket=os.environ['OUTPUT_BUCKET'],
+            Delete={'Objects': [{'Key': k} for k in shard_keys[i:i + 1000]], 'Quiet': True}
+        )
+
+def describe_output(output_key):
+    """Size, ETag and last-modified time of a finished output, stored so listings need no S3 calls"""
+    head = s3.head_object(Bucket=os.environ['OUTPUT_BUCKET'], Key=output_key)
     return {
-        'statusCode': 200,
-        'body': json.dumps('Translation completed successfully!')
-    }
\ No newline at end of file
+        'size': head['ContentLength'],
+        'etag': head['ETag'].strip('"'),
+        'last_modified': head['LastModified'].isoformat()
+    }
+
+def language_failed(item, lang):
+    return item.get('languages', {}).get(lang, {}).get('status') == 'FAILED'
+
+def mark_failed(key, error):
+    """Mark the whole job as failed"""
+    print(f"Job {key['file_id']} failed: {error}")
+    table.update_item(
+        Key=key,
+        UpdateExpression='SET #status = :status, #error = :error',
+        ExpressionAttributeNames={'#status': 'status', '#error': 'error'},
+        ExpressionAttributeValues={':status': 'FAILED', ':error': error}
+    )
+
+def process_message(message):
+    """Translate the file or shard described by one queue message"""
+    file_id = message['file_id']
+    timestamp = message.get('timestamp', datetime.now().isoformat())
+    key = {
+            'file_id': file_id,
+            'timestamp': timestamp  # Must provide the sort key
+        }
+    source_lang, target_langs = job_languages(message)
+    update = {
+        'Key': key,  # Use the full key
+        'UpdateExpression': 'SET #status = :status, #languages = if_not_exists(#languages, :empty), '
+                            '#rows_done = if_not_exists(#rows_done, :empty)',
+        'ExpressionAttributeNames': {'#status': 'status', '#languages': 'languages', '#rows_done': 'rows_done'},
+        'ExpressionAttributeValues': {':status': 'PROCESSING', ':empty': {}},
+        'ReturnValues': 'ALL_NEW'
+    }
+    if 'shard_index' in message:
+        # A shard redelivered after assembly has nothing left to do
+        update['ConditionExpression'] = 'attribute_not_exists(assembled)'
+    try:
+        item = table.update_item(**update)['Attributes']
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f"File {file_id} is already assembled, skipping shard {message['shard_index']}")
+        return
+
+    # Languages that failed on an earlier attempt or in another shard are not retried
+    target_langs = [lang for lang in target_langs if not language_failed(item, lang)]
+    if not target_langs:
+        mark_failed(key, 'Translation failed for every target language')
+        return
+    
+    # A redelivered message resumes from its last committed chunk
+    checkpoint = item.get(checkpoint_attribute(message))
+    try:
+        if 'shard_index' not in message:
+            output_keys, rows_reused = translate_file(
+                message, {lang: output_object_key(message, lang) for lang in target_langs}, key, source_lang, checkpoint
+            )
+        elif message['shard_index'] in item.get('completed_shards', ()):
+            # Redelivered after its shard was done; only the assembly can be left
+            item = claim_assembly(message, key, item)
+        else:
+            item = translate_shard(message, key, source_lang, target_langs, checkpoint)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchUpload', 'NoSuchKey'):
+            # The checkpointed upload or tail is gone, the retry has to start from scratch
+            clear_checkpoint(key, checkpoint_attribute(message))
+        raise
+
+    if 'shard_index' in message:
+        if item is None:
+            return
+        output_keys = {
+            lang: output_object_key(message, lang) for lang in target_langs if not language_failed(item, lang)
+        }
+        if not output_keys:
+            mark_failed(key, 'Translation failed for every target language')
+            return
+        # The shard outputs stay until the job is recorded as assembled, so a failed attempt can start over
+        try:
+            assemble_shards(message, output_keys)
+            record_completion(message, key, output_keys, rows_total=sum(item.get('rows_done', {}).values()))
+        except Exception:
+            release_assembly(key, item['assembly_started'])
+            raise
+        delete_shards(message, target_langs)
+    else:
+        record_completion(message, key, output_keys, rows_reused)
+
+    user_email = item.get('email')
+    if user_email:
+        # Send notification to user (could be via SNS, SES, etc.)
+        print(f"Notification sent to {user_email} about translation completion.")
+
+def record_completion(message, key, output_keys, rows_reused=None, rows_total=None):
+    """Mark the job COMPLETED with the size, ETag and time of every output"""
+    for output_key in output_keys.values():
+        print(f"Translated file saved to {os.environ['OUTPUT_BUCKET']}/{output_key}")
+    
+    # Update DynamoDB with completion status; translated_file keeps the first language for older readers
+    outputs = {lang: describe_output(output_key) for lang, output_key in output_keys.items()}
+    primary = next(iter(output_keys))
+    names = {'#status': 'status', '#checkpoint': 'checkpoint', '#languages': 'languages'}
+    values = {
+        ':status': 'COMPLETED',
+        ':file': output_keys[primary],
+        ':size': outputs[primary]['size'],
+        ':etag': outputs[primary]['etag'],
+        ':last_modified': outputs[primary]['last_modified']
+    }
+    assignments = [
+        '#status = :status',
+        'translated_file = :file',
+        'output_size = :size',
+        'output_etag = :etag',
+        'output_last_modified = :last_modified'
+    ]
+    if 'shard_index' in message:
+        # Redelivered shard messages stop at this marker
+        assignments.append('assembled = :assembled')
+        values[':assembled'] = datetime.now().isoformat()
+    if rows_total is not None:
+        # The shards counted their rows exactly, replacing the estimate made while planning
+        assignments += ['rows_total = :rows_total', 'rows_total_estimated = :estimated']
+        values.update({':rows_total': rows_total, ':estimated': False})
+    if message.get('incremental'):
+        # The next version of this file is matched against the row index
+        assignments.append('row_index = :row_index')
+        values[':row_index'] = row_index_key(message['file_id'])
+    if rows_reused is not None:
+        assignments.append('rows_reused = :rows_reused')
+        values[':rows_reused'] = rows_reused.get(primary, 0)
+        for lang, count in rows_reused.items():
+            outputs[lang]['rows_reused'] = count
+        print(f"Reused previous translations of {rows_reused} rows per language")
+    for i, (lang, output_key) in enumerate(output_keys.items()):
+        names[f'#lang{i}'] = lang
+        values[f':lang{i}'] = dict(outputs[lang], status='COMPLETED', translated_file=output_key)
+        assignments.append(f'#languages.#lang{i} = :lang{i}')
+    table.update_item(
+            Key=key,  # Use the full key again
+            UpdateExpression='SET ' + ', '.join(assignments) + ' REMOVE #checkpoint',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+    )
+
+def lambda_handler(event, context):
+    """Process a batch of queue messages, reporting failed records individually.
+
+    Only the failed messages are returned to the queue, and the event source
+    mapping reports them via ReportBatchItemFailures.
+    """
+    metrics.reset()
+    deadline.start(context)
+    log_debug(f"Received event: {json.dumps(event)}")
+    batch_item_failures = []
+    file_ids = []
+    for record in event['Records']:
+        try:
+            message = json.loads(record['body'])
+            file_ids.append(message.get('file_id'))
+            process_message(message)
+        except Exception as e:
+            print(f"Failed to process message {record.get('messageId')}: {str(e)}")
+            traceback.print_exc()
+            batch_item_failures.append({'itemIdentifier': record['messageId']})
+    
+    metrics.add('Messages', len(event['Records']))
+    metrics.add('FailedMessages', len(batch_item_failures))
+    metrics.emit(
+        getattr(context, 'function_name', None) or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'translation_processor'),
+        FileIds=file_ids
+    )
+    return {'batchItemFailures': batch_item_failures}
@@ -1,3 +1,6 @@
+import time
+_import_started = time.perf_counter()
+
 import boto3
 import os
 import json
@@ -5,77 +8,357 @@ import uuid
 import base64
 import csv
 import io
-from datetime import datetime
+import re
+import codecs
+import itertools
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from translation_common import (
+    metrics, deadline, TimedClient, TranslationCache, TokenBucket, call_translate, detect_column_languages,
+    profile_columns, build_batches, translate_batch, iter_chunks, detect_encoding, compress_block,
+    DecompressingReader, open_body, TimedReader, MultipartUploadWriter, row_writer, zstandard, pyarrow,
+    BATCH_SEPARATOR, OUTPUT_COMPRESSIONS, OUTPUT_FORMATS, PROFILE_SAMPLE_ROWS
+)
+
+# Reported once per container on cold start
+IMPORT_DURATION_MS = round((time.perf_counter() - _import_started) * 1000, 2)
+
+# DEBUG adds full payloads (raw events, cache statistics) to the logs
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+def log_debug(message):
+    if LOG_LEVEL == 'DEBUG':
+        print(message)
+
+# Translate errors caused by the request itself; the API reports them as 400, anything else as 500
+TRANSLATE_INPUT_ERRORS = (
+    'UnsupportedLanguagePairException',
+    'DetectedLanguageLowConfidenceException',
+    'TextSizeLimitExceededException',
+    'InvalidRequestException'
+)
+
+# Streaming: rows are translated in chunks and written out in multipart parts
+CSV_CHUNK_ROWS = int(os.environ.get('CSV_CHUNK_ROWS', '5000'))
+
+# Resolved API keys are cached per container; unknown keys only briefly
+API_KEY_CACHE_TTL = int(os.environ.get('API_KEY_CACHE_TTL', '300'))
+API_KEY_NEGATIVE_CACHE_TTL = int(os.environ.get('API_KEY_NEGATIVE_CACHE_TTL', '30'))
+API_KEY_CACHE_SIZE = int(os.environ.get('API_KEY_CACHE_SIZE', '1024'))
+# Cached keys older than this are re-checked against their user's item so a revocation lands within seconds
+API_KEY_RECHECK_SECONDS = int(os.environ.get('API_KEY_RECHECK_SECONDS', '5'))
+
+# api_key -> (monotonic expiry, monotonic time last checked, user record or {} for an invalid key);
+# event records resolve keys concurrently
+_api_key_cache = OrderedDict()
+_api_key_cache_lock = threading.Lock()
+
+# Translated files live under OUTPUT_PREFIX/YYYY/MM/DD/ so listings can read one day at a time
+OUTPUT_PREFIX = os.environ.get('OUTPUT_PREFIX', 'translated/')
+
+# Inputs above the threshold are split into row-aligned shards of about SHARD_TARGET_BYTES
+SHARD_THRESHOLD_BYTES = int(os.environ.get('SHARD_THRESHOLD_BYTES', str(20 * 1024 * 1024)))
+SHARD_TARGET_BYTES = int(os.environ.get('SHARD_TARGET_BYTES', str(10 * 1024 * 1024)))
+# Planning reads the head of the file for the header and the profiling sample, then a small
+# window at each cut point, moved forward to the first line that starts a run of whole rows
+SHARD_PLAN_HEAD_BYTES = int(os.environ.get('SHARD_PLAN_HEAD_BYTES', str(1024 * 1024)))
+SHARD_BOUNDARY_WINDOW_BYTES = int(os.environ.get('SHARD_BOUNDARY_WINDOW_BYTES', str(64 * 1024)))
+SHARD_BOUNDARY_CHECK_ROWS = 3
+
+# Posted CSVs are translated inside the API request up to this many translatable cells
+# (rows x translated columns x target languages); larger ones are staged under STAGED_PREFIX and queued
+INLINE_MAX_CELLS = int(os.environ.get('INLINE_MAX_CELLS', '1000'))
+STAGED_PREFIX = os.environ.get('STAGED_PREFIX', 'staged/')
+
+# Queued jobs of up to SMALL_JOB_MAX_BYTES (input size x target languages) go to the fast lane
+# queue, SMALL_JOB_QUEUE_URL, so bulk uploads never sit in front of them; unset, all jobs share one queue
+SMALL_JOB_MAX_BYTES = int(os.environ.get('SMALL_JOB_MAX_BYTES', str(1024 * 1024)))
+
+# Records of one S3/SQS event prepared at once; their metadata items and queue messages are then
+# written together with BatchWriteItem and SendMessageBatch
+EVENT_RECORD_WORKERS = int(os.environ.get('EVENT_RECORD_WORKERS', '8'))
+# SendMessageBatch takes up to 10 messages and 256 KB in total
+SQS_BATCH_ENTRIES = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
+
+def size_class(size, target_langs):
+    """'small' for jobs light enough for the fast lane, 'bulk' otherwise"""
+    return 'small' if size * max(1, len(target_langs)) <= SMALL_JOB_MAX_BYTES else 'bulk'
+
+# Compressed request bodies may expand to at most this many bytes
+MAX_DECOMPRESSED_BYTES = int(os.environ.get('MAX_DECOMPRESSED_BYTES', str(10 * 1024 * 1024)))
+
+def output_settings(options):
+    """Format, Parquet codec and Content-Encoding of a job's translated files"""
+    options = options or {}
+    output_format = options.get('output_format') or 'csv'
+    compression = options.get('output_compression')
+    if output_format == 'parquet':
+        # Parquet compresses its own pages
+        return output_format, compression, None
+    return output_format, None, compression
+
+# Per-job options accepted from API requests and forwarded in queue messages
+LIST_JOB_OPTIONS = ('include_columns', 'exclude_columns', 'target_langs')
+SCALAR_JOB_OPTIONS = ('source_lang', 'output_compression', 'output_format', 'key_column')
+
+# Incremental jobs write a row index, and a re-upload of the same key by the same user
+# reuses the previous version's translations for unchanged rows; off unless incremental=true
+INCREMENTAL_DEFAULT = os.environ.get('INCREMENTAL_DEFAULT', 'false').lower() == 'true'
+
+# A repeat upload of the same bytes with the same options is linked to a job completed
+# within this many hours instead of being translated again; 0 turns deduplication off
+DEDUP_WINDOW_HOURS = float(os.environ.get('DEDUP_WINDOW_HOURS', '720'))
+
+def content_hash(user_id, etag, size, options):
+    """Identity of a user's object bytes (S3 ETag and size) together with the job options that shape its output.
+
+    The user is part of the identity, so a repeat upload is only ever linked to
+    outputs of the same user's earlier job.
+    """
+    job = {name: options.get(name) for name in LIST_JOB_OPTIONS + SCALAR_JOB_OPTIONS}
+    job['target_langs'] = sorted(job['target_langs'] or [])
+    identity = json.dumps([user_id, etag.strip('"'), int(size), job], sort_keys=True)
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+# Lives for the lifetime of the container so warm invocations share the LRU
+_translation_cache = None
+_rate_limiter = None
+# Event records are prepared on worker threads, any of which may create these first
+_shared_lock = threading.Lock()
+
+def get_translation_cache(dynamodb):
+    """Return the container-wide translation cache, creating it on first use"""
+    global _translation_cache
+    if _translation_cache is None:
+        with _shared_lock:
+            if _translation_cache is None:
+                _translation_cache = TranslationCache(
+                    dynamodb,
+                    os.environ.get('CACHE_TABLE'),
+                    int(os.environ.get('LRU_CACHE_SIZE', '50000')),
+                    int(os.environ.get('CACHE_TTL_DAYS', '30'))
+                )
+    return _translation_cache
+
+def get_rate_limiter(dynamodb):
+    """Return the container-wide Translate rate limiter, creating it on first use"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _shared_lock:
+            if _rate_limiter is None:
+                rate = float(os.environ.get('TRANSLATE_RATE_LIMIT', '0'))
+                _rate_limiter = TokenBucket(
+                    dynamodb,
+                    os.environ.get('RATE_LIMIT_TABLE'),
+                    'translate',
+                    rate,
+                    float(os.environ.get('TRANSLATE_RATE_BURST', '0')) or rate,
+                    int(os.environ.get('RATE_LIMIT_LEASE', '5'))
+                )
+    return _rate_limiter
+
+class PendingJobs:
+    """Metadata items and queue messages of an event's records, held back to be written in batches"""
+
+    def __init__(self):
+        self.items = []
+        self.messages = {}
+        # Records are prepared from concurrent threads
+        self.lock = threading.Lock()
+
+    def add_item(self, item):
+        with self.lock:
+            self.items.append(item)
+
+    def add_messages(self, queue_url, file_id, entries):
+        with self.lock:
+            self.messages.setdefault(queue_url, []).extend((file_id, entry) for entry in entries)
 
 class TranslationService:
+    """Created once per container; AWS clients are built lazily on first use"""
+
     def __init__(self):
-        self._initialize_clients()
+        self._clients = {}
+        # Reentrant, as the table factories go through the dynamodb property
+        self._clients_lock = threading.RLock()
+        self.client_init_ms = {}
         self._load_environment_variables()
-        self.api_keys_table = self.dynamodb.Table('ApiKeyMetadata') 
-        
-    def _initialize_clients(self):
-        """Initialize AWS clients with error handling"""
-        try:
-            self.s3 = boto3.client('s3')
-            self.sqs = boto3.client('sqs')
-            self.dynamodb = boto3.resource('dynamodb')
-            self.translate = boto3.client('translate')
-        except Exception as e:
-            raise RuntimeError(f"Client initialization failed: {str(e)}")
+
+    def _lazy_client(self, name, factory):
+        """Create an AWS client or resource on first use and time its creation"""
+        if name not in self._clients:
+            with self._clients_lock:
+                if name not in self._clients:
+                    started = time.perf_counter()
+                    try:
+                        self._clients[name] = factory()
+                    except Exception as e:
+                        raise RuntimeError(f"Client initialization failed: {str(e)}")
+                    self.client_init_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+        return self._clients[name]
+
+    @property
+    def s3(self):
+        return self._lazy_client('s3', lambda: boto3.client('s3'))
+
+    @property
+    def sqs(self):
+        return self._lazy_client('sqs', lambda: boto3.client('sqs'))
+
+    @property
+    def dynamodb(self):
+        return self._lazy_client('dynamodb', lambda: boto3.resource('dynamodb'))
+
+    @property
+    def translate(self):
+        # call_translate is the only retry layer, so the client itself does not retry
+        return self._lazy_client('translate', lambda: boto3.client(
+            'translate', config=Config(retries={'mode': 'standard', 'max_attempts': 1})
+        ))
+
+    @property
+    def comprehend(self):
+        return self._lazy_client('comprehend', lambda: boto3.client('comprehend'))
+
+    @property
+    def table(self):
+        return self._lazy_client('metadata_table', lambda: TimedClient(self.dynamodb.Table(self.metadata_table), 'DynamoDB'))
+
+    @property
+    def api_keys_table(self):
+        return self._lazy_client('api_keys_table', lambda: TimedClient(self.dynamodb.Table('ApiKeyMetadata'), 'DynamoDB'))
+
+    @property
+    def cache(self):
+        return get_translation_cache(self.dynamodb)
+
+    @property
+    def rate_limiter(self):
+        return get_rate_limiter(self.dynamodb)
     
     def _load_environment_variables(self):
         """Load required environment variables"""
         try:
             self.metadata_table = os.environ['METADATA_TABLE']
             self.sqs_queue_url = os.environ['SQS_QUEUE_URL']
+            self.small_job_queue_url = os.environ.get('SMALL_JOB_QUEUE_URL') or self.sqs_queue_url
             self.input_bucket = os.environ['INPUT_BUCKET']
             self.output_bucket = os.environ['OUTPUT_BUCKET']
             self.source_lang = os.environ.get('SOURCE_LANG', 'auto')
-            self.target_lang = os.environ.get('TARGET_LANG', 'es')
-            
-            self.table = self.dynamodb.Table(self.metadata_table)
+            self.target_langs = [
+                lang.strip()
+                for lang in os.environ.get('TARGET_LANGS', os.environ.get('TARGET_LANG', 'es')).split(',')
+                if lang.strip()
+            ]
+            self.target_lang = self.target_langs[0]
         except KeyError as e:
             raise RuntimeError(f"Missing environment variable: {str(e)}")
 
     def _get_user_from_api_key(self, api_key):
-        """Query the ApiKeyIndex GSI correctly"""
+        """Resolve an API key to its user, through the in-container key cache"""
+        if not api_key:
+            print("Empty API key received")
+            return {}
+
+        now = time.monotonic()
+        with _api_key_cache_lock:
+            cached = _api_key_cache.get(api_key)
+            if cached and cached[0] > now:
+                _api_key_cache.move_to_end(api_key)
+        if cached and cached[0] > now:
+            expiry, checked_at, user_data = cached
+            if not user_data or now - checked_at < API_KEY_RECHECK_SECONDS:
+                return user_data
+            return self._recheck_api_key(api_key, expiry, user_data)
+
         try:
-            if not api_key:
-                print("Empty API key received")
-                return {}
-
-            response = self.api_keys_table.query(
-                IndexName='ApiKeyIndex',
-                KeyConditionExpression='api_key = :api_key',
-                ExpressionAttributeValues={
-                    ':api_key': api_key
-                },
-                Limit=1
-            )
-            
-            print(f"Query response: {response}")  # Debug output
-            
-            if not response.get('Items'):
-                print(f"No user found for API key: {api_key}")
-                return {}
-                
-            user_data = response['Items'][0]
-            
-            # Verify required fields
-            if not all(k in user_data for k in ['user_id', 'user_email']):
-                print(f"Malformed user data: {user_data}")
-                return {}
-                
-            return user_data
-            
+            user_data = self._query_api_key(api_key)
+        except ClientError as e:
+            # Lookup failures are not cached, the next request tries again
+            print(f"DynamoDB error: {e.response['Error']['Message']}")
+            return {}
+
+        ttl = API_KEY_CACHE_TTL if user_data else API_KEY_NEGATIVE_CACHE_TTL
+        if user_data.get('expires_at'):
+            # Never serve a key from cache past its expiry
+            remaining = (datetime.fromisoformat(user_data['expires_at']) - datetime.now()).total_seconds()
+            ttl = max(0, min(ttl, remaining))
+        now = time.monotonic()
+        with _api_key_cache_lock:
+            _api_key_cache[api_key] = (now + ttl, now, user_data)
+            _api_key_cache.move_to_end(api_key)
+            while len(_api_key_cache) > API_KEY_CACHE_SIZE:
+                _api_key_cache.popitem(last=False)
+        return user_data
+
+    def _recheck_api_key(self, api_key, expiry, user_data):
+        """Confirm a cached key is still active with a consistent read of its user's item"""
+        try:
+            item = self.api_keys_table.get_item(
+                Key={'user_id': user_data['user_id']},
+                ProjectionExpression='api_key, is_active, expires_at',
+                ConsistentRead=True
+            ).get('Item')
         except ClientError as e:
+            # Keep serving the cached entry until its TTL, the next request checks again
             print(f"DynamoDB error: {e.response['Error']['Message']}")
+            return user_data
+
+        if (not item or item.get('api_key') != api_key or not item.get('is_active', True)
+                or (item.get('expires_at') and datetime.fromisoformat(item['expires_at']) <= datetime.now())):
+            print(f"API key no longer valid for user: {user_data['user_id']}")
+            # Cache the refusal, the ApiKeyIndex GSI can still list the key as active for a moment
+            now = time.monotonic()
+            with _api_key_cache_lock:
+                _api_key_cache[api_key] = (now + API_KEY_NEGATIVE_CACHE_TTL, now, {})
+            return {}
+
+        with _api_key_cache_lock:
+            if api_key in _api_key_cache:
+                _api_key_cache[api_key] = (expiry, time.monotonic(), user_data)
+        return user_data
+
+    def _query_api_key(self, api_key):
+        """Query the ApiKeyIndex GSI and validate the key's state"""
+        response = self.api_keys_table.query(
+            IndexName='ApiKeyIndex',
+            KeyConditionExpression='api_key = :api_key',
+            ExpressionAttributeValues={
+                ':api_key': api_key
+            },
+            Limit=1
+        )
+        
+        if not response.get('Items'):
+            print(f"No user found for API key: {api_key[:8]}...")
             return {}
+            
+        user_data = response['Items'][0]
+        
+        # Verify required fields
+        if not all(k in user_data for k in ['user_id', 'user_email']):
+            print(f"Malformed user data for user: {user_data.get('user_id')}")
+            return {}
+        
+        # Revoked or expired keys are treated as unknown
+        if not user_data.get('is_active', True):
+            print(f"Revoked API key for user: {user_data['user_id']}")
+            return {}
+        if user_data.get('expires_at') and datetime.fromisoformat(user_data['expires_at']) <= datetime.now():
+            print(f"Expired API key for user: {user_data['user_id']}")
+            return {}
+            
+        return user_data
     def handle_event(self, event, context):
         """Main entry point for Lambda function"""
         try:
-            print("Raw event:", json.dumps(event, indent=2))
+            log_debug(f"Raw event: {json.dumps(event)}")
             
             if 'requestContext' in event:
                 return self._handle_api_request(event)
@@ -129,7 +412,11 @@ class TranslationService:
             try:
                 sample_lines = file_content.split('\n')[:3]
                 csv.Sniffer().sniff('\n'.join(sample_lines))
-                result = self.process_csv_content(file_content, user_id, user_email)
+                params = event.get('queryStringParameters') or {}
+                include_content = str(params.get('include_content', 'true')).lower() not in ('false', '0', 'no')
+                result = self.process_csv_content(
+                    file_content, user_id, user_email, self._job_options(params), include_content
+                )
                 return self._create_response(200, result)
             except csv.Error:
                 # Not CSV, try JSON
@@ -138,14 +425,24 @@ class TranslationService:
                         body = json.loads(file_content)
                         if 'file_key' in body:
                             result = self.process_file_upload(
-                                self.input_bucket, body['file_key'], user_id, user_email
+                                self.input_bucket, body['file_key'], user_id, user_email,
+                                options=self._job_options(body)
                             )
+                        elif 'text' in body and 'target_langs' in body:
+                            source_lang, target_langs = self._job_languages(self._job_options(body))
+                            result = {
+                                'translations': {
+                                    lang: self.translate_values([body['text']], source_lang, lang).get(body['text'], body['text'])
+                                    for lang in target_langs
+                                },
+                                'status': 'COMPLETED'
+                            }
                         elif 'text' in body:
-                            translated_text = self.translate_text(
-                                body['text'],
+                            translated_text = self.translate_values(
+                                [body['text']],
                                 body.get('source_lang', self.source_lang),
                                 body.get('target_lang', self.target_lang)
-                            )
+                            ).get(body['text'], body['text'])
                             result = {'translatedText': translated_text, 'status': 'COMPLETED'}
                         else:
                             return self._create_response(400, {'error': 'Invalid JSON structure'})
@@ -158,9 +455,52 @@ class TranslationService:
                 'suggested_types': ['text/csv', 'application/json']
             })
 
+        except ValueError as e:
+            return self._create_response(400, {'error': str(e)})
+        except ClientError as e:
+            if e.response['Error']['Code'] in TRANSLATE_INPUT_ERRORS:
+                return self._create_response(400, {'error': e.response['Error'].get('Message') or str(e)})
+            print(f"API request error: {str(e)}")
+            return self._create_response(500, {'error': str(e)})
         except Exception as e:
             print(f"API request error: {str(e)}")
             return self._create_response(500, {'error': str(e)})
+    def _job_options(self, params):
+        """Pick the recognised per-job options out of a JSON body or query string"""
+        options = {}
+        for name in LIST_JOB_OPTIONS:
+            value = params.get(name)
+            if isinstance(value, str):
+                value = [v.strip() for v in value.split(',') if v.strip()]
+            if value:
+                options[name] = list(value)
+        for name in SCALAR_JOB_OPTIONS:
+            if params.get(name):
+                options[name] = str(params[name])
+        compression = options.get('output_compression')
+        if compression:
+            compression = options['output_compression'] = compression.lower()
+            if compression not in OUTPUT_COMPRESSIONS:
+                raise ValueError(f"output_compression must be one of {', '.join(OUTPUT_COMPRESSIONS)}")
+            if compression == 'zstd' and zstandard is None:
+                raise ValueError("zstd output is not available")
+        output_format = options.get('output_format')
+        if output_format:
+            output_format = options['output_format'] = output_format.lower()
+            if output_format not in OUTPUT_FORMATS:
+                raise ValueError(f"output_format must be one of {', '.join(OUTPUT_FORMATS)}")
+            if output_format == 'parquet' and pyarrow is None:
+                raise ValueError("parquet output is not available")
+        if params.get('incremental') is not None:
+            options['incremental'] = str(params['incremental']).lower() not in ('false', '0', 'no')
+        return options
+
+    def _job_languages(self, options=None):
+        """Source language and de-duplicated target languages of a job"""
+        options = options or {}
+        targets = options.get('target_langs') or self.target_langs
+        return options.get('source_lang') or self.source_lang, list(dict.fromkeys(targets))
+
     def _get_user_info_from_tags(self, bucket, key):
             """Extract user information from S3 object tags"""
             try:
@@ -183,84 +523,480 @@ class TranslationService:
                 print(f"Error getting tags: {str(e)}")
                 return 'system@s3_upload.com', 'SYSTEM_UPLOAD'
     def _handle_s3_sqs_event(self, event):
-        """Handle events from S3 or SQS with proper user email extraction"""
+        """Handle events from S3 or SQS with proper user email extraction.
+
+        Records are prepared concurrently, then the metadata items and queue
+        messages of all their jobs are written in batches. A record that fails
+        is listed under failures; failed SQS records are also returned as
+        batchItemFailures so only they are retried.
+        """
+        records = event['Records']
+        pending = PendingJobs()
+        with ThreadPoolExecutor(max_workers=max(1, min(EVENT_RECORD_WORKERS, len(records)))) as executor:
+            outcomes = list(executor.map(lambda record: self._handle_record(record, pending), records))
+        failed_jobs = self._flush_pending_jobs(pending)
+
         results = []
-        for record in event['Records']:
-            try:
-                if 's3' in record:
-                    bucket = record['s3']['bucket']['name']
-                    key = record['s3']['object']['key']
-                    
-                    # Try to get user info from S3 object metadata
-                    try:
-                        user_email, user_id = self._get_user_info_from_tags(bucket, key)
-                        print(f"Processing file for user: {user_email} (ID: {user_id})")
-                        metadata = self.s3.head_object(
-                            Bucket=bucket,
-                            Key=key
-                        )['Metadata']
-                     
-                        if not user_email or not user_id:
-                            # Fall back to extracting from API key if available
-                            api_key = metadata.get('x-amz-meta-api-key')
-                            if api_key:
-                                user_info = self._get_user_from_api_key(api_key)
-                                user_email = user_info.get('user_email')
-                                user_id = user_info.get('user_id')
-                    except ClientError as e:
-                        print(f"Error getting object metadata: {str(e)}")
-                        user_email = None
-                        user_id = None
-                    
-                    # If we still don't have user info, use SYSTEM as fallback
-                    if not user_email or not user_id:
-                        user_email = 'system@s3_upload.com'
-                        user_id = 'SYSTEM_UPLOAD'
-                    
-                    result = self.process_file_upload(
-                        bucket, key, user_id, user_email
-                    )
-                    
-                elif 'body' in record:
-                    message = json.loads(record['body'])
-                    result = self._process_sqs_message(message)
-                else:
-                    continue
-                    
-                results.append(result)
-            except Exception as e:
-                print(f"Error processing record: {str(e)}")
+        failures = []
+        batch_item_failures = []
+        for record, (result, error) in zip(records, outcomes):
+            if error is None and result and result.get('file_id') in failed_jobs:
+                error = failed_jobs[result['file_id']]
+            if error is None:
+                if result is not None:
+                    results.append(result)
                 continue
+            if 'messageId' in record:
+                batch_item_failures.append({'itemIdentifier': record['messageId']})
+            failures.append({'record': self._record_id(record), 'error': error})
 
-        return self._create_response(200, {
+        response = self._create_response(200, {
             'message': 'Event processed',
             'processed_count': len(results),
-            'results': results
+            'results': results,
+            'failed_count': len(failures),
+            'failures': failures
         })
+        if any('messageId' in record for record in records):
+            response['batchItemFailures'] = batch_item_failures
+        return response
 
-    def process_file_upload(self, bucket, key, user_id, user_email):
-        """Handle file upload process with proper user email"""
+    @staticmethod
+    def _record_id(record):
+        """SQS message id, or bucket/key of an S3 record"""
+        if 's3' in record:
+            return f"{record['s3']['bucket']['name']}/{record['s3']['object']['key']}"
+        return record.get('messageId')
+
+    def _handle_record(self, record, pending):
+        """Prepare one event record; returns its result and the error message when it failed"""
+        try:
+            if 's3' in record:
+                bucket = record['s3']['bucket']['name']
+                key = record['s3']['object']['key']
+                
+                if key.startswith(STAGED_PREFIX):
+                    # Staged by a direct upload, which queued the job itself
+                    print(f"Skipping staged upload {key}")
+                    return None, None
+                
+                # Try to get user info from S3 object metadata
+                try:
+                    user_email, user_id = self._get_user_info_from_tags(bucket, key)
+                    print(f"Processing file for user: {user_email} (ID: {user_id})")
+                    metadata = self.s3.head_object(
+                        Bucket=bucket,
+                        Key=key
+                    )['Metadata']
+                 
+                    if not user_email or not user_id:
+                        # Fall back to extracting from API key if available
+                        api_key = metadata.get('x-amz-meta-api-key')
+                        if api_key:
+                            user_info = self._get_user_from_api_key(api_key)
+                            user_email = user_info.get('user_email')
+                            user_id = user_info.get('user_id')
+                except ClientError as e:
+                    print(f"Error getting object metadata: {str(e)}")
+                    user_email = None
+                    user_id = None
+                
+                # If we still don't have user info, use SYSTEM as fallback
+                if not user_email or not user_id:
+                    user_email = 'system@s3_upload.com'
+                    user_id = 'SYSTEM_UPLOAD'
+                
+                return self.process_file_upload(
+                    bucket, key, user_id, user_email,
+                    size=record['s3']['object'].get('size'),
+                    etag=record['s3']['object'].get('eTag'),
+                    pending=pending
+                ), None
+                
+            if 'body' in record:
+                message = json.loads(record['body'])
+                return self._process_sqs_message(message), None
+            return None, None
+        except Exception as e:
+            print(f"Error processing record {self._record_id(record)}: {str(e)}")
+            return None, str(e)
+
+    def _flush_pending_jobs(self, pending):
+        """Write the held-back metadata items, then queue the messages of the jobs that were recorded.
+
+        Returns a file_id -> error map of the jobs that could not be recorded or
+        queued; recorded jobs whose messages failed are marked FAILED. Jobs
+        without a record get none, so no half-empty item is left behind.
+        """
+        failed = {}
+        unqueued = []
+        timestamps = {item['file_id']: item['timestamp'] for item in pending.items}
+        for i in range(0, len(pending.items), 25):
+            chunk = pending.items[i:i + 25]
+            request = {self.metadata_table: [{'PutRequest': {'Item': item}} for item in chunk]}
+            try:
+                for attempt in range(4):
+                    with metrics.timer('DynamoDB'):
+                        request = self.dynamodb.batch_write_item(RequestItems=request).get('UnprocessedItems')
+                    if not request:
+                        break
+                    time.sleep(0.05 * (2 ** attempt))
+                for put in (request or {}).get(self.metadata_table, []):
+                    failed[put['PutRequest']['Item']['file_id']] = 'Job record was not written'
+            except Exception as e:
+                print(f"Batch write of job records failed: {str(e)}")
+                failed.update((item['file_id'], f"Job record was not written: {str(e)}") for item in chunk)
+
+        queued = 0
+        for queue_url, messages in pending.messages.items():
+            messages = [(file_id, entry) for file_id, entry in messages if file_id not in failed]
+            for batch in self._message_batches(messages):
+                entries = [dict(entry, Id=str(n)) for n, (_, entry) in enumerate(batch)]
+                try:
+                    response = self.sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
+                    errors = {int(f['Id']): f.get('Message') or f.get('Code') for f in response.get('Failed', [])}
+                except Exception as e:
+                    errors = {n: str(e) for n in range(len(batch))}
+                queued += len(batch) - len(errors)
+                for n, error in errors.items():
+                    failed[batch[n][0]] = f"Failed to queue job: {error}"
+                    unqueued.append(batch[n][0])
+        if pending.items:
+            print(f"Recorded {len(pending.items)} jobs and queued {queued} messages in batches")
+
+        for file_id in dict.fromkeys(unqueued):
+            if file_id in timestamps:
+                try:
+                    self._mark_job_failed(file_id, timestamps[file_id])
+                except Exception as e:
+                    print(f"Could not mark job {file_id} as failed: {str(e)}")
+        return failed
+
+    @staticmethod
+    def _message_batches(messages):
+        """Split (file_id, entry) pairs into SendMessageBatch calls of at most 10 entries and 256 KB"""
+        batch = []
+        batch_size = 0
+        for file_id, entry in messages:
+            size = len(entry['MessageBody'].encode('utf-8'))
+            if batch and (len(batch) == SQS_BATCH_ENTRIES or batch_size + size > SQS_BATCH_MAX_BYTES):
+                yield batch
+                batch = []
+                batch_size = 0
+            batch.append((file_id, entry))
+            batch_size += size
+        if batch:
+            yield batch
+
+    def process_file_upload(self, bucket, key, user_id, user_email, size=None, options=None, etag=None,
+                            pending=None):
+        """Handle file upload process with proper user email.
+
+        An object whose bytes and options match a job completed within
+        DEDUP_WINDOW_HOURS is linked to that job's outputs and completes at once.
+        An incremental job for a key the user uploaded before is pointed at the
+        previous version, so only new and changed rows are translated. With
+        pending, the job's record and messages are left there to be written in
+        batches instead of being written now.
+        """
         file_id = str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
+        source_lang, target_langs = self._job_languages(options)
+        options = dict(options or {}, source_lang=source_lang, target_langs=target_langs)
+        # Staged direct uploads get a fresh key each time, so there is never a version to build on
+        options.setdefault('incremental', INCREMENTAL_DEFAULT and not key.startswith(STAGED_PREFIX))
+        source_file = f"{user_id}/{bucket}/{key}"
         
         try:
+            if size is None or (etag is None and DEDUP_WINDOW_HOURS > 0):
+                head = self.s3.head_object(Bucket=bucket, Key=key)
+                size, etag = head['ContentLength'], head['ETag']
+            digest = content_hash(user_id, etag, size, options) if DEDUP_WINDOW_HOURS > 0 else None
+            if digest:
+                original = self._find_completed_duplicate(digest, user_id, target_langs)
+                if original:
+                    return self._link_duplicate(
+                        original, digest, user_id, user_email, timestamp, key, bucket, target_langs, source_file,
+                        pending
+                    )
+
+            previous = self._find_previous_version(source_file, target_langs) if options['incremental'] else None
+            if previous:
+                options['previous'] = previous
+
+            # Large inputs are split so shards can be translated in parallel
+            shards = None
+            # Byte ranges of a compressed object are not valid streams, so those run whole. A revision
+            # of a previous version translates few rows, so it runs whole too and reuses the rest in order
+            if size > SHARD_THRESHOLD_BYTES and not previous and not self._is_compressed(bucket, key):
+                shards = self._plan_shards(bucket, key, size, options)
+            job_class = 'bulk' if shards else size_class(size, target_langs)
+            
             # Create DynamoDB record with actual user email
-            self._create_dynamo_record(file_id, user_id, user_email, timestamp, key, bucket)
-            self._send_sqs_message(bucket, key, file_id)
+            extra_attributes = {
+                'target_langs': target_langs,
+                'languages': {lang: {'status': 'QUEUED'} for lang in target_langs},
+                'rows_done': {},
+                'size_class': job_class
+            }
+            if digest:
+                extra_attributes['content_hash'] = digest
+            if options['incremental']:
+                extra_attributes['source_file'] = source_file
+            if previous:
+                extra_attributes['previous_file_id'] = previous['file_id']
+            if shards:
+                # Planning estimated the rows from the head of the file; the processor counts them on completion
+                extra_attributes['shard_count'] = len(shards['ranges'])
+                extra_attributes['rows_total'] = shards['row_count']
+                extra_attributes['rows_total_estimated'] = shards['row_count_estimated']
+            self._create_dynamo_record(
+                file_id, user_id, user_email, timestamp, key, bucket,
+                extra_attributes=extra_attributes, pending=pending
+            )
+            self._send_sqs_message(bucket, key, file_id, timestamp, shards, options, user_id, job_class, pending)
             
             return {
                 'file_id': file_id,
                 'status': 'QUEUED',
-                'user_email': user_email  # Include email in response for tracking
+                'user_email': user_email,  # Include email in response for tracking
+                'target_langs': target_langs,
+                'shard_count': len(shards['ranges']) if shards else 1,
+                'size_class': job_class
             }
             
         except Exception as e:
             print(f"File upload error: {str(e)}")
             raise   
 
+    def _find_completed_duplicate(self, digest, user_id, target_langs):
+        """Newest job of user_id with this content hash, completed in every target language within DEDUP_WINDOW_HOURS"""
+        since = (datetime.now() - timedelta(hours=DEDUP_WINDOW_HOURS)).isoformat()
+        response = self.table.query(
+            IndexName='ContentHashIndex',
+            KeyConditionExpression='content_hash = :hash AND #timestamp >= :since',
+            ExpressionAttributeNames={'#timestamp': 'timestamp'},
+            ExpressionAttributeValues={':hash': digest, ':since': since},
+            ScanIndexForward=False
+        )
+        for item in response.get('Items', []):
+            languages = item.get('languages', {})
+            if item.get('user_id') == user_id and item.get('status') == 'COMPLETED' and all(
+                languages.get(lang, {}).get('status') == 'COMPLETED' for lang in target_langs
+            ):
+                return item
+        return None
+
+    def _link_duplicate(self, original, digest, user_id, user_email, timestamp, key, bucket, target_langs,
+                        source_file=None, pending=None):
+        """Record a repeat upload as completed with the outputs of the job it duplicates"""
+        file_id = str(uuid.uuid4())
+        # Always point at the job that wrote the outputs, not at another duplicate of it
+        source_id = original.get('duplicate_of') or original['file_id']
+        languages = {lang: original['languages'][lang] for lang in target_langs}
+        primary = languages[target_langs[0]]
+        self._create_dynamo_record(
+            file_id, user_id, user_email, timestamp, key, bucket,
+            extra_attributes={
+                'status': 'COMPLETED',
+                'translated_file': primary.get('translated_file'),
+                'output_size': primary.get('size'),
+                'output_etag': primary.get('etag'),
+                'output_last_modified': primary.get('last_modified'),
+                'target_langs': target_langs,
+                'languages': languages,
+                'rows_done': original.get('rows_done', {}),
+                'rows_total': original.get('rows_total'),
+                'rows_total_estimated': False,
+                'content_hash': digest,
+                'duplicate_of': source_id,
+                # A later revision of this key can build on the duplicated job's row index
+                **({'source_file': source_file, 'row_index': original['row_index']}
+                   if source_file and original.get('row_index') else {})
+            },
+            pending=pending
+        )
+        print(f"File {key} duplicates job {source_id}, linked as {file_id}")
+        return {
+            'file_id': file_id,
+            'status': 'COMPLETED',
+            'user_email': user_email,
+            'target_langs': target_langs,
+            'shard_count': 0,
+            'duplicate_of': source_id
+        }
+
+    def _find_previous_version(self, source_file, target_langs):
+        """Row index and outputs of the newest completed incremental job for the same user and key, or None"""
+        response = self.table.query(
+            IndexName='SourceFileIndex',
+            KeyConditionExpression='source_file = :source_file',
+            ExpressionAttributeValues={':source_file': source_file},
+            ScanIndexForward=False,
+            Limit=10
+        )
+        for item in response.get('Items', []):
+            if item.get('status') != 'COMPLETED' or not item.get('row_index'):
+                continue
+            outputs = {
+                lang: entry['translated_file']
+                for lang, entry in item.get('languages', {}).items()
+                if lang in target_langs and entry.get('status') == 'COMPLETED' and entry.get('translated_file')
+            }
+            if outputs:
+                print(f"Previous version of {source_file} is job {item['file_id']}")
+                return {'file_id': item['file_id'], 'row_index': item['row_index'], 'outputs': outputs}
+        return None
+
+    def _is_compressed(self, bucket, key):
+        """Whether an S3 object is gzip or zstd, by Content-Encoding or its first bytes"""
+        with metrics.timer('Download'):
+            response = self.s3.get_object(Bucket=bucket, Key=key, Range='bytes=0-3')
+            head = response['Body'].read()
+        return detect_encoding(response.get('ContentEncoding'), head) is not None
+
+    def _read_range(self, bucket, key, start, end):
+        """Bytes [start, end) of an S3 object"""
+        with metrics.timer('Download'):
+            return self.s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}")['Body'].read()
+
+    @staticmethod
+    def _starts_rows(data, field_count, complete):
+        """Whether data, read from a line start, opens with SHARD_BOUNDARY_CHECK_ROWS rows of field_count fields.
+
+        None means data ends before that can be told; complete says it runs to
+        the end of the object.
+        """
+        lines = data.decode('utf-8', 'ignore').split('\n')
+        tail = lines.pop()
+        lines = [line + '\n' for line in lines] + ([tail] if complete and tail else [])
+        consumed = 0
+
+        def feed():
+            nonlocal consumed
+            for line in lines:
+                consumed += 1
+                yield line
+
+        row_start = 0
+        for checked, row in enumerate(csv.reader(feed()), 1):
+            raw = ''.join(lines[row_start:consumed])
+            row_start = consumed
+            if raw.count('"') % 2:
+                # A quoted value runs past the data read, or the line starts inside one
+                return None if consumed == len(lines) and not complete else False
+            if len(row) != field_count:
+                return False
+            if checked == SHARD_BOUNDARY_CHECK_ROWS:
+                return True
+        return True if complete else None
+
+    def _find_row_boundary(self, bucket, key, target, size, field_count):
+        """Offset of the first row starting at or after target, read with ranged GETs.
+
+        Newlines inside quoted values are skipped because the rows following
+        them do not parse into the header's field count. Returns size when no
+        row starts after target.
+        """
+        start = target
+        window_bytes = SHARD_BOUNDARY_WINDOW_BYTES
+        while start < size:
+            end = min(size, start + window_bytes)
+            window = self._read_range(bucket, key, start, end)
+            position = window.find(b'\n')
+            while position != -1:
+                verdict = self._starts_rows(window[position + 1:], field_count, end == size)
+                if verdict:
+                    return start + position + 1
+                if verdict is None:
+                    break
+                position = window.find(b'\n', position + 1)
+            if position == -1:
+                start = end
+            elif position > 0:
+                # Read on from this line with the window it needs
+                start += position
+            else:
+                window_bytes *= 2
+        return size
+
+    def _plan_shards(self, bucket, key, size, options=None):
+        """Cut a CSV object into row-aligned byte ranges without reading all of it.
+
+        The header and the profiling sample come from the head of the object.
+        Every cut point is then found with a ranged GET about SHARD_TARGET_BYTES
+        after the previous one, moved forward to the next row boundary.
+        Returns the header row, the columns to translate and their source
+        languages (profiled once for all shards), the number of data rows,
+        estimated unless the head held the whole file, and a list of
+        [start, end) byte ranges.
+        """
+        options = options or {}
+        head = self._read_range(bucket, key, 0, min(size, SHARD_PLAN_HEAD_BYTES))
+        whole = len(head) == size
+        if not whole:
+            # Only whole lines; a row cut off at the end is dropped below
+            head = head[:head.rfind(b'\n') + 1]
+        offset = 0
+
+        def tracked_lines():
+            nonlocal offset
+            for line in io.BytesIO(head):
+                offset += len(line)
+                yield line.decode('utf-8')
+
+        reader = csv.reader(tracked_lines())
+        header = next(reader, None)
+        if not header:
+            raise ValueError(f"CSV file {key} has no header row")
+        if header[0].startswith('\ufeff'):
+            header[0] = header[0][1:]
+        data_start = offset
+
+        sample = []
+        row_count = 0
+        rows_end = data_start
+        with metrics.timer('Parse'):
+            for row in reader:
+                if not whole and offset == len(head) and len(row) != len(header):
+                    break
+                row_count += 1
+                rows_end = offset
+                if len(sample) < PROFILE_SAMPLE_ROWS:
+                    sample.append(row)
+        if not whole and row_count:
+            row_count = round(row_count * (size - data_start) / (rows_end - data_start))
+
+        boundaries = [data_start]
+        while boundaries[-1] + SHARD_TARGET_BYTES < size:
+            cut = self._find_row_boundary(bucket, key, boundaries[-1] + SHARD_TARGET_BYTES, size, len(header))
+            if cut >= size:
+                break
+            boundaries.append(cut)
+        boundaries.append(size)
+
+        ranges = [[start, end] for start, end in zip(boundaries, boundaries[1:]) if end > start]
+        print(f"Planned {len(ranges)} shards for {bucket}/{key} ({size} bytes)")
+        columns = profile_columns(
+            header, sample, options.get('include_columns'), options.get('exclude_columns')
+        )
+        column_langs = None
+        if self._job_languages(options)[0] == 'auto' and columns:
+            column_langs = detect_column_languages(self.comprehend, {
+                name: [row[i] for row in sample if i < len(row)] for i, name in enumerate(header) if name in columns
+            })
+        return {
+            'header': header,
+            'translate_columns': columns,
+            'column_langs': column_langs,
+            'ranges': ranges,
+            'row_count': row_count,
+            'row_count_estimated': not whole
+        }
+
     def _process_sqs_message(self, message):
         """Process message from SQS queue"""
-        result = self.process_csv_file(message['bucket'], message['key'])
+        result = self.process_csv_file(message['bucket'], message['key'], message)
         
         self.table.update_item(
             Key={'file_id': message['file_id']},
@@ -276,22 +1012,51 @@ class TranslationService:
 
   
 
-    def process_csv_content(self, csv_content, user_id, user_email):
-        """Process CSV content from request body"""
+    def process_csv_content(self, csv_content, user_id, user_email, options=None, include_content=True):
+        """Process CSV content from request body.
+
+        Small jobs are translated inline. Jobs estimated above INLINE_MAX_CELLS are
+        staged to the input bucket and queued, and only the file_id is returned.
+        """
         print("processing csv")
+        parsed = self._parse_csv_content(csv_content, options)
+        dialect, rows, columns = parsed
+        cells = max(0, len(rows) - 1) * len(columns) * len(self._job_languages(options)[1])
+        if cells > INLINE_MAX_CELLS:
+            print(f"Queueing direct upload of {cells} translatable cells")
+            return dict(self._stage_csv_content(csv_content, user_id, user_email, options),
+                        processing='queued', estimated_cells=cells)
+        
         file_id = str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
         print("got file id", file_id)
         try:
-            translated_rows, output_content = self._translate_csv_content(csv_content)
-            output_key = f"translated_{timestamp}_direct_upload.csv"
+            translated_rows, output_content = self._translate_csv_content(csv_content, options, parsed)
             
-            self.s3.put_object(
-                Bucket=self.output_bucket,
-                Key=output_key,
-                Body=output_content.encode('utf-8'),
-                ContentType='text/csv'
-            )
+            # One object per target language; the first one is the primary translated_file
+            translated_files = {}
+            outputs = {}
+            output_format, _, content_encoding = output_settings(options)
+            for lang, body in output_content.items():
+                output_key = self._output_key(self._output_file_name(timestamp, file_id, lang, 'direct_upload', options))
+                attributes = {'ContentType': OUTPUT_FORMATS[output_format][1]}
+                if content_encoding:
+                    body = compress_block(body, content_encoding)
+                    attributes['ContentEncoding'] = content_encoding
+                with metrics.timer('Upload'):
+                    response = self.s3.put_object(
+                        Bucket=self.output_bucket,
+                        Key=output_key,
+                        Body=body,
+                        **attributes
+                    )
+                translated_files[lang] = f"s3://{self.output_bucket}/{output_key}"
+                outputs[lang] = {
+                    'size': len(body),
+                    'etag': response['ETag'].strip('"'),
+                    'last_modified': datetime.now(timezone.utc).isoformat()
+                }
+            primary_lang = next(iter(translated_files))
             
             self.table.put_item(
                 Item={
@@ -301,154 +1066,389 @@ class TranslationService:
                     'timestamp': timestamp,
                     'status': 'COMPLETED',
                     'original_file': 'direct_upload',
-                    'translated_file': f"s3://{self.output_bucket}/{output_key}",
+                    'translated_file': translated_files[primary_lang],
+                    'output_size': outputs[primary_lang]['size'],
+                    'output_etag': outputs[primary_lang]['etag'],
+                    'output_last_modified': outputs[primary_lang]['last_modified'],
+                    'target_langs': list(translated_files),
+                    'rows_done': {'file': max(0, len(translated_rows[primary_lang]) - 1)},
+                    'rows_total': max(0, len(translated_rows[primary_lang]) - 1),
+                    'rows_total_estimated': False,
+                    'languages': {
+                        lang: dict(outputs[lang], status='COMPLETED', translated_file=uri)
+                        for lang, uri in translated_files.items()
+                    },
                     'bucket': self.output_bucket
                 }
             )
             
-            return {
+            result = {
                 'status': 'COMPLETED',
+                'processing': 'inline',
                 'file_id': file_id,
-                'content': translated_rows,
-                'translated_file': f"s3://{self.output_bucket}/{output_key}"
+                'translated_file': translated_files[primary_lang],
+                'translated_files': translated_files,
+                'cache_stats': self.cache_stats()
             }
+            if include_content:
+                result['content'] = translated_rows[primary_lang]
+            return result
             
         except Exception as e:
             print(f"CSV processing error: {str(e)}")
             raise
 
-    def process_csv_file(self, bucket, key):
-        """Process CSV file from S3"""
+    def _stage_csv_content(self, csv_content, user_id, user_email, options=None):
+        """Write posted CSV content to the input bucket and queue it like an uploaded file"""
+        key = f"{STAGED_PREFIX}{user_id}/{uuid.uuid4()}.csv"
+        body = csv_content.encode('utf-8')
+        with metrics.timer('Upload'):
+            response = self.s3.put_object(Bucket=self.input_bucket, Key=key, Body=body, ContentType='text/csv')
+        return self.process_file_upload(
+            self.input_bucket, key, user_id, user_email, size=len(body), options=options, etag=response['ETag']
+        )
+
+    def process_csv_file(self, bucket, key, options=None):
+        """Process CSV file from S3, streaming it through in row chunks"""
         try:
-            content = self.s3.get_object(Bucket=bucket, Key=key)['Body'].read().decode('utf-8')
-            translated_rows, output_content = self._translate_csv_content(content)
+            with metrics.timer('Download'):
+                response = self.s3.get_object(Bucket=bucket, Key=key)
+            body = open_body(TimedReader(response['Body']), response.get('ContentEncoding'))
+            source_lang, target_langs = self._job_languages(options)
             
             timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            output_key = f"translated_{timestamp}_{os.path.basename(key)}"
-            
-            self.s3.put_object(
-                Bucket=self.output_bucket,
-                Key=output_key,
-                Body=output_content.encode('utf-8'),
-                ContentType='text/csv'
-            )
+            file_id = (options or {}).get('file_id') or str(uuid.uuid4())
+            output_format, _, content_encoding = output_settings(options)
+            outputs = {
+                lang: MultipartUploadWriter(
+                    self.s3, self.output_bucket,
+                    self._output_key(self._output_file_name(timestamp, file_id, lang, os.path.basename(key), options)),
+                    OUTPUT_FORMATS[output_format][1],
+                    content_encoding=content_encoding
+                )
+                for lang in target_langs
+            }
+            try:
+                self._translate_csv_stream(codecs.getreader('utf-8')(body), outputs, options)
+            except Exception:
+                for output in outputs.values():
+                    output.abort()
+                raise
+            for output in outputs.values():
+                output.close()
             
+            translated_files = {lang: f"s3://{self.output_bucket}/{output.key}" for lang, output in outputs.items()}
             return {
                 'status': 'COMPLETED',
-                'content': translated_rows,
                 'original_file': f"s3://{bucket}/{key}",
-                'translated_file': f"s3://{self.output_bucket}/{output_key}",
-                'source_lang': self.source_lang,
-                'target_lang': self.target_lang
+                'translated_file': translated_files[target_langs[0]],
+                'translated_files': translated_files,
+                'source_lang': source_lang,
+                'target_lang': target_langs[0],
+                'cache_stats': self.cache_stats()
             }
             
         except Exception as e:
             print(f"File processing error: {str(e)}")
             return {'status': 'FAILED', 'error': str(e)}
 
+    def _output_key(self, file_name):
+        """Output bucket key of a translated file, partitioned by day"""
+        return f"{OUTPUT_PREFIX}{datetime.now():%Y/%m/%d}/{file_name}"
+
+    def _output_file_name(self, timestamp, file_id, lang, source_name, options=None):
+        """Name of a translated file, unique per job through its file_id.
+
+        Compression travels as Content-Encoding, so the suffix only names the format.
+        """
+        name = re.sub(r'(\.csv)?(\.gz|\.zst)?$', '', source_name, flags=re.IGNORECASE)
+        return f"translated_{timestamp}_{file_id}_{lang}_{name}{OUTPUT_FORMATS[output_settings(options)[0]][0]}"
+
     def translate_text(self, text, source_lang, target_lang):
         """Translate text using AWS Translate"""
-        try:
-            response = self.translate.translate_text(
-                Text=text,
-                SourceLanguageCode=source_lang,
-                TargetLanguageCode=target_lang
+        return self._translate_single(text, source_lang, target_lang)
+
+    def _translate_single(self, text, source_lang, target_lang):
+        """Translate one text, retrying throttled calls and letting other errors propagate"""
+        return call_translate(self.translate, self.rate_limiter, text, source_lang, target_lang)
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        """Translate a batch of texts with a single AWS Translate call, as the processor does"""
+        return translate_batch(self.translate, self.rate_limiter, texts, source_lang, target_lang)
+
+    def translate_values(self, values, source_lang, target_lang):
+        """Translate the distinct non-blank values and return a value -> translation map"""
+        distinct = list(dict.fromkeys(v for v in values if v.strip()))
+
+        # Values that contain the separator cannot share a request with others
+        batchable = [v for v in distinct if BATCH_SEPARATOR not in v and '\r' not in v]
+        single = [v for v in distinct if BATCH_SEPARATOR in v or '\r' in v]
+
+        translations = self.cache.get_many(distinct, source_lang, target_lang)
+        batchable = [v for v in batchable if v not in translations]
+        single = [v for v in single if v not in translations]
+
+        # A value that cannot be translated fails the request; it is never passed through as its translation
+        fresh = {}
+        batches = build_batches(batchable) + [[v] for v in single]
+        for batch in batches:
+            fresh.update(zip(batch, self.translate_batch(batch, source_lang, target_lang)))
+        self.cache.put_many(fresh, source_lang, target_lang)
+        translations.update(fresh)
+
+        print(f"Translated {len(distinct)} distinct values in {len(batches)} requests")
+        log_debug(f"Translation cache stats: {json.dumps(self.cache_stats())}")
+        return translations
+
+    def cache_stats(self):
+        """Hit/miss counters of the translation cache since the container started"""
+        return dict(self.cache.stats, lru_size=len(self.cache.lru))
+
+    def _translate_rows(self, rows, columns, source_lang, target_lang):
+        """Translate the given column indexes of a chunk of rows, each a list of cells.
+
+        columns is a list of indexes or an index -> detected source language map,
+        which then takes the place of source_lang. Columns are translated in one
+        group per source language; columns already in target_lang are copied.
+        """
+        by_lang = {}
+        for i in columns:
+            lang = columns[i] if isinstance(columns, dict) else source_lang
+            if lang != target_lang:
+                by_lang.setdefault(lang, []).append(i)
+        column_translations = {}
+        for lang, indexes in by_lang.items():
+            translations = self.translate_values(
+                (row[i] for row in rows for i in indexes if i < len(row)),
+                lang,
+                target_lang
             )
-            return response['TranslatedText']
+            column_translations.update((i, translations) for i in indexes)
+        translated_rows = []
+        for row in rows:
+            translated_row = list(row)
+            for i, translations in column_translations.items():
+                if i < len(row):
+                    translated_row[i] = translations.get(row[i], row[i])
+            translated_rows.append(translated_row)
+        return translated_rows
+
+    def _translate_rows_multi(self, rows, columns, options=None):
+        """Translate the same parsed rows into every target language of the job concurrently"""
+        source_lang, target_langs = self._job_languages(options)
+        metrics.add('RowsTranslated', len(rows))
+        with metrics.timer('Translate'):
+            if len(target_langs) == 1:
+                return {target_langs[0]: self._translate_rows(rows, columns, source_lang, target_langs[0])}
+            with ThreadPoolExecutor(max_workers=len(target_langs)) as executor:
+                futures = {
+                    lang: executor.submit(self._translate_rows, rows, columns, source_lang, lang)
+                    for lang in target_langs
+                }
+                return {lang: future.result() for lang, future in futures.items()}
+
+    def _column_indexes(self, header, rows, options=None):
+        """Profile a sample of rows and return the indexes of the columns to translate.
+
+        With source_lang 'auto' the indexes map to the language detected for each column.
+        """
+        options = options or {}
+        sample = rows[:PROFILE_SAMPLE_ROWS]
+        columns = profile_columns(
+            header, sample, options.get('include_columns'), options.get('exclude_columns')
+        )
+        indexes = [i for i, name in enumerate(header) if name in columns]
+        if self._job_languages(options)[0] != 'auto' or not indexes:
+            return indexes
+        return detect_column_languages(self.comprehend, {i: [row[i] for row in sample if i < len(row)] for i in indexes})
+
+    def _translate_csv_stream(self, lines, outputs, options=None):
+        """Translate CSV text read line by line from lines into one output per language.
+
+        outputs maps each target language to a MultipartUploadWriter, which
+        uploads a part whenever a chunk fills one. The input is parsed once; the
+        first row is treated as the header and copied unchanged. Rows are written
+        in the job's output format.
+        """
+        try:
+            # Sniff the dialect from the first lines, then replay them
+            with metrics.timer('Parse', exclude='Download'):
+                sample = [line for line in (lines.readline() for _ in range(5)) if line]
+                dialect = csv.Sniffer().sniff(''.join(sample))
+                csv_reader = csv.reader(itertools.chain(sample, lines), dialect)
+                header = next(csv_reader)
         except Exception as e:
-            print(f"Translation error: {str(e)}")
-            return text
+            print(f"CSV parsing error: {str(e)}")
+            raise ValueError(f"Invalid CSV format: {str(e)}")
+        
+        output_format, codec, _ = output_settings(options)
+        writers = {lang: row_writer(output_format, output, header, dialect, codec) for lang, output in outputs.items()}
+        for writer in writers.values():
+            writer.writeheader()
+        columns = None
+        # Parsing pulls the body through the reader, so its reads are counted as Download only
+        for rows in metrics.timed_iter(iter_chunks(csv_reader, CSV_CHUNK_ROWS), 'Parse', exclude='Download'):
+            if columns is None:
+                columns = self._column_indexes(header, rows, options)
+            for lang, translated_rows in self._translate_rows_multi(rows, columns, options).items():
+                writers[lang].writerows(translated_rows)
+                outputs[lang].flush_if_full()
+        for writer in writers.values():
+            writer.close()
 
-    def _translate_csv_content(self, csv_content):
-        """Translate CSV content and return rows and output string"""
+    def _parse_csv_content(self, csv_content, options=None):
+        """Parse CSV content into its dialect, rows and the indexes of the columns to translate"""
         try:
-            # Ensure we have proper line endings
-            csv_content = csv_content.replace('\r\n', '\n').replace('\r', '\n')
-            
-            # Try to detect dialect
-            sample = '\n'.join(csv_content.split('\n')[:5])  # Get first 5 lines for sniffing
-            dialect = csv.Sniffer().sniff(sample)
-            
-            csv_reader = csv.reader(io.StringIO(csv_content), dialect)
-            output = io.StringIO()
-            csv_writer = csv.writer(output, dialect)
-            
-            translated_rows = []
-            for row in csv_reader:
-                translated_row = []
-                for cell in row:
-                    if not cell.strip():
-                        translated_row.append(cell)
-                        continue
-                        
-                    translated_row.append(
-                        self.translate_text(cell, self.source_lang, self.target_lang)
-                    )
+            with metrics.timer('Parse'):
+                # Ensure we have proper line endings
+                csv_content = csv_content.replace('\r\n', '\n').replace('\r', '\n')
                 
-                csv_writer.writerow(translated_row)
-                translated_rows.append(translated_row)
+                # Try to detect dialect
+                sample = '\n'.join(csv_content.split('\n')[:5])  # Get first 5 lines for sniffing
+                dialect = csv.Sniffer().sniff(sample)
                 
-            return translated_rows, output.getvalue()
+                rows = list(csv.reader(io.StringIO(csv_content), dialect))
         except Exception as e:
             print(f"CSV parsing error: {str(e)}")
             raise ValueError(f"Invalid CSV format: {str(e)}")
+        columns = self._column_indexes(rows[0], rows[1:], options) if rows else []
+        return dialect, rows, columns
+
+    def _translate_csv_content(self, csv_content, options=None, parsed=None):
+        """Translate CSV content, returning rows and encoded output per target language.
 
-    def _create_dynamo_record(self, file_id, user_id, user_email, timestamp, key, bucket):
-        """Create record in DynamoDB"""
+        parsed is the result of _parse_csv_content when the caller already has it.
+        """
+        # Only parsing problems are reported as invalid input; Translate and rendering errors propagate as they are
+        dialect, rows, columns = parsed or self._parse_csv_content(csv_content, options)
+        # The header row is kept; translate every distinct cell value once per language
+        if rows:
+            header, body_rows = rows[0], rows[1:]
+            translated = self._translate_rows_multi(body_rows, columns, options)
+            translated_rows = {lang: [header] + lang_rows for lang, lang_rows in translated.items()}
+        else:
+            translated_rows = {lang: [] for lang in self._job_languages(options)[1]}
+
+        output_content = {
+            lang: self._render_rows(lang_rows, dialect, options) for lang, lang_rows in translated_rows.items()
+        }
+        return translated_rows, output_content
+
+    def _render_rows(self, rows, dialect, options=None):
+        """Encode a header row and its translated rows in the job's output format"""
+        output_format, codec, _ = output_settings(options)
+        output = io.BytesIO() if output_format == 'parquet' else io.StringIO()
+        writer = row_writer(output_format, output, rows[0] if rows else [], dialect, codec)
+        if rows:
+            writer.writeheader()
+            writer.writerows(rows[1:])
+        writer.close()
+        content = output.getvalue()
+        return content.encode('utf-8') if isinstance(content, str) else content
+
+    def _create_dynamo_record(self, file_id, user_id, user_email, timestamp, key, bucket, extra_attributes=None,
+                              pending=None):
+        """Create record in DynamoDB, or leave it in pending for a batched write"""
+        item = {
+            'file_id': file_id,
+            'user_id': user_id,
+            'email': user_email,
+            'timestamp': timestamp,
+            'status': 'QUEUED',
+            'original_file': key,
+            'translated_file': None,
+            'bucket': bucket
+        }
+        item.update(extra_attributes or {})
+        if pending is not None:
+            # file_id is a fresh UUID, so the batched put does without the existence condition
+            pending.add_item(item)
+            return
         try:
             self.table.put_item(
-                Item={
-                    'file_id': file_id,
-                    'user_id': user_id,
-                    'email': user_email,
-                    'timestamp': timestamp,
-                    'status': 'QUEUED',
-                    'original_file': key,
-                    'translated_file': None,
-                    'bucket': bucket
-                },
+                Item=item,
                 ConditionExpression='attribute_not_exists(file_id)'
             )
         except ClientError as e:
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
                 print(f"File ID {file_id} already exists, retrying...")
-                self.table.put_item(
-                    Item={
-                        'file_id': file_id,
-                        'user_id': user_id,
-                        'email': user_email,
-                        'timestamp': timestamp,
-                        'status': 'QUEUED',
-                        'original_file': key,
-                        'translated_file': None,
-                        'bucket': bucket
-                    }
-                )
+                self.table.put_item(Item=item)
             else:
                 raise
 
-    def _send_sqs_message(self, bucket, key, file_id):
-        """Send message to SQS queue"""
+    def _send_sqs_message(self, bucket, key, file_id, timestamp, shards=None, options=None, user_id=None,
+                          job_class='bulk', pending=None):
+        """Send message to SQS queue, one message per shard for sharded files.
+
+        With pending the messages are left there to be sent in batches. Small
+        jobs go to the fast lane queue. Messages are grouped by user, which
+        standard queues use for fair queueing: a user with a large backlog does not
+        delay the messages of other users.
+        """
+        queue_url = self.small_job_queue_url if job_class == 'small' else self.sqs_queue_url
+        group = {'MessageGroupId': user_id} if user_id else {}
         message = {
             'bucket': bucket,
             'key': key,
-            'file_id': file_id
+            'file_id': file_id,
+            'timestamp': timestamp
         }
-        
+        message.update(options or {})
+
+        if not shards:
+            entries = [{'MessageBody': json.dumps(message), **group}]
+        else:
+            entries = [
+                {
+                    'MessageBody': json.dumps(dict(
+                        message,
+                        shard_index=index,
+                        shard_count=len(shards['ranges']),
+                        byte_range=byte_range,
+                        header=shards['header'],
+                        translate_columns=shards['translate_columns'],
+                        column_langs=shards.get('column_langs')
+                    )),
+                    **group
+                }
+                for index, byte_range in enumerate(shards['ranges'])
+            ]
+        if pending is not None:
+            pending.add_messages(queue_url, file_id, entries)
+            return
+
         try:
-            response = self.sqs.send_message(
-                QueueUrl=self.sqs_queue_url,
-                MessageBody=json.dumps(message)
-            )
-            print(f"Message sent to SQS: {response['MessageId']}")
+            if not shards:
+                response = self.sqs.send_message(QueueUrl=queue_url, **entries[0])
+                print(f"Message sent to SQS ({job_class}): {response['MessageId']}")
+                return
+
+            for i in range(0, len(entries), 10):
+                response = self.sqs.send_message_batch(
+                    QueueUrl=queue_url,
+                    Entries=[dict(entry, Id=str(i + n)) for n, entry in enumerate(entries[i:i + 10])]
+                )
+                if response.get('Failed'):
+                    raise RuntimeError(f"Failed to queue shards: {response['Failed']}")
+            print(f"Queued {len(entries)} shards for file {file_id}")
         except Exception as e:
+            self._mark_job_failed(file_id, timestamp)
+            raise
+
+    def _mark_job_failed(self, file_id, timestamp):
+        """Record that a job's messages could not be queued; a job that was never recorded is left alone"""
+        try:
             self.table.update_item(
-                Key={'file_id': file_id},
+                Key={'file_id': file_id, 'timestamp': timestamp},
                 UpdateExpression='SET #status = :status',
+                ConditionExpression='attribute_exists(file_id)',
                 ExpressionAttributeNames={'#status': 'status'},
                 ExpressionAttributeValues={':status': 'FAILED'}
             )
-            raise
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            print(f"Job {file_id} has no record to mark as failed")
 
     def _parse_json_body(self, event):
         """Parse JSON body with error handling"""
@@ -458,10 +1458,18 @@ class TranslationService:
             raise ValueError('Invalid JSON format')
 
     def _extract_file_content(self, event):
-        """Extract file content from event, handling base64 if needed"""
+        """Extract file content from event, handling base64 and gzip/zstd bodies"""
         content = event['body']
         if event.get('isBase64Encoded', False):
-            content = base64.b64decode(content).decode('utf-8')
+            data = base64.b64decode(content)
+            headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+            encoding = detect_encoding(headers.get('content-encoding'), data[:4])
+            if encoding:
+                # Bounded so a small compressed body cannot expand without limit
+                data = DecompressingReader(io.BytesIO(data), encoding).read(MAX_DECOMPRESSED_BYTES + 1)
+                if len(data) > MAX_DECOMPRESSED_BYTES:
+                    raise ValueError(f'Decompressed body exceeds limit of {MAX_DECOMPRESSED_BYTES} bytes')
+            content = data.decode('utf-8')
         return content
 
     def _create_response(self, status_code, body):
@@ -472,7 +1480,32 @@ class TranslationService:
             'body': json.dumps(body)
         }
 
+# Reused by every warm invocation of this container
+_service = None
+
 # Lambda handler function
 def lambda_handler(event, context):
-    service = TranslationService()
-    return service.handle_event(event, context)
\ No newline at end of file
+    global _service
+    metrics.reset()
+    deadline.start(context)
+    cold_start = _service is None
+    if cold_start:
+        started = time.perf_counter()
+        _service = TranslationService()
+        service_init_ms = round((time.perf_counter() - started) * 1000, 2)
+    
+    response = _service.handle_event(event, context)
+    metrics.emit(
+        getattr(context, 'function_name', None) or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'translation_put_file'),
+        ColdStart=cold_start,
+        StatusCode=response.get('statusCode')
+    )
+    
+    if cold_start:
+        print(json.dumps({
+            'cold_start': True,
+            'import_ms': IMPORT_DURATION_MS,
+            'service_init_ms': service_init_ms,
+            'client_init_ms': _service.client_init_ms
+        }))
+    return response
\ No newline at end of file
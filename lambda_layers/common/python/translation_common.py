@@ -0,0 +1,826 @@
+"""Helpers shared by translation_upload_handler and translation_processor.
+
+Deployed as the common Lambda layer, so both functions import this one copy
+from /opt/python.
+"""
+import os
+import re
+import csv
+import json
+import gzip
+import zlib
+import time
+import itertools
+import random
+import hashlib
+import unicodedata
+import threading
+from collections import OrderedDict, Counter
+from contextlib import contextmanager
+from decimal import Decimal
+from botocore.exceptions import ClientError, BotoCoreError, HTTPClientError, ConnectionError as BotocoreConnectionError
+
+try:
+    import zstandard
+except ImportError:  # Optional; only zstd inputs and outputs need it
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional; only Parquet outputs need it
+    pyarrow = None
+
+# Per-invocation stage metrics are logged in CloudWatch Embedded Metric Format under this namespace
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TranslationService')
+
+class StageMetrics:
+    """Durations per pipeline stage and counters of one invocation.
+
+    Stages: Download, Parse, Translate, Upload, DynamoDB and RateLimit.
+    Durations are summed over threads, so a stage running concurrently can
+    exceed wall time. Translation cache lookups count as DynamoDB and waits
+    for the shared rate limit as RateLimit, both inside Translate.
+    """
+
+    STAGES = ('Download', 'Parse', 'Translate', 'Upload', 'DynamoDB', 'RateLimit')
+    COUNTERS = ('TranslateCalls', 'TranslateChars', 'TranslateRetries', 'RowsTranslated')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.durations = Counter({stage: 0.0 for stage in self.STAGES})
+            self.counts = Counter({name: 0 for name in self.COUNTERS})
+
+    def add(self, name, value=1):
+        with self.lock:
+            self.counts[name] += value
+
+    @contextmanager
+    def timer(self, stage, exclude=None):
+        """Add the duration of the block to stage, minus time the block spent in exclude"""
+        excluded = self.durations[exclude] if exclude else 0.0
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                if exclude:
+                    elapsed -= self.durations[exclude] - excluded
+                self.durations[stage] += max(0.0, elapsed)
+
+    def timed_iter(self, iterable, stage, exclude=None):
+        """Iterate, adding the time spent producing each item to stage"""
+        iterator = iter(iterable)
+        while True:
+            with self.timer(stage, exclude):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def emit(self, function_name, **properties):
+        """Print the metrics as one EMF log line; CloudWatch extracts them without API calls"""
+        with self.lock:
+            values = {f"{stage}Ms": round(ms, 2) for stage, ms in self.durations.items()}
+            values.update(self.counts)
+        print(json.dumps(dict({
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['FunctionName']],
+                    'Metrics': [
+                        {'Name': name, 'Unit': 'Milliseconds' if name.endswith('Ms') else 'Count'}
+                        for name in values
+                    ]
+                }]
+            },
+            'FunctionName': function_name
+        }, **values, **properties), default=str))
+
+metrics = StageMetrics()
+
+class TimedClient:
+    """Proxy adding the duration of every call on the wrapped client to one stage"""
+
+    def __init__(self, client, stage):
+        self._client = client
+        self._stage = stage
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        def timed(*args, **kwargs):
+            with metrics.timer(self._stage):
+                return attribute(*args, **kwargs)
+        return timed
+
+NON_LINGUISTIC_PATTERNS = [
+    re.compile(r'[-+]?[$€£¥]?\s?\d[\d,.\s]*%?'),                       # numbers, prices, percentages
+    re.compile(r'\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}([ T]\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?'),  # dates
+    re.compile(r'\d{1,2}:\d{2}(:\d{2})?(\s?[AaPp][Mm])?'),                  # times
+    re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+'),                              # emails
+    re.compile(r'(https?://|www\.)\S+'),                                  # URLs
+    re.compile(r'(?=\S*\d)[A-Za-z0-9]+([-_/.#:][A-Za-z0-9]+)*'),           # IDs, SKUs, codes
+    re.compile(r'(?i)true|false|null|n/?a')
+]
+
+def is_non_linguistic(value):
+    """True for values that translation would leave unchanged"""
+    value = value.strip()
+    return any(pattern.fullmatch(value) for pattern in NON_LINGUISTIC_PATTERNS)
+
+def row_cells(row, header):
+    """Cells of a row in header order; rows are lists of cells or dicts keyed by the header (DictReader rows)"""
+    if isinstance(row, dict):
+        return [row.get(name) for name in header]
+    return [row[i] if i < len(row) else None for i in range(len(header))]
+
+# Column profiling: columns whose sampled values are mostly non-linguistic are passed through
+PROFILE_SAMPLE_ROWS = int(os.environ.get('PROFILE_SAMPLE_ROWS', '200'))
+PASSTHROUGH_RATIO = float(os.environ.get('PASSTHROUGH_RATIO', '0.9'))
+
+def profile_columns(header, sample_rows, include_columns=None, exclude_columns=None):
+    """Pick the columns worth translating from a sample of rows.
+
+    include_columns and exclude_columns override the classification.
+    Returns column names in header order.
+    """
+    include_columns = set(include_columns or [])
+    exclude_columns = set(exclude_columns or [])
+    sample = [row_cells(row, header) for row in sample_rows]
+    columns = []
+    for index, name in enumerate(header):
+        if name in exclude_columns:
+            continue
+        values = [row[index] for row in sample if isinstance(row[index], str) and row[index].strip()]
+        passthrough = sum(1 for v in values if is_non_linguistic(v))
+        if name in include_columns or (values and passthrough < PASSTHROUGH_RATIO * len(values)):
+            columns.append(name)
+    print(f"Translating columns {columns}, passing through {[n for n in header if n not in columns]}")
+    return columns
+
+# With source_lang 'auto', each translated column's sample is detected once and the column is sent
+# with that language; columns detected below this confidence are left to per-request detection
+LANGUAGE_DETECTION_MIN_SCORE = float(os.environ.get('LANGUAGE_DETECTION_MIN_SCORE', '0.8'))
+# DetectDominantLanguage reads up to 5,000 bytes per document and 25 documents per batch
+DETECTION_SAMPLE_BYTES = 4500
+DETECTION_BATCH_SIZE = 25
+
+def detect_column_languages(comprehend, samples):
+    """Map each column of a column -> sampled values map to its dominant language, or 'auto'"""
+    languages = {name: 'auto' for name in samples}
+    documents = {}
+    for name, values in samples.items():
+        distinct = dict.fromkeys(v.strip() for v in values if isinstance(v, str) and v.strip() and not is_non_linguistic(v))
+        text = '\n'.join(distinct).encode('utf-8')[:DETECTION_SAMPLE_BYTES].decode('utf-8', 'ignore')
+        if text:
+            documents[name] = text
+    names = list(documents)
+    for i in range(0, len(names), DETECTION_BATCH_SIZE):
+        batch = names[i:i + DETECTION_BATCH_SIZE]
+        try:
+            with metrics.timer('Translate'):
+                response = comprehend.batch_detect_dominant_language(TextList=[documents[name] for name in batch])
+        except ClientError as e:
+            # Detection is an optimisation; Translate can still detect per request
+            print(f"Language detection failed, leaving it to Translate: {str(e)}")
+            return languages
+        for result in response.get('ResultList', []):
+            best = max(result.get('Languages', []), key=lambda language: language['Score'], default=None)
+            if best and best['Score'] >= LANGUAGE_DETECTION_MIN_SCORE:
+                languages[batch[result['Index']]] = best['LanguageCode']
+    print(f"Detected source languages {languages}")
+    return languages
+
+class TranslationCache:
+    """Two-tier translation cache keyed on language pair and normalized text hash"""
+
+    def __init__(self, dynamodb, table_name, max_entries, ttl_days):
+        self.dynamodb = dynamodb
+        self.table = dynamodb.Table(table_name) if table_name else None
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_days * 86400
+        self.lru = OrderedDict()
+        self.stats = {'lru_hits': 0, 'table_hits': 0, 'misses': 0}
+        # Languages of one job are translated from concurrent threads
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text, source_lang, target_lang):
+        normalized = unicodedata.normalize('NFC', text.strip())
+        digest = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return f"{source_lang}:{target_lang}:{digest}"
+
+    def _remember(self, key, translated_text):
+        with self.lock:
+            self.lru[key] = translated_text
+            self.lru.move_to_end(key)
+            while len(self.lru) > self.max_entries:
+                self.lru.popitem(last=False)
+
+    def get_many(self, texts, source_lang, target_lang):
+        """Return a text -> translation map for every text found in either tier"""
+        found = {}
+        pending = {}
+        with self.lock:
+            for text in texts:
+                key = self.make_key(text, source_lang, target_lang)
+                if key in self.lru:
+                    self.lru.move_to_end(key)
+                    found[text] = self.lru[key]
+                    self.stats['lru_hits'] += 1
+                else:
+                    pending.setdefault(key, []).append(text)
+
+        table_hits = 0
+        if self.table is not None and pending:
+            try:
+                for item in self._batch_get(list(pending)):
+                    key = item['cache_key']
+                    self._remember(key, item['translated_text'])
+                    for text in pending.pop(key, []):
+                        found[text] = item['translated_text']
+                        table_hits += 1
+            except (ClientError, BotoCoreError) as e:
+                # The cache is an optimisation; keys not read yet count as misses and get translated
+                print(f"Translation cache read failed: {str(e)}")
+
+        with self.lock:
+            self.stats['table_hits'] += table_hits
+            self.stats['misses'] += sum(len(group) for group in pending.values())
+        return found
+
+    def _batch_get(self, keys):
+        """Yield cache items fetched in BatchGetItem pages of 100 keys"""
+        for i in range(0, len(keys), 100):
+            request = {self.table.name: {'Keys': [{'cache_key': k} for k in keys[i:i + 100]]}}
+            for attempt in range(3):
+                with metrics.timer('DynamoDB'):
+                    response = self.dynamodb.batch_get_item(RequestItems=request)
+                yield from response.get('Responses', {}).get(self.table.name, [])
+                request = response.get('UnprocessedKeys')
+                if not request:
+                    break
+                time.sleep(0.05 * (2 ** attempt))
+
+    def put_many(self, translations, source_lang, target_lang):
+        """Store fresh translations in both tiers"""
+        expires_at = int(time.time()) + self.ttl_seconds
+        items = {}
+        for text, translated_text in translations.items():
+            key = self.make_key(text, source_lang, target_lang)
+            self._remember(key, translated_text)
+            items[key] = {
+                'cache_key': key,
+                'source_lang': source_lang,
+                'target_lang': target_lang,
+                'translated_text': translated_text,
+                'expires_at': expires_at
+            }
+
+        if self.table is not None and items:
+            try:
+                with metrics.timer('DynamoDB'), self.table.batch_writer() as batch:
+                    for item in items.values():
+                        batch.put_item(Item=item)
+            except (ClientError, BotoCoreError) as e:
+                # The cache is an optimisation, a failed write must not fail the job
+                print(f"Translation cache write failed: {str(e)}")
+
+# Unused leased tokens lapse after this long
+RATE_LIMIT_LEASE_SECONDS = 1.0
+
+class TokenBucket:
+    """Token bucket kept in one DynamoDB item and leased a few tokens at a time.
+
+    A lease is a read followed by a put conditioned on the item not having
+    changed since, so concurrent containers never hand out the same tokens.
+    The processor and the upload handler lease from the same item, so inline
+    translations and queued jobs stay under one Translate quota together.
+    """
+
+    def __init__(self, dynamodb, table_name, bucket_id, rate, burst, lease_size):
+        self.table = dynamodb.Table(table_name) if table_name and rate > 0 else None
+        self.bucket_id = bucket_id
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.lease_size = max(1, lease_size)
+        self.leased = 0
+        self.lease_expires = 0.0
+        # Translation threads of one invocation share the lease
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until one more Translate request may be sent"""
+        if self.table is None:
+            return
+        with self.lock:
+            while self.leased < 1 or time.monotonic() >= self.lease_expires:
+                wait = self._lease()
+                if wait:
+                    with metrics.timer('RateLimit'):
+                        time.sleep(wait)
+            self.leased -= 1
+
+    def drain(self):
+        """Drop the local lease after the service throttled anyway"""
+        with self.lock:
+            self.leased = 0
+
+    def _lease(self):
+        """Take up to lease_size tokens from the shared item; returns the seconds to wait when it is empty"""
+        now = time.time()
+        try:
+            with metrics.timer('DynamoDB'):
+                item = self.table.get_item(Key={'bucket_id': self.bucket_id}, ConsistentRead=True).get('Item')
+            if item:
+                elapsed = max(0.0, now - float(item['updated_at']))
+                tokens = min(self.burst, float(item['tokens']) + elapsed * self.rate)
+            else:
+                tokens = self.burst
+            # Waiting for a whole lease keeps an empty bucket from being polled a token at a time
+            need = min(self.lease_size, int(self.burst))
+            if tokens < need:
+                # Jitter keeps waiting containers from all coming back at once
+                wait = (need - tokens) / self.rate
+                return wait + random.uniform(0, wait)
+            granted = min(self.lease_size, int(tokens))
+
+            condition = {'ConditionExpression': 'attribute_not_exists(bucket_id)'}
+            if item:
+                condition = {
+                    'ConditionExpression': 'updated_at = :seen',
+                    'ExpressionAttributeValues': {':seen': item['updated_at']}
+                }
+            with metrics.timer('DynamoDB'):
+                self.table.put_item(Item={
+                    'bucket_id': self.bucket_id,
+                    'tokens': Decimal(str(round(tokens - granted, 6))),
+                    'updated_at': Decimal(str(round(now, 6)))
+                }, **condition)
+        except (ClientError, BotoCoreError) as e:
+            if isinstance(e, ClientError) and e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                # Another container leased first; read the item again
+                return 0
+            # The limit is a safeguard, an unavailable table must not stop translation
+            print(f"Rate limit table unavailable ({str(e)}), sending without a lease")
+            granted = self.lease_size
+        self.leased = granted
+        self.lease_expires = time.monotonic() + RATE_LIMIT_LEASE_SECONDS
+        return 0
+
+
+# Translate retries give up this many seconds before the invocation would time out,
+# leaving time to save a checkpoint and report the failure
+DEADLINE_MARGIN_SECONDS = float(os.environ.get('DEADLINE_MARGIN_SECONDS', '10'))
+
+class InvocationDeadline:
+    """When the running invocation times out; unbounded outside Lambda"""
+
+    def __init__(self):
+        self.expires = None
+
+    def start(self, context):
+        remaining = getattr(context, 'get_remaining_time_in_millis', None)
+        self.expires = time.monotonic() + remaining() / 1000 - DEADLINE_MARGIN_SECONDS if remaining else None
+
+    def allows(self, seconds):
+        """True if waiting this long still leaves the margin before the timeout"""
+        return self.expires is None or time.monotonic() + seconds < self.expires
+
+deadline = InvocationDeadline()
+
+TRANSLATE_MAX_RETRIES = int(os.environ.get('TRANSLATE_MAX_RETRIES', '6'))
+THROTTLING_ERRORS = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'LimitExceededException'
+}
+# Throttling and transient service faults; the next attempt may succeed
+RETRYABLE_ERRORS = THROTTLING_ERRORS | {
+    'ServiceUnavailableException',
+    'InternalServerException'
+}
+
+def call_translate(translate, rate_limiter, text, source_lang, target_lang):
+    """Call TranslateText, backing off with full jitter on throttling and transient faults.
+
+    This loop is the only retry layer; Translate clients are created with
+    max_attempts=1. It stops after TRANSLATE_MAX_RETRIES retries, or earlier
+    when the next wait would run past the invocation's deadline.
+    """
+    for attempt in range(TRANSLATE_MAX_RETRIES + 1):
+        metrics.add('TranslateCalls')
+        metrics.add('TranslateChars', len(text))
+        rate_limiter.acquire()
+        try:
+            response = translate.translate_text(
+                Text=text,
+                SourceLanguageCode=source_lang,
+                TargetLanguageCode=target_lang
+            )
+            return response['TranslatedText']
+        except (ClientError, BotocoreConnectionError, HTTPClientError) as e:
+            code = e.response['Error']['Code'] if isinstance(e, ClientError) else type(e).__name__
+            if isinstance(e, ClientError) and code not in RETRYABLE_ERRORS:
+                raise
+            delay = random.uniform(0, min(20.0, 0.25 * (2 ** attempt)))
+            if attempt == TRANSLATE_MAX_RETRIES or not deadline.allows(delay):
+                raise
+            if code in THROTTLING_ERRORS:
+                rate_limiter.drain()
+            metrics.add('TranslateRetries')
+            print(f"Translate call failed ({code}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+# TranslateText accepts up to 10,000 bytes per request; keep a safety margin
+MAX_BATCH_BYTES = int(os.environ.get('TRANSLATE_MAX_BATCH_BYTES', '9000'))
+BATCH_SEPARATOR = '\n'
+
+def build_batches(texts, max_bytes=MAX_BATCH_BYTES):
+    """Pack texts into batches whose joined size stays under max_bytes"""
+    batches = []
+    current = []
+    current_size = 0
+    for text in texts:
+        size = len(text.encode('utf-8')) + len(BATCH_SEPARATOR)
+        if current and current_size + size > max_bytes:
+            batches.append(current)
+            current = []
+            current_size = 0
+        current.append(text)
+        current_size += size
+    if current:
+        batches.append(current)
+    return batches
+
+def translate_batch(translate, rate_limiter, texts, source_lang, target_lang):
+    """Translate a batch of texts with a single TranslateText call.
+
+    Throttled and transiently failed calls are retried as the whole batch;
+    texts are only sent one by one when the service merged or split lines.
+    """
+    translated_text = call_translate(translate, rate_limiter, BATCH_SEPARATOR.join(texts), source_lang, target_lang)
+    if len(texts) == 1:
+        return [translated_text]
+
+    translated = translated_text.split(BATCH_SEPARATOR)
+    if len(translated) == len(texts):
+        return translated
+
+    print(f"Batch of {len(texts)} texts came back as {len(translated)} lines, retrying individually")
+    metrics.add('TranslateRetries', len(texts))
+    return [call_translate(translate, rate_limiter, text, source_lang, target_lang) for text in texts]
+
+def iter_chunks(iterable, size):
+    """Yield lists of up to size items without materialising the whole iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# Compressed inputs are recognised by Content-Encoding or their magic bytes
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+OUTPUT_COMPRESSIONS = ('gzip', 'zstd')
+
+# Output formats with the file suffix and content type of their translated files
+OUTPUT_FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'jsonl': ('.jsonl', 'application/x-ndjson'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet')
+}
+
+# Parquet rows are buffered into row groups of this many rows
+PARQUET_ROW_GROUP_ROWS = int(os.environ.get('PARQUET_ROW_GROUP_ROWS', '50000'))
+
+# Outputs are uploaded in multipart parts of this size
+MULTIPART_PART_SIZE = max(5 * 1024 * 1024, int(os.environ.get('MULTIPART_PART_SIZE', str(8 * 1024 * 1024))))
+
+# Compressed outputs are written as one gzip member (zstd frame) per this much text at most
+COMPRESS_BLOCK_BYTES = 1024 * 1024
+
+def detect_encoding(content_encoding, head):
+    """'gzip', 'zstd' or None from a Content-Encoding value and the first bytes of the data"""
+    content_encoding = (content_encoding or '').strip().lower()
+    if content_encoding in ('gzip', 'x-gzip') or head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if content_encoding == 'zstd' or head.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    return None
+
+def compress_block(data, encoding):
+    """Compress data into one self-contained gzip member or zstd frame.
+
+    Concatenated members (frames) still form one valid stream, so outputs can be
+    compressed part by part and resumed from a checkpoint.
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package")
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+class DecompressingReader:
+    """Reads a gzip or zstd body as a stream of decompressed bytes, one block at a time"""
+
+    READ_BLOCK_BYTES = 64 * 1024
+
+    def __init__(self, body, encoding):
+        self.body = body
+        self.encoding = encoding
+        self.buffer = b''
+        self.offset = 0
+        if encoding == 'zstd':
+            if zstandard is None:
+                raise ValueError("zstd input needs the zstandard package")
+            self.stream = zstandard.ZstdDecompressor().stream_reader(body, read_across_frames=True)
+        else:
+            self.decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+    def _decompress_block(self):
+        """Next block of decompressed bytes; b'' at the end of the stream"""
+        if self.encoding == 'zstd':
+            return self.stream.read(self.READ_BLOCK_BYTES)
+        output = b''
+        while not output:
+            data = self.body.read(self.READ_BLOCK_BYTES)
+            if not data:
+                return self.decompressor.flush()
+            output = self.decompressor.decompress(data)
+            # gzip files may hold several members back to back
+            while self.decompressor.eof and self.decompressor.unused_data:
+                rest = self.decompressor.unused_data
+                self.decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+                output += self.decompressor.decompress(rest)
+        return output
+
+    def read(self, size=-1):
+        if size is None or size < 0 or len(self.buffer) - self.offset < size:
+            blocks = [self.buffer[self.offset:]]
+            available = len(blocks[0])
+            while size is None or size < 0 or available < size:
+                block = self._decompress_block()
+                if not block:
+                    break
+                blocks.append(block)
+                available += len(block)
+            self.buffer = b''.join(blocks)
+            self.offset = 0
+        end = len(self.buffer) if size is None or size < 0 else self.offset + size
+        data = self.buffer[self.offset:end]
+        self.offset += len(data)
+        return data
+
+class TimedReader:
+    """Wraps a streaming body, counting the bytes read through it and timing the reads as Download.
+
+    The text decoder asks for a few dozen bytes at a time, so the body is read
+    in blocks of READ_BLOCK_BYTES and served from a buffer.
+    """
+
+    READ_BLOCK_BYTES = 64 * 1024
+
+    def __init__(self, body):
+        self.body = body
+        self.bytes_read = 0
+        self.buffer = b''
+        self.offset = 0
+
+    def _fill(self, size):
+        available = len(self.buffer) - self.offset
+        if size is None or size < 0 or available < size:
+            with metrics.timer('Download'):
+                more = self.body.read() if size is None or size < 0 else self.body.read(max(size - available, self.READ_BLOCK_BYTES))
+            self.buffer = self.buffer[self.offset:] + more
+            self.offset = 0
+
+    def peek(self, size):
+        """The next size bytes, without consuming them"""
+        self._fill(size)
+        return self.buffer[self.offset:self.offset + size]
+
+    def read(self, size=-1):
+        self._fill(size)
+        end = len(self.buffer) if size is None or size < 0 else self.offset + size
+        data = self.buffer[self.offset:end]
+        self.offset += len(data)
+        self.bytes_read += len(data)
+        return data
+
+def open_body(body, content_encoding=None):
+    """Reader of the uncompressed bytes of a peekable streaming body"""
+    encoding = detect_encoding(content_encoding, body.peek(4))
+    return DecompressingReader(body, encoding) if encoding else body
+
+class MultipartUploadWriter:
+    """File-like text sink that uploads to S3 in multipart parts of bounded size.
+
+    write() only buffers; callers upload a part with flush_if_full() at row
+    boundaries so every committed part ends on a whole row. An upload can be
+    resumed from a checkpoint by passing its upload_id and parts, plus the
+    bytes it had not uploaded yet as buffered. Small outputs that never fill a
+    part are written with a single put_object. With a content_encoding, text
+    is compressed at least every COMPRESS_BLOCK_BYTES and at every
+    flush_if_full().
+    """
+
+    def __init__(self, s3_client, bucket, key, content_type='text/csv', part_size=MULTIPART_PART_SIZE,
+                 upload_id=None, parts=None, abort_on_error=True, content_encoding=None, buffered=b''):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.buffer = bytearray(buffered)
+        self.upload_id = upload_id
+        self.parts = list(parts or [])
+        self.abort_on_error = abort_on_error
+        self.content_encoding = content_encoding
+        self.pending = bytearray()
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if self.content_encoding:
+            self.pending.extend(data)
+            if len(self.pending) >= COMPRESS_BLOCK_BYTES:
+                self._compress_pending()
+        else:
+            self.buffer.extend(data)
+
+    def _compress_pending(self):
+        if self.pending:
+            self.buffer.extend(compress_block(bytes(self.pending), self.content_encoding))
+            self.pending = bytearray()
+
+    def _object_attributes(self):
+        attributes = {'ContentType': self.content_type}
+        if self.content_encoding:
+            attributes['ContentEncoding'] = self.content_encoding
+        return attributes
+
+    def flush_if_full(self):
+        """Upload the buffer as a part once it reaches part_size; True if a part was uploaded"""
+        self._compress_pending()
+        if len(self.buffer) < self.part_size:
+            return False
+        with metrics.timer('Upload'):
+            self._send_part()
+        return True
+
+    def unflushed(self):
+        """The bytes written but not uploaded in a part yet, compressed like the parts"""
+        self._compress_pending()
+        return bytes(self.buffer)
+
+    def _send_part(self):
+        if self.upload_id is None:
+            self.upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self._object_attributes()
+            )['UploadId']
+        part_number = len(self.parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=bytes(self.buffer)
+        )
+        self.parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+        self.buffer = bytearray()
+
+    def close(self):
+        self._compress_pending()
+        with metrics.timer('Upload'):
+            if self.upload_id is None:
+                self.s3.put_object(
+                    Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer), **self._object_attributes()
+                )
+                return
+            if self.buffer:
+                self._send_part()
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self.parts}
+            )
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self.abort_on_error:
+            self.abort()
+        return False
+
+class CsvRowWriter:
+    """Writes rows as CSV in the input's dialect"""
+
+    def __init__(self, output, header, dialect='excel'):
+        self.writer = csv.writer(output, dialect)
+        self.header = header
+
+    def writeheader(self):
+        self.writer.writerow(self.header)
+
+    def writerows(self, rows):
+        self.writer.writerows(row_cells(row, self.header) for row in rows)
+
+    def close(self):
+        pass
+
+class JsonLinesRowWriter:
+    """Writes rows as one JSON object per line, keyed by the header"""
+
+    def __init__(self, output, header):
+        self.output = output
+        self.header = header
+
+    def writeheader(self):
+        pass
+
+    def writerows(self, rows):
+        self.output.write(''.join(
+            json.dumps(dict(zip(self.header, row_cells(row, self.header))), ensure_ascii=False) + '\n'
+            for row in rows
+        ))
+
+    def close(self):
+        pass
+
+class ParquetRowWriter:
+    """Writes rows as a Parquet file with one string column per header field.
+
+    Rows are buffered into row groups of PARQUET_ROW_GROUP_ROWS. The footer
+    describes every row group, so a partly uploaded file cannot be resumed.
+    The writer is also the byte sink pyarrow writes through to the output.
+    """
+
+    closed = False
+
+    def __init__(self, output, header, compression=None):
+        if pyarrow is None:
+            raise ValueError('Parquet output needs the pyarrow package')
+        self.output = output
+        self.header = header
+        self.schema = pyarrow.schema([(name, pyarrow.string()) for name in header])
+        self.writer = pyarrow.parquet.ParquetWriter(self, self.schema, compression=compression or 'snappy')
+        self.rows = []
+
+    def write(self, data):
+        self.output.write(bytes(data))
+
+    def flush(self):
+        pass
+
+    def writeheader(self):
+        pass
+
+    def writerows(self, rows):
+        self.rows.extend(row_cells(row, self.header) for row in rows)
+        if len(self.rows) >= PARQUET_ROW_GROUP_ROWS:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if self.rows:
+            self.writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array([row[i] for row in self.rows], pyarrow.string()) for i in range(len(self.header))],
+                schema=self.schema
+            ))
+            self.rows = []
+
+    def write_table(self, table):
+        """Append the row groups of an already built table, e.g. a shard output"""
+        self._write_row_group()
+        self.writer.write_table(table)
+
+    def close(self):
+        self._write_row_group()
+        self.writer.close()
+
+def row_writer(output_format, output, header, dialect='excel', compression=None):
+    """Writer of translated rows in a job's output format; compression is Parquet's codec"""
+    if output_format == 'parquet':
+        return ParquetRowWriter(output, header, compression)
+    if output_format == 'jsonl':
+        return JsonLinesRowWriter(output, header)
+    return CsvRowWriter(output, header, dialect)
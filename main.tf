@@ -4,6 +4,10 @@ terraform {
       source  = "hashicorp/archive"
       version = "~> 2.3"
     }
+    null = {
+      source  = "hashicorp/null"
+      version = "~> 3.2"
+    }
   }
 }
 
@@ -33,8 +37,11 @@ module "iam" {
   input_bucket_arn  = module.s3.input_bucket_arn
   output_bucket_arn = module.s3.output_bucket_arn
   sqs_queue_arn     = module.sqs.queue_arn
+  small_job_queue_arn = module.sqs.small_job_queue_arn
   dynamodb_table_arn = module.dynamodb.dynamodb_table_arn
   api_table_arn = module.dynamodb.api_table_arn
+  cache_table_arn = module.dynamodb.cache_table_arn
+  rate_limit_table_arn = module.dynamodb.rate_limit_table_arn
 }
 
 module "lambda" {
@@ -43,11 +50,16 @@ module "lambda" {
   upload_handler_zip_path        = "${path.module}/lambda_functions/upload_handler/main.zip"
   translation_processor_zip_path = "${path.module}/lambda_functions/translation_processor/main.zip"
   sqs_queue_url                  = module.sqs.queue_url
+  small_job_queue_url            = module.sqs.small_job_queue_url
   output_bucket_name             = module.s3.output_bucket_name
   iam_role                       = module.iam.lambda_role_arn 
   input_bucket_name              = module.s3.input_bucket_name
+  artifacts_bucket_name          = module.s3.artifacts_bucket_name
   dynamodb_table_name            = module.dynamodb.dynamodb_table_name   
   api_table_name                 = module.dynamodb.api_table_name
+  cache_table_name               = module.dynamodb.cache_table_name
+  rate_limit_table_name          = module.dynamodb.rate_limit_table_name
+  translate_rate_limit           = var.translate_rate_limit
   api_gateway_id                = module.api_gateway.api_gatway_id  
 
 }
@@ -65,6 +77,10 @@ module "api_gateway" {
   lambda_api_key_function_name = module.lambda.lambda_function_names["translation_get_api_keys"] 
   lambda_get_user_uploads_invoke_arn = module.lambda.lambda_upload_function_invoke_arn["translation_get_user_uploads"]
   lambda_get_user_uploads_function_name = module.lambda.lambda_function_names["translation_get_user_uploads"]
+  lambda_get_job_status_invoke_arn = module.lambda.lambda_upload_function_invoke_arn["translation_get_job_status"]
+  lambda_get_job_status_function_name = module.lambda.lambda_function_names["translation_get_job_status"]
+  lambda_multipart_upload_invoke_arn = module.lambda.lambda_upload_function_invoke_arn["translation_multipart_upload"]
+  lambda_multipart_upload_function_name = module.lambda.lambda_function_names["translation_multipart_upload"]
 }
 
 
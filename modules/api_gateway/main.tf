@@ -147,8 +147,13 @@ resource "aws_api_gateway_deployment" "deployment" {
       aws_api_gateway_integration.files_options_integration,
       aws_api_gateway_integration.api_upload_integration,
       aws_api_gateway_integration.api_upload_options_integration,
+      aws_api_gateway_integration.api_key_revoke_integration,
       aws_api_gateway_integration.user_uploads_integration,
-      aws_api_gateway_integration.user_uploads_options_integration
+      aws_api_gateway_integration.user_uploads_options_integration,
+      aws_api_gateway_integration.job_status_integration,
+      aws_api_gateway_integration.job_status_options_integration,
+      aws_api_gateway_integration.multipart_upload_integration,
+      aws_api_gateway_integration.multipart_upload_options_integration
     ]))
   }
 
@@ -158,7 +163,12 @@ resource "aws_api_gateway_deployment" "deployment" {
     aws_api_gateway_integration.list_files_integration,
     aws_api_gateway_integration.files_options_integration,
     aws_api_gateway_integration.api_upload_integration,
-    aws_api_gateway_integration.api_upload_options_integration
+    aws_api_gateway_integration.api_upload_options_integration,
+    aws_api_gateway_integration.api_key_revoke_integration,
+    aws_api_gateway_integration.job_status_integration,
+    aws_api_gateway_integration.job_status_options_integration,
+    aws_api_gateway_integration.multipart_upload_integration,
+    aws_api_gateway_integration.multipart_upload_options_integration
   ]
 }
 
@@ -329,6 +339,179 @@ resource "aws_lambda_permission" "api_gateway_user_uploads_permission" {
 
 
 
+
+#### GET job status API #### /job_status/{file_id}
+
+resource "aws_api_gateway_resource" "job_status_resource" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  parent_id   = aws_api_gateway_rest_api.translation_api.root_resource_id
+  path_part   = "job_status"
+}
+
+resource "aws_api_gateway_resource" "job_status_file_resource" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  parent_id   = aws_api_gateway_resource.job_status_resource.id
+  path_part   = "{file_id}"
+}
+
+# GET method for job status with Cognito auth
+resource "aws_api_gateway_method" "job_status_method" {
+  rest_api_id   = aws_api_gateway_rest_api.translation_api.id
+  resource_id   = aws_api_gateway_resource.job_status_file_resource.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+
+  request_parameters = {
+    "method.request.path.file_id" = true
+  }
+}
+
+# Lambda integration for job status; the proxy passes If-None-Match through and 304s back
+resource "aws_api_gateway_integration" "job_status_integration" {
+  rest_api_id             = aws_api_gateway_rest_api.translation_api.id
+  resource_id             = aws_api_gateway_resource.job_status_file_resource.id
+  http_method             = aws_api_gateway_method.job_status_method.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.lambda_get_job_status_invoke_arn
+}
+
+# CORS OPTIONS method for job status
+resource "aws_api_gateway_method" "job_status_options_method" {
+  rest_api_id   = aws_api_gateway_rest_api.translation_api.id
+  resource_id   = aws_api_gateway_resource.job_status_file_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "job_status_options_integration" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  resource_id = aws_api_gateway_resource.job_status_file_resource.id
+  http_method = aws_api_gateway_method.job_status_options_method.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "job_status_options_response_200" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  resource_id = aws_api_gateway_resource.job_status_file_resource.id
+  http_method = aws_api_gateway_method.job_status_options_method.http_method
+  status_code = 200
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true,
+    "method.response.header.Access-Control-Allow-Methods" = true,
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "job_status_options_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  resource_id = aws_api_gateway_resource.job_status_file_resource.id
+  http_method = aws_api_gateway_method.job_status_options_method.http_method
+  status_code = aws_api_gateway_method_response.job_status_options_response_200.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'",
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'",
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+}
+
+resource "aws_lambda_permission" "api_gateway_job_status_permission" {
+  statement_id  = "AllowAPIGatewayInvokeJobStatus"
+  action        = "lambda:InvokeFunction"
+  function_name = var.lambda_get_job_status_function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.translation_api.execution_arn}/*/${aws_api_gateway_method.job_status_method.http_method}${aws_api_gateway_resource.job_status_resource.path}/*"
+}
+
+#### MULTIPART UPLOAD API #### /multipart_upload
+
+resource "aws_api_gateway_resource" "multipart_upload_resource" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  parent_id   = aws_api_gateway_rest_api.translation_api.root_resource_id
+  path_part   = "multipart_upload"
+}
+
+# POST method issuing presigned part URLs, with Cognito auth
+resource "aws_api_gateway_method" "multipart_upload_method" {
+  rest_api_id   = aws_api_gateway_rest_api.translation_api.id
+  resource_id   = aws_api_gateway_resource.multipart_upload_resource.id
+  http_method   = "POST"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+}
+
+resource "aws_api_gateway_integration" "multipart_upload_integration" {
+  rest_api_id             = aws_api_gateway_rest_api.translation_api.id
+  resource_id             = aws_api_gateway_resource.multipart_upload_resource.id
+  http_method             = aws_api_gateway_method.multipart_upload_method.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.lambda_multipart_upload_invoke_arn
+}
+
+# CORS OPTIONS method for multipart upload
+resource "aws_api_gateway_method" "multipart_upload_options_method" {
+  rest_api_id   = aws_api_gateway_rest_api.translation_api.id
+  resource_id   = aws_api_gateway_resource.multipart_upload_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "multipart_upload_options_integration" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  resource_id = aws_api_gateway_resource.multipart_upload_resource.id
+  http_method = aws_api_gateway_method.multipart_upload_options_method.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "multipart_upload_options_response_200" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  resource_id = aws_api_gateway_resource.multipart_upload_resource.id
+  http_method = aws_api_gateway_method.multipart_upload_options_method.http_method
+  status_code = 200
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true,
+    "method.response.header.Access-Control-Allow-Methods" = true,
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "multipart_upload_options_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.translation_api.id
+  resource_id = aws_api_gateway_resource.multipart_upload_resource.id
+  http_method = aws_api_gateway_method.multipart_upload_options_method.http_method
+  status_code = aws_api_gateway_method_response.multipart_upload_options_response_200.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'",
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+}
+
+resource "aws_lambda_permission" "api_gateway_multipart_upload_permission" {
+  statement_id  = "AllowAPIGatewayInvokeMultipartUpload"
+  action        = "lambda:InvokeFunction"
+  function_name = var.lambda_multipart_upload_function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.translation_api.execution_arn}/*/${aws_api_gateway_method.multipart_upload_method.http_method}${aws_api_gateway_resource.multipart_upload_resource.path}"
+}
 
 #### LIST ALL FIleS API #### /files
 
@@ -486,6 +669,14 @@ resource "aws_api_gateway_method" "api_upload_method" {
   authorizer_id = aws_api_gateway_authorizer.cognito.id
 }
 
+resource "aws_api_gateway_method" "api_key_revoke_method" {
+  rest_api_id   = aws_api_gateway_rest_api.translation_api.id
+  resource_id   = aws_api_gateway_resource.api_upload_resource.id
+  http_method   = "DELETE"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+}
+
 resource "aws_api_gateway_method" "api_keys_method" {
   rest_api_id      = aws_api_gateway_rest_api.translation_api.id
   resource_id      = aws_api_gateway_resource.api_keys_resource.id
@@ -503,6 +694,15 @@ resource "aws_api_gateway_integration" "api_upload_integration" {
   uri                     = var.lambda_api_key_function_invoke_arn
 }
 
+resource "aws_api_gateway_integration" "api_key_revoke_integration" {
+  rest_api_id             = aws_api_gateway_rest_api.translation_api.id
+  resource_id             = aws_api_gateway_resource.api_upload_resource.id
+  http_method             = aws_api_gateway_method.api_key_revoke_method.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.lambda_api_key_function_invoke_arn
+}
+
 resource "aws_api_gateway_integration" "api_keys_integration" {
   rest_api_id             = aws_api_gateway_rest_api.translation_api.id
   resource_id             = aws_api_gateway_resource.api_keys_resource.id
@@ -520,6 +720,14 @@ resource "aws_lambda_permission" "api_gateway_upload_permission" {
   source_arn    = "${aws_api_gateway_rest_api.translation_api.execution_arn}/*/${aws_api_gateway_method.api_upload_method.http_method}${aws_api_gateway_resource.api_upload_resource.path}"
 }
 
+resource "aws_lambda_permission" "api_gateway_key_revoke_permission" {
+  statement_id  = "AllowAPIGatewayInvokeKeyRevoke"
+  action        = "lambda:InvokeFunction"
+  function_name = var.lambda_api_key_function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.translation_api.execution_arn}/*/${aws_api_gateway_method.api_key_revoke_method.http_method}${aws_api_gateway_resource.api_upload_resource.path}"
+}
+
 resource "aws_lambda_permission" "api_gateway_keys_permission" {
   statement_id  = "AllowAPIGatewayInvokeKeys"
   action        = "lambda:InvokeFunction"
@@ -569,7 +777,7 @@ resource "aws_api_gateway_integration_response" "api_upload_options_integration_
 
   response_parameters = {
     "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
-    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'",
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,DELETE,OPTIONS'",
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
 }
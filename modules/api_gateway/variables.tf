@@ -54,4 +54,24 @@ variable "lambda_get_user_uploads_function_name" {
   description = "lambda function name for get user uploads"
   type = string
   
-}
\ No newline at end of file
+}
+
+variable "lambda_get_job_status_invoke_arn" {
+  description = "invoke arn of lambda get job status"
+  type = string
+}
+
+variable "lambda_get_job_status_function_name" {
+  description = "lambda function name for get job status"
+  type = string
+}
+
+variable "lambda_multipart_upload_invoke_arn" {
+  description = "invoke arn of lambda multipart upload"
+  type = string
+}
+
+variable "lambda_multipart_upload_function_name" {
+  description = "lambda function name for multipart upload"
+  type = string
+}
@@ -24,6 +24,16 @@ resource "aws_dynamodb_table" "translation_metadata" {
     type = "S"
   }
 
+  attribute {
+    name = "content_hash"
+    type = "S"
+  }
+
+  attribute {
+    name = "source_file"
+    type = "S"
+  }
+
   global_secondary_index {
     name            = "UserIndex"
     hash_key        = "user_id"
@@ -33,10 +43,27 @@ resource "aws_dynamodb_table" "translation_metadata" {
   global_secondary_index {
     name               = "email-index"
     hash_key           = "email"
+    range_key          = "timestamp"
     projection_type    = "ALL"  
     read_capacity      = 5     
     write_capacity     = 5      
   }
+
+  # Finds an earlier job for the same bytes and options, so repeat uploads are not translated again
+  global_secondary_index {
+    name            = "ContentHashIndex"
+    hash_key        = "content_hash"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
+
+  # Earlier versions of the same user's file (user_id/bucket/key), newest first, for incremental jobs
+  global_secondary_index {
+    name            = "SourceFileIndex"
+    hash_key        = "source_file"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
 }
 
 resource "aws_dynamodb_table" "api_key_metadata" {
@@ -82,6 +109,46 @@ resource "aws_dynamodb_table" "api_key_metadata" {
   }
 }
 
+resource "aws_dynamodb_table" "translation_cache" {
+  name         = "TranslationCache"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "cache_key"
+
+  attribute {
+    name = "cache_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "TranslationCache"
+    Environment = "prod"
+    ManagedBy   = "Terraform"
+  }
+}
+
+# One item per shared token bucket; every Translate caller leases tokens from it
+resource "aws_dynamodb_table" "rate_limit" {
+  name         = "TranslateRateLimit"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "bucket_id"
+
+  attribute {
+    name = "bucket_id"
+    type = "S"
+  }
+
+  tags = {
+    Name        = "TranslateRateLimit"
+    Environment = "prod"
+    ManagedBy   = "Terraform"
+  }
+}
+
 output "api_table_name" {
   value = aws_dynamodb_table.api_key_metadata.name
 }
@@ -97,4 +164,20 @@ output "dynamodb_table_name" {
 
 output "dynamodb_table_arn" {
   value = aws_dynamodb_table.translation_metadata.arn
+}
+
+output "cache_table_name" {
+  value = aws_dynamodb_table.translation_cache.name
+}
+
+output "cache_table_arn" {
+  value = aws_dynamodb_table.translation_cache.arn
+}
+
+output "rate_limit_table_name" {
+  value = aws_dynamodb_table.rate_limit.name
+}
+
+output "rate_limit_table_arn" {
+  value = aws_dynamodb_table.rate_limit.arn
 }
\ No newline at end of file
@@ -33,8 +33,11 @@ resource "aws_iam_policy" "lambda_s3_access" {
         Action = [
           "s3:GetObject",
           "s3:PutObject",
+          "s3:DeleteObject",
+          "s3:AbortMultipartUpload",
           "s3:ListBucket",
-          "s3:GetObjectTagging"
+          "s3:GetObjectTagging",
+          "s3:PutObjectTagging"
         ],
         Resource = [
           "${var.input_bucket_arn}",
@@ -50,13 +53,14 @@ resource "aws_iam_policy" "lambda_s3_access" {
           "sqs:DeleteMessage",
           "sqs:GetQueueAttributes"
         ],
-        Resource : var.sqs_queue_arn
+        Resource : [var.sqs_queue_arn, var.small_job_queue_arn]
       },
       {
         Effect = "Allow",
         Action = [
           "translate:TranslateText",
-          "comprehend:DetectDominantLanguage"
+          "comprehend:DetectDominantLanguage",
+          "comprehend:BatchDetectDominantLanguage"
         ],
         Resource = "*"
       }
@@ -80,7 +84,8 @@ resource "aws_iam_policy" "lambda_sqs_access" {
           "sqs:GetQueueAttributes"
         ],
         Resource = [
-          var.sqs_queue_arn
+          var.sqs_queue_arn,
+          var.small_job_queue_arn
         ]
       }
     ]
@@ -103,13 +108,31 @@ resource "aws_iam_policy" "lambda_dynamodb_access" {
           "dynamodb:Scan",
           "dynamodb:Query"
         ],
-        Resource = var.dynamodb_table_arn
+        Resource = [var.dynamodb_table_arn, "${var.dynamodb_table_arn}/index/*"]
       },
       {
         Effect = "Allow",
         Action = ["dynamodb:*"],
         Resource = var.api_table_arn
       },
+      {
+        Effect = "Allow",
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
+        ],
+        Resource = var.cache_table_arn
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem"
+        ],
+        Resource = var.rate_limit_table_arn
+      },
       
       # Enhanced API Gateway permissions
       {
@@ -14,6 +14,11 @@ variable "output_bucket_arn" {
   type        = string
 }
 
+variable "small_job_queue_arn" {
+  description = "ARN of the small job SQS queue"
+  type        = string
+}
+
 variable "sqs_queue_arn" {
   description = "ARN of the SQS queue"
   type        = string
@@ -25,6 +30,14 @@ variable "dynamodb_table_arn" {
   description = "arn of dynamo db"
   type = string
 }
+variable "cache_table_arn" {
+  description = "arn of the translation cache dynamodb table"
+  type = string
+}
+variable "rate_limit_table_arn" {
+  description = "arn of the translate rate limit dynamodb table"
+  type = string
+}
 variable "region" {
   description = "AWS region"
   type        = string
@@ -5,7 +5,70 @@ locals {
     translation_put_file       = "${path.root}/lambda_functions/translation_upload_handler"
     translation_process_event  = "${path.root}/lambda_functions/translation_processor"
     translation_get_user_uploads  = "${path.root}/lambda_functions/translation_get_user_uploads"
+    translation_get_job_status  = "${path.root}/lambda_functions/translation_get_job_status"
+    translation_multipart_upload  = "${path.root}/lambda_functions/translation_multipart_upload"
   }
+
+  # Functions that share the common helpers, read zstd inputs and write compressed or Parquet outputs
+  layered_functions = ["translation_put_file", "translation_process_event"]
+  dependencies_requirements = "${path.root}/lambda_layers/dependencies/requirements.txt"
+  dependencies_build_dir    = "${path.module}/builds/dependencies_layer"
+
+  # Also handed to the functions, the processor bases its assembly lease on it
+  function_timeout = 120
+}
+
+# Wheels for the Lambda runtime (Linux x86_64, CPython 3.11), installed under python/ as layers expect
+resource "null_resource" "dependencies_layer" {
+  triggers = {
+    requirements = filesha256(local.dependencies_requirements)
+  }
+
+  provisioner "local-exec" {
+    command = <<-EOT
+      rm -rf ${local.dependencies_build_dir}
+      pip install --quiet --requirement ${local.dependencies_requirements} \
+        --target ${local.dependencies_build_dir}/python \
+        --platform manylinux2014_x86_64 --implementation cp --python-version 3.11 --only-binary=:all:
+    EOT
+  }
+}
+
+data "archive_file" "dependencies_layer" {
+  type        = "zip"
+  source_dir  = local.dependencies_build_dir
+  output_path = "${path.module}/builds/dependencies_layer.zip"
+  depends_on  = [null_resource.dependencies_layer]
+}
+
+# pyarrow alone is over the 50 MB limit of a direct upload, so the layer goes through S3
+resource "aws_s3_object" "dependencies_layer" {
+  bucket = var.artifacts_bucket_name
+  key    = "layers/dependencies_layer.zip"
+  source = data.archive_file.dependencies_layer.output_path
+  etag   = data.archive_file.dependencies_layer.output_md5
+}
+
+# Helpers imported by both the upload handler and the processor
+data "archive_file" "common_layer" {
+  type        = "zip"
+  source_dir  = "${path.root}/lambda_layers/common"
+  output_path = "${path.module}/builds/common_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "common" {
+  layer_name          = "${var.prefix}-translation-common"
+  filename            = data.archive_file.common_layer.output_path
+  source_code_hash    = data.archive_file.common_layer.output_base64sha256
+  compatible_runtimes = ["python3.11"]
+}
+
+resource "aws_lambda_layer_version" "dependencies" {
+  layer_name          = "${var.prefix}-translation-dependencies"
+  s3_bucket           = aws_s3_object.dependencies_layer.bucket
+  s3_key              = aws_s3_object.dependencies_layer.key
+  source_code_hash    = data.archive_file.dependencies_layer.output_base64sha256
+  compatible_runtimes = ["python3.11"]
 }
 
 data "archive_file" "lambda_zip" {
@@ -22,14 +85,26 @@ resource "aws_lambda_function" "lambda" {
   role          = var.iam_role
   handler       = "main.lambda_handler"         
   runtime       = "python3.11"          
-  timeout = 120
+  timeout = local.function_timeout
+  layers = contains(local.layered_functions, each.key) ? [
+    aws_lambda_layer_version.common.arn,
+    aws_lambda_layer_version.dependencies.arn
+  ] : []
   environment {
     variables = {
       SQS_QUEUE_URL = var.sqs_queue_url
+      SMALL_JOB_QUEUE_URL = var.small_job_queue_url
       OUTPUT_BUCKET = var.output_bucket_name
       INPUT_BUCKET = var.input_bucket_name
       METADATA_TABLE = var.dynamodb_table_name
       API_METADATA_TABLE = var.api_table_name
+      CACHE_TABLE = var.cache_table_name
+      RATE_LIMIT_TABLE = var.rate_limit_table_name
+      TRANSLATE_RATE_LIMIT = var.translate_rate_limit
+      TRANSLATE_MAX_WORKERS = var.translate_max_workers
+      TARGET_LANGS = join(",", var.target_languages)
+      LOG_LEVEL = var.log_level
+      FUNCTION_TIMEOUT_SECONDS = local.function_timeout
       API_GATEWAY_ID = var.api_gateway_id
       STAGE_NAME = "prod"  
     }
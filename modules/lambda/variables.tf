@@ -14,6 +14,11 @@ variable "translation_processor_zip_path" {
   type        = string
 }
 
+variable "artifacts_bucket_name" {
+  description = "Name of the S3 bucket the dependencies layer archive is uploaded to"
+  type        = string
+}
+
 variable "input_bucket_name" {
   description = "Name of the input S3 bucket"
   type        = string
@@ -31,6 +36,11 @@ variable "sqs_queue_url" {
   type        = string
 }
 
+variable "small_job_queue_url" {
+  description = "URL of the SQS queue for small jobs"
+  type        = string
+}
+
 variable "output_bucket_name" {
   description = "Name of the output S3 bucket"
   type        = string
@@ -48,4 +58,38 @@ variable "api_gateway_id" {
   description = "ID of the API Gateway"
   type        = string
   
-}
\ No newline at end of file
+}
+
+variable "cache_table_name" {
+  description = "Name of the translation cache DynamoDB table"
+  type        = string
+}
+
+variable "rate_limit_table_name" {
+  description = "Name of the DynamoDB table holding the shared Translate token bucket"
+  type        = string
+}
+
+variable "translate_rate_limit" {
+  description = "TranslateText requests per second across all invocations; keep just under the account quota, 0 disables"
+  type        = number
+  default     = 20
+}
+
+variable "translate_max_workers" {
+  description = "Number of concurrent translation requests per processor invocation"
+  type        = number
+  default     = 8
+}
+
+variable "target_languages" {
+  description = "Target language codes used when a job does not name its own"
+  type        = list(string)
+  default     = ["es"]
+}
+
+variable "log_level" {
+  description = "Lambda log level; DEBUG also logs raw events and cache statistics"
+  type        = string
+  default     = "INFO"
+}
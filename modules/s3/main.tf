@@ -9,6 +9,12 @@ resource "aws_s3_bucket" "output_bucket" {
   force_destroy = true
 }
 
+# Lambda layer archives too large to upload to Lambda directly
+resource "aws_s3_bucket" "artifacts_bucket" {
+  bucket        = "${var.prefix}-artifacts-bucket-${random_id.bucket_suffix.hex}"
+  force_destroy = true
+}
+
 # Enable bucket versioning for additional protection
 resource "aws_s3_bucket_versioning" "output_bucket" {
   bucket = aws_s3_bucket.output_bucket.id
@@ -96,6 +102,52 @@ resource "aws_s3_bucket_server_side_encryption_configuration" "output_bucket" {
     }
   }
 }
+# Checkpointed jobs keep their multipart uploads open across retries;
+# clean up the ones that never complete
+resource "aws_s3_bucket_lifecycle_configuration" "output_bucket" {
+  bucket = aws_s3_bucket.output_bucket.id
+
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 2
+    }
+  }
+}
+
+# Browsers PUT presigned multipart parts straight to the input bucket and need the ETag back
+resource "aws_s3_bucket_cors_configuration" "input_bucket" {
+  bucket = aws_s3_bucket.input_bucket.id
+
+  cors_rule {
+    allowed_headers = ["*"]
+    allowed_methods = ["PUT"]
+    allowed_origins = var.allowed_origins
+    expose_headers  = ["ETag"]
+    max_age_seconds = 3000
+  }
+}
+
+# Client multipart uploads that are never completed or aborted
+resource "aws_s3_bucket_lifecycle_configuration" "input_bucket" {
+  bucket = aws_s3_bucket.input_bucket.id
+
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 2
+    }
+  }
+}
+
 resource "random_id" "bucket_suffix" {
   byte_length = 8
 }
@@ -7,6 +7,10 @@ output "output_bucket_name" {
   value = aws_s3_bucket.output_bucket.id
 }
 
+output "artifacts_bucket_name" {
+  value = aws_s3_bucket.artifacts_bucket.id
+}
+
 output "input_bucket_arn" {
   value = aws_s3_bucket.input_bucket.arn
 }
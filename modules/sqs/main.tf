@@ -8,6 +8,16 @@ resource "aws_sqs_queue" "translation_queue" {
   receive_wait_time_seconds = 10
 }
 
+# Fast lane for small jobs, drained by its own event source mapping so bulk work never queues in front
+resource "aws_sqs_queue" "small_job_queue" {
+  name                      = "${var.prefix}-small-job-queue"
+  delay_seconds             = 0
+  max_message_size          = 262144
+  message_retention_seconds = 86400
+  visibility_timeout_seconds = 720
+  receive_wait_time_seconds = 10
+}
+
 resource "aws_sqs_queue_policy" "translation_queue_policy" {
   queue_url = aws_sqs_queue.translation_queue.id
 
@@ -29,9 +39,52 @@ resource "aws_sqs_queue_policy" "translation_queue_policy" {
   })
 }
 
+resource "aws_sqs_queue_policy" "small_job_queue_policy" {
+  queue_url = aws_sqs_queue.small_job_queue.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect    = "Allow",
+        Principal = "*",
+        Action    = "sqs:*",
+        Resource  = aws_sqs_queue.small_job_queue.arn,
+        Condition = {
+          ArnEquals = {
+            "aws:SourceArn" = var.lambda_translate_processor_arn
+          }
+        }
+      }
+    ]
+  })
+}
+
 resource "aws_lambda_event_source_mapping" "sqs_trigger" {
   event_source_arn = aws_sqs_queue.translation_queue.arn
   function_name    = var.lambda_translate_processor_arn
   batch_size       = 10
   enabled          = true
+
+  # Only failed messages are retried, the rest of the batch is deleted
+  function_response_types = ["ReportBatchItemFailures"]
+
+  # Bulk work is capped so processor concurrency is always left for the fast lane
+  scaling_config {
+    maximum_concurrency = var.bulk_max_concurrency
+  }
+}
+
+# Small jobs are processed one message at a time so none waits behind another in its batch
+resource "aws_lambda_event_source_mapping" "small_job_trigger" {
+  event_source_arn = aws_sqs_queue.small_job_queue.arn
+  function_name    = var.lambda_translate_processor_arn
+  batch_size       = 1
+  enabled          = true
+
+  function_response_types = ["ReportBatchItemFailures"]
+
+  scaling_config {
+    maximum_concurrency = var.small_job_max_concurrency
+  }
 }
\ No newline at end of file
@@ -5,4 +5,12 @@ output "queue_url" {
 
 output "queue_arn" {
   value = aws_sqs_queue.translation_queue.arn
+}
+
+output "small_job_queue_url" {
+  value = aws_sqs_queue.small_job_queue.id
+}
+
+output "small_job_queue_arn" {
+  value = aws_sqs_queue.small_job_queue.arn
 }
\ No newline at end of file
@@ -7,4 +7,16 @@ variable "prefix" {
 variable "lambda_translate_processor_arn" {
   description = "ARN of the upload handler lambda function"
   type        = string
+}
+
+variable "bulk_max_concurrency" {
+  description = "Most processor invocations working on the bulk queue at once"
+  type        = number
+  default     = 20
+}
+
+variable "small_job_max_concurrency" {
+  description = "Most processor invocations working on the small job queue at once"
+  type        = number
+  default     = 10
 }
\ No newline at end of file
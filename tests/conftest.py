@@ -0,0 +1,39 @@
+"""Runs the Lambda functions against the in-memory AWS stand-ins in benchmarks/fakes.py"""
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+import fakes
+import run_benchmarks
+
+
+@pytest.fixture
+def aws():
+    environment = dict(os.environ)
+    run_benchmarks.configure_environment(SimpleNamespace(langs='es,fr', cache_table=True))
+    # Every test starts a fresh job rather than linking to an earlier identical one
+    os.environ['DEDUP_WINDOW_HOURS'] = '0'
+    yield fakes.install(fakes.FakeAWS())
+    os.environ.clear()
+    os.environ.update(environment)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Skip the sleeps between retries"""
+    monkeypatch.setattr('time.sleep', lambda seconds: None)
+
+
+@pytest.fixture
+def processor(aws):
+    return run_benchmarks.load_lambda('translation_processor')
+
+
+@pytest.fixture
+def handler(aws):
+    return run_benchmarks.load_lambda('translation_upload_handler')
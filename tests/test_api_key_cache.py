@@ -0,0 +1,47 @@
+import fakes
+
+
+def store_key(aws, api_key='key-1', **fields):
+    item = {'user_id': 'user-1', 'user_email': 'u@example.com', 'api_key': api_key, 'is_active': True, **fields}
+    aws.dynamodb.Table('ApiKeyMetadata').put_item(Item=item)
+
+
+def test_cached_key_is_served_without_lookups(aws, handler):
+    store_key(aws)
+    service = handler.TranslationService()
+
+    assert service._get_user_from_api_key('key-1')['user_id'] == 'user-1'
+    assert service._get_user_from_api_key('key-1')['user_id'] == 'user-1'
+    assert fakes.STATS['dynamodb.query'] == 1
+    assert fakes.STATS['dynamodb.get_item'] == 0
+
+
+def test_revoked_key_is_refused_once_rechecked(aws, handler, monkeypatch):
+    store_key(aws)
+    service = handler.TranslationService()
+    assert service._get_user_from_api_key('key-1')['user_id'] == 'user-1'
+
+    aws.dynamodb.Table('ApiKeyMetadata').update_item(
+        Key={'user_id': 'user-1'},
+        UpdateExpression='SET is_active = :inactive',
+        ExpressionAttributeValues={':inactive': False}
+    )
+    monkeypatch.setattr(handler, 'API_KEY_RECHECK_SECONDS', 0)
+
+    assert service._get_user_from_api_key('key-1') == {}
+    # The refusal is cached rather than looked up again
+    assert service._get_user_from_api_key('key-1') == {}
+    assert fakes.STATS['dynamodb.query'] == 1
+    assert fakes.STATS['dynamodb.get_item'] == 1
+
+
+def test_regenerated_key_replaces_the_cached_one(aws, handler, monkeypatch):
+    store_key(aws)
+    service = handler.TranslationService()
+    assert service._get_user_from_api_key('key-1')['user_id'] == 'user-1'
+
+    store_key(aws, api_key='key-2')
+    monkeypatch.setattr(handler, 'API_KEY_RECHECK_SECONDS', 0)
+
+    assert service._get_user_from_api_key('key-1') == {}
+    assert service._get_user_from_api_key('key-2')['user_id'] == 'user-1'
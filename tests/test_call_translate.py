@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+
+import fakes
+
+
+def _failing_first(aws, error):
+    """Make the first TranslateText call raise error and later ones succeed"""
+    original = aws.translate.translate_text
+    calls = []
+
+    def translate_text(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise error
+        return original(**kwargs)
+    aws.translate.translate_text = translate_text
+    return calls
+
+
+def test_throttled_call_is_retried(aws, processor):
+    calls = _failing_first(aws, fakes.client_error('ThrottlingException', 'TranslateText', 'Rate exceeded'))
+
+    assert processor.translate_batch(processor.translate, processor.rate_limiter, ['Hello', 'World'], 'en', 'es') == ['[es]Hello', '[es]World']
+    assert len(calls) == 2
+
+
+def test_connection_error_is_retried(aws, processor):
+    calls = _failing_first(aws, fakes.EndpointConnectionError(error='unreachable'))
+
+    assert processor.translate_batch(processor.translate, processor.rate_limiter, ['Hello'], 'en', 'es') == ['[es]Hello']
+    assert len(calls) == 2
+
+
+def test_invalid_request_is_not_retried(aws, processor):
+    calls = _failing_first(aws, fakes.client_error('UnsupportedLanguagePairException', 'TranslateText'))
+
+    with pytest.raises(fakes.ClientError):
+        processor.translate_batch(processor.translate, processor.rate_limiter, ['Hello'], 'en', 'xx')
+    assert len(calls) == 1
+
+
+def test_retries_stop_at_the_invocation_deadline(aws, processor):
+    aws.translate.throttle_rate = 1.0
+    # Less than the safety margin is left, so no wait fits before the timeout
+    processor.deadline.start(SimpleNamespace(get_remaining_time_in_millis=lambda: 1000))
+
+    with pytest.raises(fakes.ClientError):
+        processor.translate_batch(processor.translate, processor.rate_limiter, ['Hello'], 'en', 'es')
+    assert fakes.STATS['translate.throttled'] == 1
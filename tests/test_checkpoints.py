@@ -0,0 +1,61 @@
+import csv
+import gzip
+import io
+
+import pytest
+
+import run_benchmarks
+from test_sharded_jobs import deliver, job_item
+
+ROWS = 40
+
+
+@pytest.fixture
+def message(aws, handler, processor, monkeypatch):
+    """Queue a small job whose output never fills a part, checkpointed after every chunk of 5 rows"""
+    monkeypatch.setattr(processor, 'CSV_CHUNK_ROWS', 5)
+    monkeypatch.setattr(processor, 'CHECKPOINT_INTERVAL_SECONDS', 0)
+    lines = ['id,text'] + [f'{i},Row number {i} says hello' for i in range(ROWS)]
+    aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key='uploads/data.csv', Body='\n'.join(lines).encode('utf-8'))
+    handler.TranslationService().process_file_upload(
+        run_benchmarks.INPUT_BUCKET, 'uploads/data.csv', 'user-1', 'user@example.com',
+        options={'target_langs': ['es'], 'output_compression': 'gzip'}
+    )
+    return aws.sqs.messages[0]['MessageBody']
+
+
+def tail_objects(aws):
+    return [key for (_, key) in aws.s3.objects if key.startswith('checkpoints/')]
+
+
+def test_retry_resumes_from_the_last_checkpointed_row(aws, processor, message, monkeypatch):
+    translate_rows_multi = processor.translate_rows_multi
+    translated = []
+
+    def fails_on_fourth_chunk(rows_by_lang, *args):
+        if len(translated) == 15:
+            raise RuntimeError('Task timed out')
+        translated.extend(rows_by_lang['es'])
+        return translate_rows_multi(rows_by_lang, *args)
+    monkeypatch.setattr(processor, 'translate_rows_multi', fails_on_fourth_chunk)
+
+    assert deliver(processor, [message]) == [message]
+    checkpoint = job_item(aws)['checkpoint']['es']
+    assert checkpoint['rows_committed'] == 15
+    assert checkpoint['upload_id'] is None
+    # Only the newest tail is kept
+    assert tail_objects(aws) == [checkpoint['tail_key']]
+
+    translated.clear()
+    monkeypatch.setattr(processor, 'translate_rows_multi', lambda rows_by_lang, *args: (
+        translated.extend(rows_by_lang['es']) or translate_rows_multi(rows_by_lang, *args)
+    ))
+    assert deliver(processor, [message]) == []
+    assert [row['id'] for row in translated] == [str(i) for i in range(15, ROWS)]
+
+    item = job_item(aws)
+    assert item['status'] == 'COMPLETED'
+    assert tail_objects(aws) == []
+    output = aws.s3.get_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=item['translated_file'])
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(output['Body'].read()).decode('utf-8'))))
+    assert [row['text'] for row in rows] == [f'[es]Row number {i} says hello' for i in range(ROWS)]
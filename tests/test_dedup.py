@@ -0,0 +1,50 @@
+import pytest
+
+import run_benchmarks
+from test_sharded_jobs import deliver
+
+PAYLOAD = b'id,text\n1,Hello there\n2,Good morning\n'
+
+
+@pytest.fixture
+def upload(aws, handler, monkeypatch):
+    monkeypatch.setattr(handler, 'DEDUP_WINDOW_HOURS', 720)
+
+    def upload(key, user_id):
+        etag = aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key=key, Body=PAYLOAD)['ETag']
+        return handler.TranslationService().process_file_upload(
+            run_benchmarks.INPUT_BUCKET, key, user_id, f'{user_id}@example.com', size=len(PAYLOAD), etag=etag
+        )
+    return upload
+
+
+def jobs(aws):
+    return list(aws.dynamodb.Table('TranslationMetadata').items.values())
+
+
+@pytest.fixture
+def completed(aws, processor, upload):
+    upload('uploads/user-a/1/data.csv', 'user-a')
+    assert deliver(processor, [message['MessageBody'] for message in aws.sqs.messages]) == []
+    aws.sqs.messages.clear()
+    return jobs(aws)[0]
+
+
+def test_repeat_upload_by_the_same_user_is_linked(aws, upload, completed):
+    upload('uploads/user-a/2/data.csv', 'user-a')
+
+    repeat = [job for job in jobs(aws) if job['file_id'] != completed['file_id']][0]
+    assert repeat['status'] == 'COMPLETED'
+    assert repeat['duplicate_of'] == completed['file_id']
+    assert repeat['translated_file'] == completed['translated_file']
+    assert aws.sqs.messages == []
+
+
+def test_same_bytes_from_another_user_are_translated_again(aws, upload, completed):
+    upload('uploads/user-b/3/data.csv', 'user-b')
+
+    other = [job for job in jobs(aws) if job['user_id'] == 'user-b'][0]
+    assert other['status'] == 'QUEUED'
+    assert 'duplicate_of' not in other
+    assert other['content_hash'] != completed['content_hash']
+    assert len(aws.sqs.messages) == 1
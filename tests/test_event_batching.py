@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import run_benchmarks
+
+
+def s3_event(aws, names):
+    records = []
+    for name in names:
+        key = f'uploads/{name}.csv'
+        etag = aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key=key, Body=b'id,text\n1,Hello\n')['ETag']
+        records.append({'s3': {
+            'bucket': {'name': run_benchmarks.INPUT_BUCKET},
+            'object': {'key': key, 'size': 16, 'eTag': etag}
+        }})
+    return {'Records': records}
+
+
+def jobs_by_key(aws):
+    return {item['original_file']: item for item in aws.dynamodb.Table('TranslationMetadata').items.values()}
+
+
+def test_partially_written_and_queued_batches(aws, handler, monkeypatch, no_backoff):
+    batch_write_item = aws.dynamodb.batch_write_item
+
+    def drops_unwritten(RequestItems, **kwargs):
+        # The record of 'unwritten' is never accepted
+        unprocessed = {
+            name: [r for r in requests if r['PutRequest']['Item']['original_file'] == 'uploads/unwritten.csv']
+            for name, requests in RequestItems.items()
+        }
+        batch_write_item(RequestItems={
+            name: [r for r in requests if r not in unprocessed[name]] for name, requests in RequestItems.items()
+        })
+        return {'UnprocessedItems': {name: requests for name, requests in unprocessed.items() if requests}}
+    monkeypatch.setattr(aws.dynamodb, 'batch_write_item', drops_unwritten)
+
+    send_message_batch = aws.sqs.send_message_batch
+
+    def fails_unqueued(QueueUrl, Entries):
+        rejected = [e for e in Entries if json.loads(e['MessageBody'])['key'] == 'uploads/unqueued.csv']
+        response = send_message_batch(QueueUrl, [e for e in Entries if e not in rejected])
+        response['Failed'] = [{'Id': e['Id'], 'Code': 'InternalError', 'Message': 'queue unavailable'} for e in rejected]
+        return response
+    monkeypatch.setattr(aws.sqs, 'send_message_batch', fails_unqueued)
+
+    response = handler.TranslationService()._handle_s3_sqs_event(s3_event(aws, ['queued', 'unwritten', 'unqueued']))
+    body = json.loads(response['body'])
+
+    assert body['processed_count'] == 1
+    assert sorted(f['record'] for f in body['failures']) == [
+        f'{run_benchmarks.INPUT_BUCKET}/uploads/unqueued.csv', f'{run_benchmarks.INPUT_BUCKET}/uploads/unwritten.csv'
+    ]
+    jobs = jobs_by_key(aws)
+    assert jobs['uploads/queued.csv']['status'] == 'QUEUED'
+    assert jobs['uploads/unqueued.csv']['status'] == 'FAILED'
+    # No orphan item holding only the key and a status
+    assert 'uploads/unwritten.csv' not in jobs
+    assert len(jobs) == 2
+    assert [json.loads(m['MessageBody'])['key'] for m in aws.sqs.messages] == ['uploads/queued.csv']
+
+
+def test_failed_mark_of_an_unrecorded_job_is_skipped(aws, handler):
+    handler.TranslationService()._mark_job_failed('missing', '2025-01-01T00:00:00')
+
+    assert aws.dynamodb.Table('TranslationMetadata').items == {}
+
+
+def test_clients_are_created_once_across_worker_threads(handler):
+    service = handler.TranslationService()
+    created = []
+
+    def slow_factory():
+        created.append(threading.get_ident())
+        time.sleep(0.01)
+        return object()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: service._lazy_client('slow', slow_factory), range(8)))
+
+    assert len(created) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_queueing_uploads_leaves_translation_clients_uncreated(aws, handler):
+    service = handler.TranslationService()
+    service._handle_s3_sqs_event(s3_event(aws, ['first', 'second']))
+
+    assert len(aws.sqs.messages) == 2
+    assert not {'translate', 'comprehend', 'api_keys_table'} & set(service._clients)
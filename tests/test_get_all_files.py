@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+import run_benchmarks
+
+
+@pytest.fixture
+def get_all_files(aws):
+    for key in ('uploads/input.csv', 'translated_20240101120000_es_old.csv', 'translated/2025/01/01/translated_new.csv'):
+        aws.s3.put_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=key, Body=b'id,text\n')
+    return run_benchmarks.load_lambda('translation_get_all_files')
+
+
+def list_files(get_all_files, **params):
+    response = get_all_files.lambda_handler({'queryStringParameters': params}, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def test_legacy_root_outputs_are_still_listed(get_all_files):
+    body = list_files(get_all_files)
+    assert [f['fileName'] for f in body['csvFiles']] == [
+        'translated_20240101120000_es_old.csv', 'translated/2025/01/01/translated_new.csv'
+    ]
+
+
+def test_pages_run_on_from_the_legacy_outputs_into_the_partitions(get_all_files):
+    first = list_files(get_all_files, limit='1')
+    second = list_files(get_all_files, limit='1', cursor=first['nextCursor'])
+    assert [f['fileName'] for f in first['csvFiles'] + second['csvFiles']] == [
+        'translated_20240101120000_es_old.csv', 'translated/2025/01/01/translated_new.csv'
+    ]
+
+
+def test_recent_legacy_outputs_are_listed_within_the_window(get_all_files):
+    assert 'translated_20240101120000_es_old.csv' in [f['fileName'] for f in list_files(get_all_files, hours='1')['csvFiles']]
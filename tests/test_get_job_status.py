@@ -0,0 +1,63 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+import run_benchmarks
+
+
+@pytest.fixture
+def get_job_status(aws):
+    table = aws.dynamodb.Table('TranslationMetadata')
+    table.put_item(Item={
+        'file_id': 'job-1', 'timestamp': '2025-01-01T12:00:00', 'email': 'owner@example.com', 'status': 'PROCESSING',
+        'rows_done': {'0': Decimal(40), '1': Decimal(25)}, 'rows_total': Decimal(100), 'rows_total_estimated': True,
+        'shard_count': Decimal(2), 'completed_shards': {Decimal(0)}, 'languages': {'es': {'status': 'QUEUED'}}
+    })
+    table.put_item(Item={'file_id': 'job-2', 'timestamp': '2025-01-01T13:00:00', 'email': 'other@example.com',
+                         'status': 'COMPLETED'})
+    return run_benchmarks.load_lambda('translation_get_job_status')
+
+
+def request(get_job_status, file_id='job-1', email='owner@example.com', **headers):
+    return get_job_status.lambda_handler({
+        'requestContext': {'authorizer': {'claims': {'email': email}}},
+        'pathParameters': {'file_id': file_id},
+        'headers': headers
+    }, None)
+
+
+def test_status_reports_progress(get_job_status):
+    response = request(get_job_status)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['fileId'] == 'job-1'
+    assert (body['rowsDone'], body['rowsTotal'], body['progress']) == (65, 100, 0.65)
+    assert (body['shardCount'], body['shardsCompleted']) == (2, 1)
+
+
+def test_unchanged_status_is_not_modified(aws, get_job_status):
+    etag = request(get_job_status)['headers']['ETag']
+
+    response = request(get_job_status, **{'if-none-match': f'W/"other", {etag}'})
+    assert response['statusCode'] == 304
+    assert response['body'] == ''
+    assert response['headers']['ETag'] == etag
+
+    aws.dynamodb.Table('TranslationMetadata').update_item(
+        Key={'file_id': 'job-1', 'timestamp': '2025-01-01T12:00:00'},
+        UpdateExpression='SET #rows_done.#part = :rows_done',
+        ExpressionAttributeNames={'#rows_done': 'rows_done', '#part': '1'},
+        ExpressionAttributeValues={':rows_done': Decimal(30)}
+    )
+    response = request(get_job_status, **{'If-None-Match': etag})
+    assert response['statusCode'] == 200
+    assert response['headers']['ETag'] != etag
+    assert json.loads(response['body'])['rowsDone'] == 70
+
+
+def test_jobs_of_other_users_are_not_found(get_job_status):
+    assert request(get_job_status, file_id='job-2')['statusCode'] == 404
+    assert request(get_job_status, file_id='missing')['statusCode'] == 404
+    assert request(get_job_status, file_id='job-2', email='other@example.com')['statusCode'] == 200
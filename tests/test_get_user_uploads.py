@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+import fakes
+import run_benchmarks
+
+
+def job(file_id, timestamp, email='owner@example.com', **attributes):
+    return dict({'file_id': file_id, 'timestamp': timestamp, 'email': email, 'status': 'COMPLETED'}, **attributes)
+
+
+def output(key, **attributes):
+    return dict({'status': 'COMPLETED', 'translated_file': f's3://{run_benchmarks.OUTPUT_BUCKET}/{key}', 'size': 10,
+                 'etag': 'etag', 'last_modified': '2025-01-01T00:00:00+00:00'}, **attributes)
+
+
+@pytest.fixture
+def get_user_uploads(aws):
+    table = aws.dynamodb.Table('TranslationMetadata')
+    # Insertion order stands in for the timestamp sort key
+    for n in range(5):
+        table.put_item(Item=job(f'job-{n}', f'2025-01-0{n + 1}T00:00:00',
+                                languages={'es': output(f'translated/job-{n}_es.csv')}))
+    table.put_item(Item=job('other', '2025-01-03T12:00:00', email='other@example.com',
+                            languages={'es': output('translated/other_es.csv')}))
+    table.put_item(Item=job('legacy', '2025-01-07T00:00:00', translated_file='translated_legacy_es.csv'))
+    table.put_item(Item=job('multi', '2025-01-08T00:00:00', languages={
+        'es': output('translated/multi_es.jsonl'),
+        'fr': output('translated/multi_fr.jsonl'),
+        'de': {'status': 'FAILED', 'error': 'unsupported'}
+    }))
+    return run_benchmarks.load_lambda('translation_get_user_uploads')
+
+
+def list_uploads(get_user_uploads, email='owner@example.com', **params):
+    response = get_user_uploads.lambda_handler({
+        'requestContext': {'authorizer': {'claims': {'email': email}}},
+        'queryStringParameters': params
+    }, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_pages_follow_the_cursor_through_every_upload(get_user_uploads):
+    pages = []
+    params = {'limit': '3'}
+    while True:
+        status, body = list_uploads(get_user_uploads, **params)
+        assert status == 200
+        pages.append([(f['fileId'], f['language']) for f in body['csvFiles']])
+        if not body['nextCursor']:
+            break
+        params['cursor'] = body['nextCursor']
+
+    assert pages == [
+        [('multi', 'es'), ('multi', 'fr'), ('legacy', None), ('job-4', 'es')],
+        [('job-3', 'es'), ('job-2', 'es'), ('job-1', 'es')],
+        [('job-0', 'es')]
+    ]
+    # Everything comes from the metadata items
+    assert not [name for name in fakes.STATS if name.startswith('s3.')]
+
+
+def test_listed_outputs_carry_their_recorded_details(get_user_uploads):
+    _, body = list_uploads(get_user_uploads, limit='1')
+
+    assert body['csvFiles'][0] == {
+        'fileName': 'translated/multi_es.jsonl', 'fileId': 'multi', 'language': 'es',
+        'lastModified': '2025-01-01T00:00:00+00:00', 'size': 10, 'storageClass': 'STANDARD', 'etag': 'etag'
+    }
+
+
+def test_cursors_of_other_users_are_rejected(get_user_uploads):
+    _, body = list_uploads(get_user_uploads, limit='1')
+
+    assert list_uploads(get_user_uploads, email='other@example.com', cursor=body['nextCursor'])[0] == 400
+    assert list_uploads(get_user_uploads, cursor='not-a-cursor')[0] == 400
@@ -0,0 +1,73 @@
+import csv
+import io
+
+import pytest
+
+import run_benchmarks
+from test_sharded_jobs import deliver
+
+
+@pytest.fixture
+def translated_rows(processor, monkeypatch):
+    """Rows sent for translation into Spanish, the rest were reused"""
+    translate_rows_multi = processor.translate_rows_multi
+    rows = []
+
+    def recording(rows_by_lang, *args):
+        rows.extend(rows_by_lang.get('es', []))
+        return translate_rows_multi(rows_by_lang, *args)
+    monkeypatch.setattr(processor, 'translate_rows_multi', recording)
+    return rows
+
+
+def run_version(aws, handler, processor, lines, options=None):
+    """Upload a version of uploads/data.csv, translate it and return its metadata item"""
+    aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key='uploads/data.csv', Body='\n'.join(lines).encode('utf-8'))
+    queued = len(aws.sqs.messages)
+    result = handler.TranslationService().process_file_upload(
+        run_benchmarks.INPUT_BUCKET, 'uploads/data.csv', 'user-1', 'user@example.com',
+        options=dict({'target_langs': ['es'], 'incremental': True}, **(options or {}))
+    )
+    assert deliver(processor, [message['MessageBody'] for message in aws.sqs.messages[queued:]]) == []
+    items = aws.dynamodb.Table('TranslationMetadata').items.values()
+    return next(item for item in items if item['file_id'] == result['file_id'])
+
+
+def output_rows(aws, item):
+    body = aws.s3.get_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=item['translated_file'])['Body'].read()
+    return list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+
+
+def version(count, edited=()):
+    return ['id,text'] + [
+        f'{i},Row number {i} was edited' if i in edited else f'{i},Row number {i} says hello' for i in range(count)
+    ]
+
+
+def test_unchanged_rows_are_copied_from_the_previous_version(aws, handler, processor, translated_rows):
+    first = run_version(aws, handler, processor, version(10))
+    assert len(translated_rows) == 10
+    translated_rows.clear()
+
+    second = run_version(aws, handler, processor, version(12, edited={3}))
+
+    assert second['previous_file_id'] == first['file_id']
+    assert second['rows_reused'] == 9
+    assert [row['id'] for row in translated_rows] == ['3', '10', '11']
+    assert output_rows(aws, second) == [
+        {'id': row['id'], 'text': '[es]' + row['text']} for row in csv.DictReader(version(12, edited={3}))
+    ]
+
+
+def test_previous_version_with_another_fingerprint_is_not_reused(aws, handler, processor, translated_rows):
+    first = run_version(aws, handler, processor, version(10))
+    translated_rows.clear()
+
+    # A new column changes the fingerprint, so every row is translated again
+    lines = ['id,text,note'] + [line + ',' for line in version(10)[1:]]
+    second = run_version(aws, handler, processor, lines)
+
+    assert second['previous_file_id'] == first['file_id']
+    assert second['rows_reused'] == 0
+    assert len(translated_rows) == 10
+    assert [row['text'] for row in output_rows(aws, second)] == [f'[es]Row number {i} says hello' for i in range(10)]
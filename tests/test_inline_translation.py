@@ -0,0 +1,96 @@
+import sys
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def service(handler):
+    return handler.TranslationService()
+
+
+def test_throttled_values_are_retried(aws, service, no_backoff):
+    original = aws.translate.translate_text
+    calls = []
+
+    def throttled_twice(**kwargs):
+        calls.append(kwargs)
+        if len(calls) <= 2:
+            raise fakes.client_error('ThrottlingException', 'TranslateText', 'Rate exceeded')
+        return original(**kwargs)
+    aws.translate.translate_text = throttled_twice
+
+    assert service.translate_values(['Hello'], 'en', 'es') == {'Hello': '[es]Hello'}
+    assert len(calls) == 3
+
+
+def test_untranslated_values_fail_instead_of_passing_through(aws, service, no_backoff):
+    aws.translate.throttle_rate = 1.0
+
+    with pytest.raises(fakes.ClientError):
+        service.translate_values(['Hello', 'World'], 'en', 'es')
+    # Nothing was cached as its own translation either
+    assert service.cache.get_many(['Hello', 'World'], 'en', 'es') == {}
+
+
+def test_throttled_batch_is_retried_whole(aws, service, no_backoff):
+    original = aws.translate.translate_text
+    calls = []
+
+    def throttled_once(**kwargs):
+        calls.append(kwargs['Text'])
+        if len(calls) == 1:
+            raise fakes.client_error('ThrottlingException', 'TranslateText', 'Rate exceeded')
+        return original(**kwargs)
+    aws.translate.translate_text = throttled_once
+
+    assert service.translate_batch(['One', 'Two', 'Three'], 'en', 'es') == ['[es]One', '[es]Two', '[es]Three']
+    assert calls == ['One\nTwo\nThree', 'One\nTwo\nThree']
+
+
+def test_merged_lines_fall_back_to_one_call_per_text(aws, service):
+    original = aws.translate.translate_text
+
+    def merging(**kwargs):
+        response = original(**kwargs)
+        response['TranslatedText'] = response['TranslatedText'].replace('\n', ' ', 1)
+        return response
+    aws.translate.translate_text = merging
+
+    assert service.translate_batch(['One', 'Two'], 'en', 'es') == ['[es]One', '[es]Two']
+    assert fakes.STATS['translate.translate_text'] == 3
+
+
+def test_failed_batch_is_not_split_into_single_calls(aws, service, no_backoff):
+    aws.translate.throttle_rate = 1.0
+
+    with pytest.raises(fakes.ClientError):
+        service.translate_batch(['One', 'Two', 'Three'], 'en', 'es')
+    # One call per attempt of the whole batch
+    assert fakes.STATS['translate.translate_text'] == sys.modules['translation_common'].TRANSLATE_MAX_RETRIES + 1
+
+
+def api_request(service, monkeypatch, body):
+    monkeypatch.setattr(service, '_get_user_from_api_key', lambda key: {'user_id': 'user-1', 'user_email': 'u@example.com'})
+    return service._handle_api_request({
+        'requestContext': {},
+        'headers': {'x-api-key': 'key', 'Content-Type': 'text/csv'},
+        'body': body
+    })
+
+
+def test_translate_failures_are_server_errors(aws, service, monkeypatch, no_backoff):
+    aws.translate.throttle_rate = 1.0
+
+    assert api_request(service, monkeypatch, 'id,text\n1,Hello there\n2,Good morning\n')['statusCode'] == 500
+
+
+def test_unsupported_language_pair_is_a_client_error(aws, service, monkeypatch):
+    def unsupported(**kwargs):
+        raise fakes.client_error('UnsupportedLanguagePairException', 'TranslateText', 'en to es is not supported')
+    aws.translate.translate_text = unsupported
+
+    response = api_request(service, monkeypatch, 'id,text\n1,Hello there\n2,Good morning\n')
+    assert response['statusCode'] == 400
+    assert 'not supported' in response['body']
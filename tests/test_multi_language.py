@@ -0,0 +1,51 @@
+import csv
+import io
+
+import fakes
+import run_benchmarks
+from test_output_formats import CSV
+from test_sharded_jobs import deliver, job_item
+
+
+def run_job(aws, handler, processor, target_langs):
+    aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key='uploads/data.csv', Body=CSV.encode('utf-8'))
+    handler.TranslationService().process_file_upload(
+        run_benchmarks.INPUT_BUCKET, 'uploads/data.csv', 'user-1', 'user@example.com',
+        options={'target_langs': target_langs}
+    )
+    fakes.STATS.clear()
+    assert deliver(processor, [message['MessageBody'] for message in aws.sqs.messages]) == []
+    return job_item(aws)
+
+
+def output_texts(aws, output_key):
+    body = aws.s3.get_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=output_key)['Body'].read()
+    return [row['text'] for row in csv.DictReader(io.StringIO(body.decode('utf-8')))]
+
+
+def test_one_read_of_the_input_serves_every_language(aws, handler, processor):
+    item = run_job(aws, handler, processor, ['es', 'fr', 'de'])
+
+    assert fakes.STATS['s3.get_object'] == 1
+    assert item['status'] == 'COMPLETED'
+    assert item['translated_file'] == item['languages']['es']['translated_file']
+    for lang in ('es', 'fr', 'de'):
+        assert output_texts(aws, item['languages'][lang]['translated_file'])[0] == f'[{lang}]Hello there'
+
+
+def test_unsupported_language_fails_alone(aws, handler, processor):
+    translate_text = aws.translate.translate_text
+
+    def no_french(**kwargs):
+        if kwargs['TargetLanguageCode'] == 'fr':
+            raise fakes.client_error('UnsupportedLanguagePairException', 'TranslateText', 'en to fr is not supported')
+        return translate_text(**kwargs)
+    aws.translate.translate_text = no_french
+
+    item = run_job(aws, handler, processor, ['es', 'fr'])
+
+    assert item['status'] == 'COMPLETED'
+    assert item['languages']['fr']['status'] == 'FAILED'
+    assert 'en to fr is not supported' in item['languages']['fr']['error']
+    assert output_texts(aws, item['languages']['es']['translated_file'])[0] == '[es]Hello there'
+    assert not [key for (_, key) in aws.s3.objects if '_fr_' in key]
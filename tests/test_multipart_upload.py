@@ -0,0 +1,74 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import run_benchmarks
+
+MiB = 1024 * 1024
+
+
+@pytest.fixture
+def multipart(aws):
+    return run_benchmarks.load_lambda('translation_multipart_upload')
+
+
+def call(multipart, body, user_id='user-1'):
+    response = multipart.lambda_handler({
+        'requestContext': {'authorizer': {'claims': {'email': f'{user_id}@example.com', 'sub': user_id}}},
+        'body': json.dumps(body)
+    }, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_start_signs_a_url_per_part(multipart):
+    status, body = call(multipart, {'file_name': '../data.csv', 'size': 200 * MiB})
+
+    assert status == 200
+    assert body['key'].startswith('uploads/user-1/') and body['key'].endswith('/data.csv')
+    assert (body['partSize'], body['partCount']) == (64 * MiB, 4)
+    assert [part['partNumber'] for part in body['parts']] == [1, 2, 3, 4]
+    query = parse_qs(urlparse(body['parts'][3]['url']).query)
+    assert (query['uploadId'], query['partNumber']) == ([body['uploadId']], ['4'])
+
+
+def test_part_size_grows_to_stay_within_the_part_limit(multipart):
+    status, body = call(multipart, {'file_name': 'big.csv', 'size': multipart.MAX_UPLOAD_BYTES})
+
+    assert status == 200
+    assert body['partSize'] % MiB == 0
+    assert body['partCount'] <= multipart.MAX_PARTS
+    assert body['partCount'] * body['partSize'] >= multipart.MAX_UPLOAD_BYTES
+
+
+@pytest.mark.parametrize('request_body', [{'file_name': 'data.txt', 'size': 10}, {'file_name': 'data.csv', 'size': 0}])
+def test_invalid_starts_are_rejected(multipart, request_body):
+    assert call(multipart, request_body)[0] == 400
+
+
+def test_parts_are_assembled_in_order(aws, multipart):
+    _, started = call(multipart, {'file_name': 'data.csv', 'size': 10})
+    upload = {'key': started['key'], 'upload_id': started['uploadId']}
+    etags = {
+        number: aws.s3.upload_part(Bucket=run_benchmarks.INPUT_BUCKET, Key=started['key'], UploadId=started['uploadId'],
+                                   PartNumber=number, Body=data)['ETag']
+        for number, data in ((2, b'2,b\n'), (1, b'id,text\n1,a\n'))
+    }
+
+    status, body = call(multipart, dict(upload, action='complete', parts=[
+        {'partNumber': number, 'etag': etag} for number, etag in etags.items()
+    ]))
+
+    assert (status, body['status']) == (200, 'UPLOADED')
+    assert aws.s3.get_object(Bucket=run_benchmarks.INPUT_BUCKET, Key=started['key'])['Body'].read() == b'id,text\n1,a\n2,b\n'
+    # Completing again finds no upload
+    assert call(multipart, dict(upload, action='complete', parts=[{'partNumber': 1, 'etag': etags[1]}]))[0] == 400
+
+
+def test_uploads_of_other_users_are_refused(multipart):
+    _, started = call(multipart, {'file_name': 'data.csv', 'size': 10})
+    upload = {'key': started['key'], 'upload_id': started['uploadId']}
+
+    assert call(multipart, dict(upload, action='abort'), user_id='user-2')[0] == 403
+    assert call(multipart, dict(upload, action='sign', part_numbers=[1]), user_id='user-2')[0] == 403
+    assert call(multipart, dict(upload, action='abort'))[0] == 200
@@ -0,0 +1,146 @@
+
+import base64
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import run_benchmarks
+from test_sharded_jobs import deliver
+
+CSV = 'id,text,note\n1,Hello there,"a, b"\n2,Good morning,\n3,"Line one\nline two",x\n'
+
+
+def queued_output(aws, handler, processor, options, key='uploads/data.csv', body=CSV.encode('utf-8'), **attributes):
+    """Run a job through the queue and return the metadata item and raw output of its first language"""
+    aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key=key, Body=body, **attributes)
+    handler.TranslationService().process_file_upload(
+        run_benchmarks.INPUT_BUCKET, key, 'user-1', 'user@example.com', options=options
+    )
+    assert deliver(processor, [message['MessageBody'] for message in aws.sqs.messages]) == []
+    item = next(iter(aws.dynamodb.Table('TranslationMetadata').items.values()))
+    return item, aws.s3.get_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=item['translated_file'])
+
+
+def inline_output(aws, handler, options):
+    result = handler.TranslationService().process_csv_content(CSV, 'user-1', 'user@example.com', options)
+    key = result['translated_file'].split('/', 3)[3]
+    return aws.s3.get_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=key)
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'jsonl'])
+def test_inline_and_queued_jobs_write_the_same_output(aws, handler, processor, output_format):
+    options = {'output_format': output_format, 'target_langs': ['es']}
+    _, queued = queued_output(aws, handler, processor, options)
+
+    assert inline_output(aws, handler, options)['Body'].read() == queued['Body'].read()
+
+
+def plain_output(aws, handler):
+    """Uncompressed CSV translation of CSV, the reference for the other encodings"""
+    return inline_output(aws, handler, {'target_langs': ['es']})['Body'].read()
+
+
+@pytest.mark.parametrize('attributes', [{}, {'ContentEncoding': 'gzip'}])
+def test_gzip_input_is_decompressed(aws, handler, processor, attributes):
+    data = CSV.encode('utf-8')
+    # Concatenated members are one gzip stream
+    body = gzip.compress(data[:20]) + gzip.compress(data[20:])
+    _, queued = queued_output(aws, handler, processor, {'target_langs': ['es']}, key='uploads/data.csv.gz',
+                              body=body, **attributes)
+
+    assert queued['Body'].read() == plain_output(aws, handler)
+
+
+def test_zstd_input_is_decompressed(aws, handler, processor):
+    zstandard = pytest.importorskip('zstandard')
+    body = zstandard.ZstdCompressor().compress(CSV.encode('utf-8'))
+    _, queued = queued_output(aws, handler, processor, {'target_langs': ['es']}, key='uploads/data.csv.zst', body=body)
+
+    assert queued['Body'].read() == plain_output(aws, handler)
+
+
+def test_compressed_outputs_carry_their_content_encoding(aws, handler, processor):
+    options = {'target_langs': ['es'], 'output_compression': 'gzip'}
+    _, queued = queued_output(aws, handler, processor, options)
+    inline = inline_output(aws, handler, options)
+    expected = plain_output(aws, handler)
+
+    for output in (queued, inline):
+        assert output['ContentEncoding'] == 'gzip'
+        assert gzip.decompress(output['Body'].read()) == expected
+
+
+def api_request(handler, monkeypatch, body, **headers):
+    service = handler.TranslationService()
+    monkeypatch.setattr(service, '_get_user_from_api_key', lambda key: {'user_id': 'user-1', 'user_email': 'u@example.com'})
+    response = service._handle_api_request({
+        'requestContext': {},
+        'headers': {'x-api-key': 'key', 'Content-Type': 'text/csv', **headers},
+        'body': base64.b64encode(body).decode('ascii'),
+        'isBase64Encoded': True
+    })
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_gzip_request_body_is_decompressed(aws, handler, monkeypatch):
+    status, result = api_request(handler, monkeypatch, gzip.compress(CSV.encode('utf-8')), **{'Content-Encoding': 'gzip'})
+
+    assert status == 200
+    key = result['translated_file'].split('/', 3)[3]
+    assert aws.s3.get_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=key)['Body'].read() == plain_output(aws, handler)
+
+
+def test_request_body_decompressing_past_the_limit_is_rejected(aws, handler, monkeypatch):
+    monkeypatch.setattr(handler, 'MAX_DECOMPRESSED_BYTES', 1000)
+    body = gzip.compress(('id,text\n' + '1,Hello there\n' * 200).encode('utf-8'))
+    assert len(body) < 1000
+
+    status, result = api_request(handler, monkeypatch, body)
+
+    assert status == 400
+    assert 'exceeds limit of 1000 bytes' in result['error']
+
+
+def csv_rows(data):
+    return list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+
+
+def both_paths(aws, handler, processor, options):
+    """Outputs of the same job run through the queue and inline"""
+    _, queued = queued_output(aws, handler, processor, options)
+    return [queued, inline_output(aws, handler, options)]
+
+
+def test_jsonl_rows_match_the_csv_rows(aws, handler, processor):
+    outputs = both_paths(aws, handler, processor, {'output_format': 'jsonl', 'target_langs': ['es']})
+    expected = csv_rows(plain_output(aws, handler))
+
+    for output in outputs:
+        assert output['ContentType'] == 'application/x-ndjson'
+        assert [json.loads(line) for line in output['Body'].read().decode('utf-8').splitlines()] == expected
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_parquet_rows_match_the_csv_rows(aws, handler, processor, compression):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    options = {'output_format': 'parquet', 'target_langs': ['es']}
+    if compression:
+        options['output_compression'] = compression
+    outputs = both_paths(aws, handler, processor, options)
+    expected = csv_rows(plain_output(aws, handler))
+
+    for output in outputs:
+        # Parquet compresses its own pages, the object itself is not encoded
+        assert output['ContentType'] == 'application/vnd.apache.parquet'
+        assert output['ContentEncoding'] is None
+        assert parquet.read_table(io.BytesIO(output['Body'].read())).to_pylist() == expected
+
+
+def test_parquet_is_refused_without_pyarrow(handler, monkeypatch):
+    monkeypatch.setattr(handler, 'pyarrow', None)
+
+    with pytest.raises(ValueError, match='parquet output is not available'):
+        handler.TranslationService()._job_options({'output_format': 'parquet'})
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import run_benchmarks
+from test_sharded_jobs import deliver
+
+
+class FrozenDatetime(datetime):
+    """Every job runs within the same second"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 1, 1, 12, 0, 0, tzinfo=tz)
+
+
+def upload(aws, handler, key, user_id, text):
+    payload = f'id,text\n1,{text}\n'.encode('utf-8')
+    etag = aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key=key, Body=payload)['ETag']
+    handler.TranslationService().process_file_upload(
+        run_benchmarks.INPUT_BUCKET, key, user_id, f'{user_id}@example.com', size=len(payload), etag=etag
+    )
+
+
+def test_same_named_jobs_in_the_same_second_keep_their_own_outputs(aws, handler, processor, monkeypatch):
+    monkeypatch.setattr(processor, 'datetime', FrozenDatetime)
+    upload(aws, handler, 'uploads/user-a/1/data.csv', 'user-a', 'Hello from A')
+    upload(aws, handler, 'uploads/user-b/2/data.csv', 'user-b', 'Hello from B')
+
+    assert deliver(processor, [message['MessageBody'] for message in aws.sqs.messages]) == []
+
+    jobs = {item['user_id']: item for item in aws.dynamodb.Table('TranslationMetadata').items.values()}
+    keys = {user: job['translated_file'] for user, job in jobs.items()}
+    assert keys['user-a'] != keys['user-b']
+    for user, text in (('user-a', 'Hello from A'), ('user-b', 'Hello from B')):
+        assert jobs[user]['file_id'] in keys[user]
+        body = aws.s3.get_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=keys[user])['Body'].read().decode('utf-8')
+        assert f'[es]{text}' in body
+
+
+def test_inline_jobs_in_the_same_second_keep_their_own_outputs(aws, handler, monkeypatch):
+    monkeypatch.setattr(handler, 'datetime', FrozenDatetime)
+    service = handler.TranslationService()
+    first = service.process_csv_content('id,text\n1,First text\n', 'user-a', 'a@example.com')
+    second = service.process_csv_content('id,text\n1,Second text\n', 'user-a', 'a@example.com')
+
+    assert first['translated_file'] != second['translated_file']
+    key = first['translated_file'].split('/', 3)[3]
+    body = aws.s3.get_object(Bucket=run_benchmarks.OUTPUT_BUCKET, Key=key)['Body'].read().decode('utf-8')
+    assert '[es]First text' in body
@@ -0,0 +1,32 @@
+import sys
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def bucket(aws, processor):
+    common = sys.modules['translation_common']
+    return common.TokenBucket(aws.dynamodb, 'TranslateRateLimit', 'translate', 10.0, 10.0, 5)
+
+
+def test_tokens_are_leased_from_the_shared_item(aws, bucket):
+    for _ in range(5):
+        bucket.acquire()
+
+    assert fakes.STATS['dynamodb.put_item'] == 1
+    assert float(aws.dynamodb.Table('TranslateRateLimit').items[('translate',)]['tokens']) == pytest.approx(5.0)
+
+
+@pytest.mark.parametrize('error', [
+    fakes.client_error('ProvisionedThroughputExceededException', 'GetItem'),
+    fakes.EndpointConnectionError(error='unreachable')
+])
+def test_unavailable_table_lets_calls_through(aws, bucket, monkeypatch, error):
+    def unavailable(**kwargs):
+        raise error
+    monkeypatch.setattr(aws.dynamodb.Table('TranslateRateLimit'), 'get_item', unavailable)
+
+    for _ in range(5):
+        bucket.acquire()
@@ -0,0 +1,47 @@
+import pytest
+
+import run_benchmarks
+from test_sharded_jobs import deliver
+
+CSV = 'id,text,note\n1,Hello there,Fine\n2,Good morning,Later\n3,Good night,Soon\n'
+
+
+@pytest.fixture
+def service(handler, monkeypatch):
+    monkeypatch.setenv('SMALL_JOB_QUEUE_URL', 'small-queue')
+    return handler.TranslationService()
+
+
+def test_small_posts_are_translated_inline(aws, service):
+    result = service.process_csv_content(CSV, 'user-1', 'user@example.com')
+
+    assert (result['processing'], result['status']) == ('inline', 'COMPLETED')
+    assert set(result['translated_files']) == {'es', 'fr'}
+    assert aws.sqs.messages == []
+
+
+def test_posts_over_the_cell_limit_are_staged_and_queued(aws, handler, service, processor, monkeypatch):
+    # 3 rows x 2 translated columns x 2 target languages
+    monkeypatch.setattr(handler, 'INLINE_MAX_CELLS', 11)
+    result = service.process_csv_content(CSV, 'user-1', 'user@example.com')
+
+    assert (result['processing'], result['estimated_cells']) == ('queued', 12)
+    staged = [key for (bucket, key) in aws.s3.objects if bucket == run_benchmarks.INPUT_BUCKET]
+    assert len(staged) == 1 and staged[0].startswith('staged/user-1/')
+    [message] = aws.sqs.messages
+    assert (message['QueueUrl'], message['MessageGroupId']) == ('small-queue', 'user-1')
+
+    assert deliver(processor, [message['MessageBody']]) == []
+    items = aws.dynamodb.Table('TranslationMetadata').items.values()
+    assert [i['status'] for i in items if i['file_id'] == result['file_id']] == ['COMPLETED']
+
+
+def test_jobs_over_the_small_job_size_go_to_the_bulk_queue(aws, handler, service, monkeypatch):
+    monkeypatch.setattr(handler, 'INLINE_MAX_CELLS', 0)
+    monkeypatch.setattr(handler, 'SMALL_JOB_MAX_BYTES', len(CSV))
+    service.process_csv_content(CSV, 'user-1', 'user@example.com')
+    service.process_csv_content(CSV, 'user-2', 'other@example.com', {'target_langs': ['es']})
+
+    assert [(m['QueueUrl'], m['MessageGroupId']) for m in aws.sqs.messages] == [
+        ('bench-queue', 'user-1'), ('small-queue', 'user-2')
+    ]
@@ -0,0 +1,123 @@
+import io
+import os
+
+import pytest
+
+import fakes
+import run_benchmarks
+from datagen import generate_csv
+
+
+@pytest.fixture
+def job(aws):
+    """Upload a CSV large enough to be split into shards and return its queued messages"""
+    os.environ.update({'SHARD_THRESHOLD_BYTES': '8000', 'SHARD_TARGET_BYTES': '4000'})
+    handler = run_benchmarks.load_lambda('translation_upload_handler')
+    payload, _ = generate_csv(16 * 1024, 0.3, 1)
+    etag = aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key='uploads/input.csv', Body=payload)['ETag']
+    handler.TranslationService().process_file_upload(
+        run_benchmarks.INPUT_BUCKET, 'uploads/input.csv', 'user-1', 'user@example.com', size=len(payload), etag=etag
+    )
+    messages = [message['MessageBody'] for message in aws.sqs.messages]
+    assert len(messages) > 1
+    return messages
+
+
+def deliver(processor, bodies):
+    """Run the processor on one SQS batch and return the bodies of the failed records"""
+    records = [{'messageId': str(i), 'body': body} for i, body in enumerate(bodies)]
+    failed = processor.lambda_handler({'Records': records}, None)['batchItemFailures']
+    return [bodies[int(f['itemIdentifier'])] for f in failed]
+
+
+def job_item(aws):
+    return next(iter(aws.dynamodb.Table('TranslationMetadata').items.values()))
+
+
+def shard_objects(aws):
+    return [key for (_, key) in aws.s3.objects if key.startswith('shards/')]
+
+
+def test_failed_assembly_is_retried_by_the_redelivered_message(aws, processor, job, monkeypatch):
+    assemble_shards = processor.assemble_shards
+    attempts = []
+
+    def fails_once(*args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise fakes.client_error('InternalError', 'UploadPart')
+        return assemble_shards(*args)
+    monkeypatch.setattr(processor, 'assemble_shards', fails_once)
+
+    failed = deliver(processor, job)
+    assert len(failed) == 1
+    assert job_item(aws)['status'] == 'PROCESSING'
+    assert 'assembly_started' not in job_item(aws)
+    assert shard_objects(aws)
+
+    assert deliver(processor, failed) == []
+    assert job_item(aws)['status'] == 'COMPLETED'
+    assert 'assembled' in job_item(aws)
+    assert shard_objects(aws) == []
+
+
+def test_claim_of_an_invocation_that_died_is_taken_over(aws, processor, job, monkeypatch):
+    def dies(*args):
+        raise fakes.client_error('InternalError', 'UploadPart')
+    monkeypatch.setattr(processor, 'assemble_shards', dies)
+    # A crashed invocation never gets to release its claim
+    monkeypatch.setattr(processor, 'release_assembly', lambda key, claimed: None)
+    failed = deliver(processor, job)
+    monkeypatch.undo()
+
+    # Until the claim is stale the message keeps coming back instead of being dropped
+    assert deliver(processor, failed) == failed
+    assert job_item(aws)['status'] == 'PROCESSING'
+
+    monkeypatch.setattr(processor, 'ASSEMBLY_LEASE_SECONDS', 0)
+    assert deliver(processor, failed) == []
+    assert job_item(aws)['status'] == 'COMPLETED'
+
+
+def test_shard_redelivered_after_assembly_is_skipped(aws, processor, job):
+    assert deliver(processor, job) == []
+    fakes.STATS.clear()
+
+    assert deliver(processor, job[:1]) == []
+    assert fakes.STATS['translate.translate_text'] == 0
+    assert job_item(aws)['status'] == 'COMPLETED'
+
+
+def test_shards_are_planned_from_ranged_reads_at_row_boundaries(aws, monkeypatch):
+    os.environ.update({
+        'SHARD_TARGET_BYTES': '1000', 'SHARD_PLAN_HEAD_BYTES': '2000', 'SHARD_BOUNDARY_WINDOW_BYTES': '128'
+    })
+    handler = run_benchmarks.load_lambda('translation_upload_handler')
+    # Quoted values spanning several lines, some of them looking like whole rows
+    rows = ['id,text,note\n'] + [
+        f'{i},"line one of {i}\n{i},x,y\nline three",plain\n' if i % 5 else f'{i},"row {i} text",plain\n'
+        for i in range(400)
+    ]
+    payload = ''.join(rows).encode('utf-8')
+    aws.s3.put_object(Bucket=run_benchmarks.INPUT_BUCKET, Key='uploads/quoted.csv', Body=payload)
+
+    get_object = aws.s3.get_object
+    ranges = []
+
+    def ranged_only(**kwargs):
+        ranges.append(kwargs.get('Range'))
+        return get_object(**kwargs)
+    monkeypatch.setattr(aws.s3, 'get_object', ranged_only)
+    plan = handler.TranslationService()._plan_shards(run_benchmarks.INPUT_BUCKET, 'uploads/quoted.csv', len(payload))
+
+    assert ranges and all(ranges)
+    assert max(int(end) - int(start) + 1 for start, end in (r[6:].split('-') for r in ranges)) < len(payload)
+    assert len(plan['ranges']) > 1
+    assert plan['row_count_estimated']
+    assert plan['ranges'][-1][1] == len(payload)
+    parsed = 0
+    for start, end in plan['ranges']:
+        shard_rows = list(handler.csv.reader(io.StringIO(payload[start:end].decode('utf-8'))))
+        assert all(len(row) == 3 for row in shard_rows)
+        parsed += len(shard_rows)
+    assert parsed == 400
@@ -0,0 +1,51 @@
+import fakes
+
+
+def _unavailable(*args, **kwargs):
+    raise fakes.client_error('ProvisionedThroughputExceededException', 'BatchGetItem', 'Rate exceeded')
+
+
+def test_cache_read_failure_translates_instead(aws, processor, monkeypatch):
+    monkeypatch.setattr(aws.dynamodb, 'batch_get_item', _unavailable)
+
+    translations = processor.translate_values(['Hello', 'World'], 'en', 'es')
+
+    assert translations == {'Hello': '[es]Hello', 'World': '[es]World'}
+    assert processor.translation_cache.stats['misses'] == 2
+
+
+def test_cache_connection_failure_translates_instead(aws, processor, monkeypatch):
+    def unreachable(*args, **kwargs):
+        raise fakes.BotoCoreError()
+    monkeypatch.setattr(aws.dynamodb, 'batch_get_item', unreachable)
+
+    assert processor.translate_values(['Hello'], 'en', 'es') == {'Hello': '[es]Hello'}
+
+
+def test_cache_write_failure_keeps_translations(aws, processor, monkeypatch):
+    monkeypatch.setattr(aws.dynamodb.Table('TranslationCache'), 'batch_writer', _unavailable)
+
+    assert processor.translate_values(['Hello'], 'en', 'es') == {'Hello': '[es]Hello'}
+    # The container tier still remembers it
+    assert processor.translate_values(['Hello'], 'en', 'es') == {'Hello': '[es]Hello'}
+    assert processor.translation_cache.stats['lru_hits'] == 1
+
+
+def test_cache_keeps_pages_read_before_a_failure(aws, processor, monkeypatch):
+    texts = [f"text {i}" for i in range(150)]
+    processor.translate_values(texts, 'en', 'es')
+    cold = type(processor.translation_cache)(aws.dynamodb, 'TranslationCache', 1000, 30)
+    original = aws.dynamodb.batch_get_item
+    calls = []
+
+    def second_page_fails(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 1:
+            _unavailable()
+        return original(*args, **kwargs)
+    monkeypatch.setattr(aws.dynamodb, 'batch_get_item', second_page_fails)
+
+    found = cold.get_many(texts, 'en', 'es')
+
+    assert len(found) == 100
+    assert cold.stats == {'lru_hits': 0, 'table_hits': 100, 'misses': 50}
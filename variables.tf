@@ -9,4 +9,10 @@ variable "region" {
   description = "AWS region"
   type        = string
   default     = "eu-west-1"
-}
\ No newline at end of file
+}
+
+variable "translate_rate_limit" {
+  description = "TranslateText requests per second shared by all Lambda invocations; set just under the account's Amazon Translate quota (Service Quotas), 0 disables"
+  type        = number
+  default     = 20
+}